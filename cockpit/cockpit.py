@@ -11,20 +11,67 @@ Usage::
 
     python cockpit.py list
     python cockpit.py run <miniapp-name>
+    python cockpit.py up [<miniapp-name> ...]
+    python cockpit.py status
+    python cockpit.py top [--interval SECONDS]
+    python cockpit.py bench-launch <miniapp-name> [--runs N]
+    python cockpit.py bench-serve <miniapp-name> [--modes dev,waitress,gunicorn]
+    python cockpit.py reload <miniapp-name>
+    python cockpit.py gateway [--port N]
+    python cockpit.py bench-gateway <miniapp-name>
 
 If a miniapp is run it is executed in its own working directory with the
 current Python interpreter. The cockpit will forward all output lines to
 standard output. Use Ctrl‑C to terminate the running miniapp.
+
+``up`` starts several miniapps (all of them if no names are given) under an
+asyncio supervisor: their output is interleaved with a ``[name]`` prefix,
+crashed apps are restarted with exponential backoff and Ctrl‑C stops them
+all. Each app is assigned a port (from its ``config.json``, or a free one),
+which is recorded in ``registry.json`` together with live health-check
+results; ``status`` prints that registry.
+
+With ``up --fork`` (or ``"launch_mode": "fork"`` in the config) apps are
+forked from a warm fork server that has already imported the heavy shared
+dependencies, which cuts launch-to-healthy time. Apps that declare their own
+interpreter in the manifest (``"python": ".venv/bin/python"``) or set
+``"launch": "spawn"`` are always spawned normally. ``bench-launch`` measures
+launch-to-healthy time in both modes.
+
+The supervisor also samples each app's CPU, memory, open files and threads
+(including child processes) once per ``sample_interval``; ``status`` shows
+the latest values and ``top`` refreshes them live. ``resource_limits`` in the
+config sets per-app thresholds that log a warning or restart the app.
+
+Apps are served in the mode set by ``server`` in their ``config.json``
+(``dev``, ``waitress`` or ``gunicorn``, see ``shared/serving.py``);
+``up --server MODE`` overrides it for every app. ``bench-serve`` load-tests
+an app's ``/health`` in each mode and ``reload`` gracefully replaces the
+worker processes of a running gunicorn app (same code: the workers fork from
+the already-imported master, so restart the app to pick up code changes).
+
+The gateway serves every app under ``/apps/<name>/`` on one port (pooled
+keep-alive upstream connections, streaming pass-through, healthy apps only,
+per-route counters at ``/_gateway/stats``). Run it inside the supervisor with
+``up --gateway`` or on its own with ``gateway``; ``bench-gateway`` compares
+latency and throughput through the gateway against direct access.
+
+Optional settings are read from ``config.json`` next to this script (see
+``config.example.json``).
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import json
 import os
+import signal
 import sys
 import threading
+import time
 
+from dataclasses import replace
 from pathlib import Path
 
 # Insert the repository root into sys.path so we can import from the `shared` package
@@ -32,6 +79,39 @@ repo_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(repo_root))
 
 from shared.process_utils import start_subprocess, stream_process_output
+from health import KeepAliveProbe, ProbeError
+from registry import Registry, assign_port, pid_alive
+from resources import ResourceLimits
+from shared.config_schema import SERVER_MODES, MiniAppConfig
+from gateway import Gateway, RegistryRoutes, serve_forever
+from loadgen import run_load
+from supervisor import AppSpec, measure_launch, run_supervisor
+from zygote import DEFAULT_PRELOAD, ZygoteClient, fork_supported
+
+DEFAULT_CONFIG = {
+    "registry": "registry.json",
+    "health_interval": 5.0,
+    "health_timeout": 2.0,
+    "launch_mode": "spawn",
+    "zygote_preload": DEFAULT_PRELOAD,
+    "sample_interval": 1.0,
+    # {"default": {...}, "<app name>": {...}}, keys as in resources.ResourceLimits
+    "resource_limits": {},
+    "gateway_host": "127.0.0.1",
+    "gateway_port": 8080,
+}
+
+
+def load_config(config_path: Path) -> dict:
+    """Load cockpit settings, falling back to defaults for missing keys."""
+    config = dict(DEFAULT_CONFIG)
+    if config_path.exists():
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                config.update(json.load(f))
+        except Exception as exc:
+            print(f"Error loading config: {exc}", file=sys.stderr)
+    return config
 
 
 def load_manifest(manifest_path: Path) -> list[dict[str, str]]:
@@ -82,19 +162,28 @@ def list_apps(manifest: list[dict[str, str]]) -> None:
         print(f"  - {name}: {desc}")
 
 
-def run_app(entry: dict[str, str]) -> None:
-    """Run the given miniapp entry as a subprocess and stream its output."""
+def resolve_app(entry: dict[str, str]) -> tuple[Path, str] | None:
+    """Return ``(app_dir, entry_script)`` for a manifest entry, or None if invalid."""
     rel_path = entry.get("path")
     if not rel_path:
         print("Manifest entry missing path", file=sys.stderr)
-        return
+        return None
     # Determine working directory and entry script
     repo_root = Path(__file__).resolve().parent.parent
     app_dir = repo_root / rel_path
     entry_script = entry.get("entry", "app.py")
     if not (app_dir / entry_script).exists():
         print(f"Entry script '{entry_script}' not found in {app_dir}", file=sys.stderr)
+        return None
+    return app_dir, entry_script
+
+
+def run_app(entry: dict[str, str]) -> None:
+    """Run the given miniapp entry as a subprocess and stream its output."""
+    resolved = resolve_app(entry)
+    if resolved is None:
         return
+    app_dir, entry_script = resolved
     print(f"\nLaunching {entry.get('name')}...\n", flush=True)
     proc = start_subprocess(str(app_dir), entry_script)
     try:
@@ -107,6 +196,355 @@ def run_app(entry: dict[str, str]) -> None:
     print("Miniapp exited with code", proc.returncode)
 
 
+def load_app_config(app_dir: Path, name: str) -> MiniAppConfig:
+    """Load a miniapp's ``config.json``; defaults are used if it is missing."""
+    config_path = app_dir / "config.json"
+    config = MiniAppConfig(name=name)
+    if config_path.exists():
+        try:
+            config = MiniAppConfig.from_file(config_path)
+        except Exception as exc:
+            print(f"Error loading {config_path}: {exc}", file=sys.stderr)
+    # The manifest name is what the cockpit (and the registry) use.
+    config.name = name
+    return config
+
+
+def registry_path(config: dict) -> Path:
+    return (Path(__file__).resolve().parent / config["registry"]).resolve()
+
+
+def build_specs(entries: list[dict[str, str]], launch_mode: str = "spawn",
+                limits: dict | None = None) -> list[AppSpec] | None:
+    """Turn manifest entries into supervisor specs; None if any entry is invalid."""
+    specs = []
+    for entry in entries:
+        resolved = resolve_app(entry)
+        if resolved is None:
+            return None
+        app_dir, entry_script = resolved
+        name = entry.get("name", app_dir.name)
+        python = entry.get("python")
+        mode = entry.get("launch", launch_mode)
+        if python:
+            # Apps with their own interpreter cannot share the fork server's imports.
+            python = str((app_dir / python).resolve())
+            mode = "spawn"
+        specs.append(AppSpec(name=name, cwd=str(app_dir), entry=entry_script,
+                             python_executable=python, config=load_app_config(app_dir, name),
+                             launch_mode=mode, limits=ResourceLimits.from_config(limits or {}, name)))
+    return specs
+
+
+def make_zygote(config: dict) -> ZygoteClient | None:
+    if not fork_supported():
+        print("Fork mode is not available on this platform; spawning apps instead.", file=sys.stderr)
+        return None
+    return ZygoteClient(list(config["zygote_preload"]))
+
+
+def up_apps(entries: list[dict[str, str]], config: dict, restart: bool = True,
+            health_interval: float | None = None, launch_mode: str | None = None,
+            server: str | None = None, gateway_port: int | None = None) -> int:
+    """Run several miniapps concurrently under the asyncio supervisor."""
+    launch_mode = launch_mode or config["launch_mode"]
+    specs = build_specs(entries, launch_mode, config["resource_limits"])
+    if specs is None:
+        return 1
+    if not specs:
+        print("No miniapps to start.")
+        return 1
+    if server:
+        for spec in specs:
+            spec.config.server = server
+    zygote = make_zygote(config) if any(spec.launch_mode == "fork" for spec in specs) else None
+    registry = Registry.load(registry_path(config))
+    if registry.supervisor_pid and registry.supervisor_pid != os.getpid() and pid_alive(registry.supervisor_pid):
+        print(f"Another cockpit supervisor (pid {registry.supervisor_pid}) is running.", file=sys.stderr)
+        return 1
+    gateway = None
+    if gateway_port is not None:
+        gateway = Gateway(lambda: registry.apps, config["gateway_host"], gateway_port)
+    print(f"Starting {', '.join(spec.name for spec in specs)} (Ctrl-C to stop)", flush=True)
+    run_supervisor(
+        specs,
+        restart=restart,
+        registry=registry,
+        health_interval=health_interval or float(config["health_interval"]),
+        health_timeout=float(config["health_timeout"]),
+        zygote=zygote,
+        sample_interval=float(config["sample_interval"]),
+        gateway=gateway,
+    )
+    return 0
+
+
+def bench_launch(entry: dict[str, str], config: dict, runs: int = 3) -> int:
+    """Measure launch-to-healthy time for one app in spawn and fork mode."""
+    specs = build_specs([entry], "spawn")
+    if not specs:
+        return 1
+    spec = specs[0]
+    modes = ["spawn"]
+    if spec.python_executable is None and fork_supported():
+        modes.append("fork")
+
+    async def _run() -> dict[str, list[float]]:
+        results: dict[str, list[float]] = {mode: [] for mode in modes}
+        zygote = None
+        if "fork" in modes:
+            zygote = ZygoteClient(list(config["zygote_preload"]))
+            seconds = await zygote.start()
+            print(f"fork server ready in {seconds:.2f}s (preloaded {', '.join(zygote.preloaded) or 'nothing'})")
+        try:
+            for _ in range(runs):
+                for mode in modes:
+                    elapsed = await measure_launch(spec, mode, zygote)
+                    if elapsed is not None:
+                        results[mode].append(elapsed)
+        finally:
+            if zygote is not None:
+                await zygote.stop()
+        return results
+
+    results = asyncio.run(_run())
+    print(f"Launch-to-healthy for {spec.name} over {runs} run(s):")
+    for mode, samples in results.items():
+        if not samples:
+            print(f"  {mode:<6} failed")
+            continue
+        mean = sum(samples) / len(samples)
+        print(f"  {mode:<6} mean {mean * 1000:8.1f} ms   min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+    return 0 if all(results.values()) else 1
+
+
+def bench_serve(entry: dict[str, str], modes: list[str], concurrency: int = 32,
+                duration: float = 10.0) -> int:
+    """Load-test an app's health endpoint in each server mode."""
+    specs = build_specs([entry], "spawn")
+    if not specs:
+        return 1
+    spec = specs[0]
+    base_config = spec.config
+
+    async def _run() -> dict[str, dict | None]:
+        results: dict[str, dict | None] = {}
+        for mode in modes:
+            spec.config = replace(base_config, server=mode)
+            result: dict = {}
+
+            async def load(host: str, port: int) -> None:
+                result.update(await run_load(host, port, spec.config.health_path, concurrency, duration))
+
+            print(f"{mode}: {concurrency} clients for {duration:.0f}s...", flush=True)
+            await measure_launch(spec, "spawn", on_healthy=load)
+            results[mode] = result or None
+        return results
+
+    results = asyncio.run(_run())
+    print(f"\n{spec.name} GET {base_config.health_path}, {concurrency} keep-alive clients:")
+    print(f"  {'MODE':<9} {'REQ/S':>9} {'P50 ms':>8} {'P90 ms':>8} {'P99 ms':>8} {'MAX ms':>8} {'ERRORS':>7} {'CONNS':>6}")
+    for mode, result in results.items():
+        if result is None:
+            print(f"  {mode:<9} failed")
+            continue
+        print(f"  {mode:<9} {result['rps']:>9.1f} {result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f} {result['errors']:>7} {result['connections']:>6}")
+    return 0 if all(results.values()) else 1
+
+
+def run_gateway(config: dict, port: int | None = None) -> int:
+    """Run the gateway on its own, routing from the registry file."""
+    routes = RegistryRoutes(registry_path(config))
+    gateway = Gateway(routes, config["gateway_host"], port if port is not None else int(config["gateway_port"]))
+    try:
+        asyncio.run(serve_forever(gateway))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def bench_gateway(entry: dict[str, str], concurrency: int = 32, duration: float = 10.0) -> int:
+    """Compare load-test results for an app accessed directly and through the gateway."""
+    specs = build_specs([entry], "spawn")
+    if not specs:
+        return 1
+    spec = specs[0]
+    path = spec.config.health_path
+    results: dict[str, dict] = {}
+
+    async def load(host: str, port: int) -> None:
+        print(f"direct: {concurrency} clients for {duration:.0f}s...", flush=True)
+        results["direct"] = await run_load(host, port, path, concurrency, duration)
+        # The gateway runs in its own process so it does not share the load generator's loop.
+        gateway_port = assign_port(host)
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, str(Path(__file__).resolve().parent / "gateway.py"),
+            "--host", host, "--port", str(gateway_port), "--route", f"{spec.name}={host}:{port}",
+            stdout=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            probe = KeepAliveProbe(host, gateway_port, "/_gateway/stats", timeout=1.0)
+            for _ in range(100):
+                try:
+                    await probe.check()
+                    break
+                except ProbeError:
+                    await asyncio.sleep(0.05)
+            await probe.close()
+            print(f"gateway: {concurrency} clients for {duration:.0f}s...", flush=True)
+            results["gateway"] = await run_load(host, gateway_port, f"/apps/{spec.name}{path}",
+                                                concurrency, duration)
+        finally:
+            proc.terminate()
+            await proc.wait()
+
+    asyncio.run(measure_launch(spec, "spawn", on_healthy=load))
+    if len(results) < 2:
+        print("Benchmark failed.")
+        return 1
+    print(f"\n{spec.name} GET {path}, {concurrency} keep-alive clients:")
+    print(f"  {'ROUTE':<9} {'REQ/S':>9} {'P50 ms':>8} {'P90 ms':>8} {'P99 ms':>8} {'ERRORS':>7}")
+    for label, result in results.items():
+        print(f"  {label:<9} {result['rps']:>9.1f} {result['p50_ms']:>8.2f} {result['p90_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['errors']:>7}")
+    direct, via = results["direct"], results["gateway"]
+    print(f"  overhead: p50 {via['p50_ms'] - direct['p50_ms']:+.2f} ms, p99 {via['p99_ms'] - direct['p99_ms']:+.2f} ms, "
+          f"throughput {((via['rps'] / direct['rps']) - 1) * 100 if direct['rps'] else 0:+.1f}%")
+    return 0
+
+
+def reload_app(name: str, config: dict) -> int:
+    """Gracefully recycle a gunicorn-served app's workers (no dropped requests).
+
+    New workers fork from the running master and so run the code it loaded
+    at start; this does not deploy code changes.
+    """
+    registry = Registry.load(registry_path(config))
+    record = registry.apps.get(name)
+    if record is None or not record.pid or not pid_alive(registry.supervisor_pid):
+        print(f"'{name}' is not running under the cockpit.", file=sys.stderr)
+        return 1
+    server = record.extra.get("server", "dev")
+    if server != "gunicorn" or not hasattr(signal, "SIGHUP"):
+        print(f"'{name}' runs in {server} mode, which has no graceful reload; restart it instead.",
+              file=sys.stderr)
+        return 1
+    os.kill(record.pid, signal.SIGHUP)
+    print(f"Sent reload to {name} (pid {record.pid}).")
+    return 0
+
+
+def _format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{secs:02d}s"
+
+
+def _format_ms(value: float | None) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def _format_mb(value: float | None) -> str:
+    return "-" if value is None else f"{value / 2 ** 20:.1f}"
+
+
+SPARK_CHARS = " ▁▂▃▄▅▆▇█"
+
+
+def _sparkline(values: list[float], width: int = 30) -> str:
+    """Render the last ``width`` values as a one-line bar chart."""
+    values = values[-width:]
+    if not values:
+        return ""
+    top = max(max(values), 1e-9)
+    return "".join(SPARK_CHARS[round(v / top * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+def show_status(config: dict) -> int:
+    """Print the registry written by a running (or the last) ``up`` session."""
+    registry = Registry.load(registry_path(config))
+    if not registry.apps:
+        print("No miniapps registered. Start some with 'cockpit.py up'.")
+        return 0
+    running = pid_alive(registry.supervisor_pid)
+    if running:
+        age = time.time() - (registry.updated_at or 0)
+        print(f"Supervisor pid {registry.supervisor_pid}, registry updated {age:.0f}s ago")
+    else:
+        print("Supervisor not running; showing last known state")
+    header = (
+        f"{'NAME':<20} {'STATUS':<10} {'PID':>7} {'ADDRESS':<22} {'LAT ms':>7} {'AVG ms':>7} "
+        f"{'UPTIME':>8} {'RESTARTS':>8} {'CHECKS':>7} {'FAILS':>6} {'CONNS':>5} {'MODE':>5} {'READY ms':>9} "
+        f"{'CPU%':>6} {'RSS MB':>8}"
+    )
+    print(header)
+    now = time.time()
+    for record in registry.apps.values():
+        status = record.status if running else "stopped"
+        resources = record.resources if running and record.pid else {}
+        print(
+            f"{record.name:<20} {status:<10} {record.pid or '-':>7} "
+            f"{record.host + ':' + str(record.port):<22} "
+            f"{_format_ms(record.last_latency_ms):>7} {_format_ms(record.avg_latency_ms):>7} "
+            f"{_format_duration(record.uptime(now) if running else None):>8} "
+            f"{record.restarts:>8} {record.checks:>7} {record.failures:>6} {record.connections_opened:>5} "
+            f"{record.launch_mode:>5} {_format_ms(record.launch_to_healthy_ms):>9} "
+            f"{_format_ms(resources.get('cpu_percent')):>6} {_format_mb(resources.get('rss_bytes')):>8}"
+        )
+        if running and record.last_error:
+            print(f"{'':<20} last error: {record.last_error}")
+    if running and registry.gateway:
+        gateway = registry.gateway
+        print(f"\nGateway {gateway['address']}/apps/<name>/ ({gateway['client_connections']} client connections)")
+        print(f"{'ROUTE':<20} {'REQUESTS':>9} {'5XX':>6} {'RPS 1m':>7} {'AVG ms':>7} {'P99 ms':>7} "
+              f"{'IN KB':>8} {'OUT KB':>8} {'UP CONNS':>8}")
+        for name, route in gateway["routes"].items():
+            print(f"{name:<20} {route['requests']:>9} {route['errors']:>6} {route['rps_1m']:>7.1f} "
+                  f"{_format_ms(route['avg_ms']):>7} {_format_ms(route['p99_ms']):>7} "
+                  f"{route['bytes_in'] / 1024:>8.1f} {route['bytes_out'] / 1024:>8.1f} {route['upstream_opened']:>8}")
+    return 0
+
+
+def show_top(config: dict, interval: float = 1.0, once: bool = False) -> int:
+    """Continuously display per-app resource usage from the registry."""
+    path = registry_path(config)
+    try:
+        while True:
+            registry = Registry.load(path)
+            if not pid_alive(registry.supervisor_pid):
+                print("Supervisor not running. Start apps with 'cockpit.py up'.")
+                return 1
+            lines = [
+                f"cockpit top - supervisor pid {registry.supervisor_pid}, "
+                f"sampling cost {_format_ms(registry.sampler_ms)} ms/round",
+                "",
+                f"{'NAME':<20} {'PID':>7} {'CPU%':>6} {'AVG%':>6} {'RSS MB':>8} {'MAX MB':>8} "
+                f"{'FDS':>5} {'THR':>5} {'PROCS':>5}  CPU (last 60 samples)",
+            ]
+            for record in registry.apps.values():
+                res = record.resources if record.pid else {}
+                lines.append(
+                    f"{record.name:<20} {record.pid or '-':>7} {_format_ms(res.get('cpu_percent')):>6} "
+                    f"{_format_ms(res.get('cpu_avg')):>6} {_format_mb(res.get('rss_bytes')):>8} "
+                    f"{_format_mb(res.get('rss_max')):>8} {res.get('fds', '-'):>5} "
+                    f"{res.get('threads', '-'):>5} {res.get('procs', '-'):>5}  "
+                    f"{_sparkline(res.get('recent_cpu', []))}"
+                )
+            if once:
+                print("\n".join(lines))
+                return 0
+            # Clear the screen and redraw in place.
+            sys.stdout.write("\x1b[H\x1b[2J" + "\n".join(lines) + "\n")
+            sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        return 0
+
+
 def main(argv: list[str]) -> int:
     parser = argparse.ArgumentParser(description="Qi miniapps cockpit")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -114,11 +552,46 @@ def main(argv: list[str]) -> int:
     subparsers.add_parser("list", help="list available miniapps")
     run_parser = subparsers.add_parser("run", help="run a miniapp by name")
     run_parser.add_argument("name", help="name of the miniapp to run")
+    up_parser = subparsers.add_parser("up", help="run several miniapps concurrently")
+    up_parser.add_argument("names", nargs="*", help="miniapps to start (default: all)")
+    up_parser.add_argument("--no-restart", action="store_true", help="do not restart apps that exit")
+    up_parser.add_argument("--health-interval", type=float, default=None,
+                           help="seconds between health checks (default: from config)")
+    up_parser.add_argument("--fork", dest="launch_mode", action="store_const", const="fork", default=None,
+                           help="fork apps from a warm, preloaded interpreter (POSIX only)")
+    up_parser.add_argument("--gateway", action="store_true",
+                           help="also serve all apps under /apps/<name>/ on the gateway port")
+    up_parser.add_argument("--gateway-port", type=int, default=None,
+                           help="gateway port (default: from config); implies --gateway")
+    up_parser.add_argument("--server", choices=SERVER_MODES, default=None,
+                           help="serve every app in this mode instead of its config.json setting")
+    bench_parser = subparsers.add_parser("bench-launch", help="measure launch-to-healthy time per launch mode")
+    bench_parser.add_argument("name", help="name of the miniapp to measure")
+    bench_parser.add_argument("--runs", type=int, default=3, help="launches per mode (default: 3)")
+    serve_parser = subparsers.add_parser("bench-serve", help="load-test an app in each server mode")
+    serve_parser.add_argument("name", help="name of the miniapp to load-test")
+    serve_parser.add_argument("--modes", default=",".join(SERVER_MODES),
+                              help="comma separated server modes (default: all)")
+    serve_parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients (default: 32)")
+    serve_parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode (default: 10)")
+    gateway_parser = subparsers.add_parser("gateway", help="serve all running miniapps on one port")
+    gateway_parser.add_argument("--port", type=int, default=None, help="port to listen on (default: from config)")
+    bench_gw_parser = subparsers.add_parser("bench-gateway", help="compare gateway and direct access to an app")
+    bench_gw_parser.add_argument("name", help="name of the miniapp to load-test")
+    bench_gw_parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients (default: 32)")
+    bench_gw_parser.add_argument("--duration", type=float, default=10.0, help="seconds per run (default: 10)")
+    reload_parser = subparsers.add_parser("reload", help="gracefully recycle the workers of a gunicorn-served miniapp (no code reload)")
+    reload_parser.add_argument("name", help="name of the miniapp to reload")
+    subparsers.add_parser("status", help="show ports, health and restarts of supervised miniapps")
+    top_parser = subparsers.add_parser("top", help="live CPU, memory, file and thread usage per miniapp")
+    top_parser.add_argument("--interval", type=float, default=1.0, help="refresh interval in seconds")
+    top_parser.add_argument("--once", action="store_true", help="print one snapshot and exit")
 
     args = parser.parse_args(argv)
 
     manifest_path = Path(__file__).resolve().parent.parent / "miniapps.json"
     manifest = load_manifest(manifest_path)
+    config = load_config(Path(__file__).resolve().parent / "config.json")
 
     if args.command == "list":
         list_apps(manifest)
@@ -130,6 +603,51 @@ def main(argv: list[str]) -> int:
             return 1
         run_app(entry)
         return 0
+    if args.command == "up":
+        gateway_port = args.gateway_port
+        if gateway_port is None and args.gateway:
+            gateway_port = int(config["gateway_port"])
+        entries = []
+        for name in args.names or [e.get("name", "") for e in manifest]:
+            entry = find_miniapp(manifest, name)
+            if entry is None:
+                print(f"Miniapp '{name}' not found.")
+                return 1
+            entries.append(entry)
+        return up_apps(entries, config, restart=not args.no_restart,
+                       health_interval=args.health_interval, launch_mode=args.launch_mode,
+                       server=args.server, gateway_port=gateway_port)
+    if args.command == "bench-launch":
+        entry = find_miniapp(manifest, args.name)
+        if entry is None:
+            print(f"Miniapp '{args.name}' not found.")
+            return 1
+        return bench_launch(entry, config, args.runs)
+    if args.command == "bench-serve":
+        entry = find_miniapp(manifest, args.name)
+        if entry is None:
+            print(f"Miniapp '{args.name}' not found.")
+            return 1
+        modes = [m for m in args.modes.split(",") if m]
+        unknown = [m for m in modes if m not in SERVER_MODES]
+        if unknown:
+            print(f"Unknown server mode(s): {', '.join(unknown)}")
+            return 1
+        return bench_serve(entry, modes, args.concurrency, args.duration)
+    if args.command == "gateway":
+        return run_gateway(config, args.port)
+    if args.command == "bench-gateway":
+        entry = find_miniapp(manifest, args.name)
+        if entry is None:
+            print(f"Miniapp '{args.name}' not found.")
+            return 1
+        return bench_gateway(entry, args.concurrency, args.duration)
+    if args.command == "reload":
+        return reload_app(args.name, config)
+    if args.command == "status":
+        return show_status(config)
+    if args.command == "top":
+        return show_top(config, args.interval, args.once)
     return 1
 
 
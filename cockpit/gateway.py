@@ -0,0 +1,621 @@
+"""Single-port HTTP gateway in front of all cockpit-managed miniapps.
+
+Every registered app is reachable under ``/apps/<name>/...`` on one port; the
+prefix is stripped before the request is forwarded, so an app sees the same
+paths as when it is accessed directly. ``/`` lists the routes and
+``/_gateway/stats`` returns per-route counters as JSON.
+
+Design points:
+
+* requests only go to apps whose registry status is ``healthy``; anything
+  else gets ``503`` with ``Retry-After`` instead of a connection error;
+* each app has a pool of idle keep-alive upstream connections that are
+  reused across client requests, so a proxied request normally costs no
+  extra TCP handshake. A request that fails on a reused connection before
+  any byte was forwarded (the app closed it while idle) is retried once on
+  a fresh connection;
+* request and response bodies are copied chunk by chunk with ``drain()``
+  after every write, so large or streaming responses (chunked, or
+  read-until-close which is re-chunked for the client) pass through without
+  being buffered and a slow client slows the app instead of growing memory;
+* per-route counters: requests, 5xx, bytes in/out, in-flight, latency
+  histogram (p50/p90/p99) and request rate over the last minute.
+
+Like :mod:`health`, the gateway speaks HTTP/1.1 directly on asyncio streams
+and has no dependencies. It runs inside ``cockpit up --gateway`` (using the
+live registry) or standalone via ``cockpit gateway`` (reloading
+``registry.json`` when it changes).
+
+Usage::
+
+    python gateway.py [--port 8080] [--registry registry.json]
+    python gateway.py --route name=127.0.0.1:5000   # static route, for benchmarks
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from registry import DEFAULT_REGISTRY_PATH, AppRecord, Registry, pid_alive
+
+ROUTE_PREFIX = "/apps/"
+STATS_PATH = "/_gateway/stats"
+COPY_CHUNK_SIZE = 64 * 1024
+MAX_HEAD_SIZE = 64 * 1024
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+# Headers that describe one connection and must not be forwarded.
+HOP_BY_HOP = frozenset({
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade", "expect",
+})
+REASONS = {400: "Bad Request", 404: "Not Found", 431: "Request Header Fields Too Large",
+           502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class UpstreamError(Exception):
+    """Raised when an app cannot be reached or does not answer in time."""
+
+
+# --------------------------------------------------------------------------
+# HTTP/1.1 framing helpers
+# --------------------------------------------------------------------------
+
+@dataclass
+class MessageHead:
+    """Parsed start line and headers of a request or response."""
+
+    start: list[str]
+    headers: list[tuple[str, str]]
+    version: str = "HTTP/1.1"
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        name = name.lower()
+        for key, value in reversed(self.headers):
+            if key.lower() == name:
+                return value
+        return default
+
+    def has_token(self, name: str, token: str) -> bool:
+        value = self.get(name)
+        return value is not None and token in (t.strip().lower() for t in value.split(","))
+
+
+def parse_head(data: bytes, request: bool) -> MessageHead:
+    lines = data.decode("latin-1").split("\r\n")
+    start = lines[0].split(" ", 2)
+    if len(start) < 2:
+        raise ValueError(f"malformed start line {lines[0]!r}")
+    version = start[2] if request and len(start) == 3 else start[0]
+    if not version.startswith("HTTP/1."):
+        raise ValueError(f"unsupported protocol {version!r}")
+    headers = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(":")
+        if not sep or not name or name != name.strip():
+            raise ValueError(f"malformed header {line!r}")
+        headers.append((name, value.strip()))
+    return MessageHead(start, headers, version)
+
+
+def wants_keep_alive(head: MessageHead) -> bool:
+    if head.version == "HTTP/1.0":
+        return head.has_token("connection", "keep-alive")
+    return not head.has_token("connection", "close")
+
+
+def body_framing(head: MessageHead) -> tuple[str, int]:
+    """Return ``("chunked", 0)``, ``("length", n)`` or ``("none", 0)``."""
+    if head.has_token("transfer-encoding", "chunked"):
+        return "chunked", 0
+    length = head.get("content-length")
+    if length is not None:
+        n = int(length)
+        if n < 0:
+            raise ValueError("negative Content-Length")
+        return ("length", n) if n else ("none", 0)
+    return "none", 0
+
+
+async def copy_length(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, remaining: int) -> int:
+    copied = 0
+    while remaining:
+        data = await reader.read(min(remaining, COPY_CHUNK_SIZE))
+        if not data:
+            raise asyncio.IncompleteReadError(b"", remaining)
+        writer.write(data)
+        await writer.drain()
+        remaining -= len(data)
+        copied += len(data)
+    return copied
+
+
+async def copy_chunked(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, dechunk: bool = False) -> int:
+    """Copy a chunked body as it arrives; with ``dechunk`` only the payload is written."""
+    copied = 0
+    while True:
+        size_line = await reader.readuntil(b"\r\n")
+        size = int(size_line.split(b";", 1)[0], 16)
+        if not dechunk:
+            writer.write(size_line)
+        if size == 0:
+            # Trailers (usually none) end with an empty line.
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                if not dechunk:
+                    writer.write(line)
+                if line == b"\r\n":
+                    break
+            await writer.drain()
+            return copied
+        copied += await copy_length(reader, writer, size)
+        crlf = await reader.readexactly(2)
+        if not dechunk:
+            writer.write(crlf)
+
+
+async def copy_until_eof(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, chunked: bool) -> int:
+    """Copy a read-until-close body, optionally re-framing it as chunked."""
+    copied = 0
+    while True:
+        data = await reader.read(COPY_CHUNK_SIZE)
+        if not data:
+            break
+        writer.write(b"%x\r\n%b\r\n" % (len(data), data) if chunked else data)
+        await writer.drain()
+        copied += len(data)
+    if chunked:
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+    return copied
+
+
+# --------------------------------------------------------------------------
+# Upstream connection pool and counters
+# --------------------------------------------------------------------------
+
+class UpstreamPool:
+    """Idle keep-alive connections to one app."""
+
+    def __init__(self, host: str, port: int, max_idle: int = 32, connect_timeout: float = 5.0) -> None:
+        self.host = host
+        self.port = port
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+        self.opened = 0
+        self.reused = 0
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def acquire(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        """Return ``(reader, writer, reused)``, preferring an idle connection."""
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer, True
+            writer.close()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, limit=MAX_HEAD_SIZE), self.connect_timeout
+            )
+        except asyncio.TimeoutError:
+            raise UpstreamError(f"connect to {self.host}:{self.port} timed out")
+        except OSError as exc:
+            raise UpstreamError(f"cannot connect to {self.host}:{self.port}: {exc.strerror or exc}")
+        self.opened += 1
+        return reader, writer, False
+
+    def release(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if len(self._idle) < self.max_idle and not writer.is_closing():
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+@dataclass
+class RouteStats:
+    """Counters for one route (app)."""
+
+    requests: int = 0
+    errors: int = 0  # 5xx responses, from the app or the gateway
+    in_flight: int = 0
+    bytes_in: int = 0  # request bodies forwarded to the app
+    bytes_out: int = 0  # response bodies forwarded to clients
+    latency_total_ms: float = 0.0
+    latency_max_ms: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    # Requests per wall-clock second over the last minute: slot -> (second, count).
+    _recent: list[list[int]] = field(default_factory=lambda: [[0, 0] for _ in range(60)])
+
+    def record(self, status: int, latency_ms: float, bytes_in: int, bytes_out: int) -> None:
+        self.requests += 1
+        if status >= 500:
+            self.errors += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.latency_total_ms += latency_ms
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        second = int(time.time())
+        slot = self._recent[second % 60]
+        if slot[0] != second:
+            slot[0], slot[1] = second, 0
+        slot[1] += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound (ms) of the histogram bucket holding the given percentile."""
+        if not self.requests:
+            return None
+        rank = fraction * self.requests
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (self.latency_max_ms,), self.buckets):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.latency_max_ms), 2)
+        return round(self.latency_max_ms, 2)
+
+    def rate(self, window: int = 60) -> float:
+        """Average requests per second over the last ``window`` (<= 60) seconds."""
+        now = int(time.time())
+        return sum(count for second, count in self._recent if now - second < window) / window
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "rps_1m": round(self.rate(), 2),
+            "avg_ms": round(self.latency_total_ms / self.requests, 2) if self.requests else None,
+            "p50_ms": self.percentile(0.50),
+            "p90_ms": self.percentile(0.90),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.latency_max_ms, 2),
+        }
+
+
+# --------------------------------------------------------------------------
+# Gateway
+# --------------------------------------------------------------------------
+
+class Gateway:
+    """Reverse proxy serving every app under ``/apps/<name>/``."""
+
+    def __init__(self, routes: Callable[[], dict[str, AppRecord]], host: str = "127.0.0.1",
+                 port: int = 8080, max_idle_per_app: int = 32, upstream_timeout: float = 60.0,
+                 idle_timeout: float = 60.0) -> None:
+        self.routes = routes
+        self.host = host
+        self.port = port
+        self.max_idle_per_app = max_idle_per_app
+        self.upstream_timeout = upstream_timeout
+        self.idle_timeout = idle_timeout
+        self.started_at = time.time()
+        self.connections = 0
+        self.route_stats: dict[str, RouteStats] = {}
+        self._pools: dict[tuple[str, int], UpstreamPool] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port, limit=MAX_HEAD_SIZE)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for pool in self._pools.values():
+            pool.close()
+
+    def stats(self) -> dict:
+        return {
+            "address": f"http://{self.host}:{self.port}",
+            "uptime": round(time.time() - self.started_at, 1),
+            "client_connections": self.connections,
+            "routes": {
+                name: {**stats.snapshot(), **self._pool_counts(name)}
+                for name, stats in sorted(self.route_stats.items())
+            },
+        }
+
+    def _pool_counts(self, name: str) -> dict:
+        record = self.routes().get(name)
+        pool = self._pools.get((record.host, record.port)) if record else None
+        if pool is None:
+            return {"upstream_opened": 0, "upstream_reused": 0}
+        return {"upstream_opened": pool.opened, "upstream_reused": pool.reused}
+
+    def _pool(self, record: AppRecord) -> UpstreamPool:
+        key = (record.host, record.port)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = UpstreamPool(record.host, record.port, self.max_idle_per_app)
+        return pool
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        peer = writer.get_extra_info("peername")
+        client_ip = peer[0] if isinstance(peer, tuple) else ""
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "request head too large"})
+                    break
+                try:
+                    request = parse_head(data, request=True)
+                    framing = body_framing(request)
+                except ValueError as exc:
+                    await self._respond(writer, 400, {"error": str(exc)})
+                    break
+                if not await self._dispatch(request, framing, reader, writer, client_ip):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: MessageHead, framing: tuple[str, int], reader: asyncio.StreamReader,
+                        writer: asyncio.StreamWriter, client_ip: str) -> bool:
+        """Handle one request; return whether the client connection stays open."""
+        keep_alive = wants_keep_alive(request)
+        # Local responses do not read a request body, so the connection cannot be reused.
+        local_keep_alive = keep_alive and framing[0] == "none"
+        target = request.start[1]
+        path, _, query = target.partition("?")
+        if path in ("/", "/_gateway"):
+            await self._respond(writer, 200, self._index(), local_keep_alive)
+            return local_keep_alive
+        if path == STATS_PATH:
+            await self._respond(writer, 200, self.stats(), local_keep_alive)
+            return local_keep_alive
+        if not path.startswith(ROUTE_PREFIX):
+            await self._respond(writer, 404, {"error": "unknown path; apps are served under /apps/<name>/"},
+                                local_keep_alive)
+            return local_keep_alive
+
+        name, _, rest = path[len(ROUTE_PREFIX):].partition("/")
+        record = self.routes().get(name)
+        if record is None:
+            await self._respond(writer, 404, {"error": f"no app named {name!r}"}, local_keep_alive)
+            return local_keep_alive
+        stats = self.route_stats.setdefault(name, RouteStats())
+        if record.status != "healthy":
+            stats.record(503, 0.0, 0, 0)
+            await self._respond(writer, 503, {"error": f"{name} is {record.status}"}, local_keep_alive,
+                                extra_headers=[("Retry-After", "1")])
+            return local_keep_alive
+
+        upstream_target = "/" + rest + ("?" + query if query else "")
+        started = time.perf_counter()
+        stats.in_flight += 1
+        status, bytes_in, bytes_out = 502, 0, 0
+        try:
+            status, bytes_in, bytes_out, keep_alive = await self._proxy(
+                request, framing, upstream_target, name, record, reader, writer, client_ip, keep_alive
+            )
+        except UpstreamError as exc:
+            status = 504 if "timed out" in str(exc) else 502
+            await self._respond(writer, status, {"error": str(exc)}, keep_alive=False)
+            keep_alive = False
+        finally:
+            stats.in_flight -= 1
+            stats.record(status, (time.perf_counter() - started) * 1000.0, bytes_in, bytes_out)
+        return keep_alive
+
+    async def _proxy(self, request: MessageHead, framing: tuple[str, int], target: str, name: str,
+                     record: AppRecord, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                     client_ip: str, keep_alive: bool) -> tuple[int, int, int, bool]:
+        """Forward one request and stream the response back.
+
+        Returns ``(status, bytes_in, bytes_out, client_keep_alive)``.
+        """
+        prefix = ROUTE_PREFIX + name
+        headers = [(k, v) for k, v in request.headers if k.lower() not in HOP_BY_HOP]
+        forwarded_for = request.get("x-forwarded-for")
+        headers = [(k, v) for k, v in headers if k.lower() not in ("x-forwarded-for", "x-forwarded-prefix")]
+        headers += [
+            ("X-Forwarded-For", f"{forwarded_for}, {client_ip}" if forwarded_for else client_ip),
+            ("X-Forwarded-Prefix", prefix),
+            ("Connection", "keep-alive"),
+        ]
+        if framing[0] == "chunked":
+            headers.append(("Transfer-Encoding", "chunked"))
+        head = f"{request.start[0]} {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers) + "\r\n"
+        if request.has_token("expect", "100-continue") and framing[0] != "none":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        pool = self._pool(record)
+        bytes_in = 0
+        for attempt in range(2):
+            up_reader, up_writer, reused = await pool.acquire()
+            try:
+                up_writer.write(head.encode("latin-1"))
+                if framing[0] == "length":
+                    bytes_in = await copy_length(reader, up_writer, framing[1])
+                elif framing[0] == "chunked":
+                    bytes_in = await copy_chunked(reader, up_writer)
+                await up_writer.drain()
+                response_data = await asyncio.wait_for(up_reader.readuntil(b"\r\n\r\n"), self.upstream_timeout)
+                break
+            except asyncio.TimeoutError:
+                up_writer.close()
+                raise UpstreamError(f"{name} timed out after {self.upstream_timeout:.0f}s")
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError) as exc:
+                up_writer.close()
+                # An idle pooled connection may have been closed by the app; nothing
+                # was forwarded yet, so a bodiless request can safely be retried.
+                if reused and attempt == 0 and framing[0] == "none":
+                    continue
+                raise UpstreamError(f"{name}: {exc.__class__.__name__}: {exc}")
+
+        try:
+            response = parse_head(response_data, request=False)
+            status = int(response.start[1])
+            resp_framing = body_framing(response)
+        except ValueError as exc:
+            up_writer.close()
+            raise UpstreamError(f"{name} sent an invalid response: {exc}")
+        no_body = request.start[0] == "HEAD" or status in (204, 304) or 100 <= status < 200
+        until_eof = not no_body and response.get("content-length") is None and resp_framing[0] != "chunked"
+        upstream_reusable = wants_keep_alive(response) and not until_eof
+        client_http11 = request.version == "HTTP/1.1"
+
+        out_headers = [(k, v) for k, v in response.headers if k.lower() not in HOP_BY_HOP]
+        location = response.get("location")
+        if location and location.startswith("/"):
+            # Keep redirects inside the app's prefix.
+            out_headers = [(k, prefix + v if k.lower() == "location" else v) for k, v in out_headers]
+        dechunk = False
+        rechunk = False
+        if not no_body and resp_framing[0] == "chunked":
+            if client_http11:
+                out_headers.append(("Transfer-Encoding", "chunked"))
+            else:
+                dechunk, keep_alive = True, False
+        elif until_eof:
+            if client_http11:
+                out_headers.append(("Transfer-Encoding", "chunked"))
+                rechunk = True
+            else:
+                keep_alive = False
+        out_headers.append(("Connection", "keep-alive" if keep_alive else "close"))
+        reason = response.start[2] if len(response.start) > 2 else ""
+        writer.write(
+            (f"{request.version} {status} {reason}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in out_headers)
+             + "\r\n").encode("latin-1")
+        )
+
+        bytes_out = 0
+        try:
+            if not no_body:
+                if resp_framing[0] == "chunked":
+                    bytes_out = await copy_chunked(up_reader, writer, dechunk=dechunk)
+                elif resp_framing[0] == "length":
+                    bytes_out = await copy_length(up_reader, writer, resp_framing[1])
+                elif until_eof:
+                    bytes_out = await copy_until_eof(up_reader, writer, chunked=rechunk)
+            await writer.drain()
+        except BaseException:
+            # Half-forwarded response: neither side can be reused.
+            up_writer.close()
+            raise
+        if upstream_reusable:
+            pool.release(up_reader, up_writer)
+        else:
+            up_writer.close()
+        return status, bytes_in, bytes_out, keep_alive
+
+    def _index(self) -> dict:
+        return {
+            "routes": {
+                name: {"path": f"{ROUTE_PREFIX}{name}/", "status": record.status, "upstream": record.url}
+                for name, record in sorted(self.routes().items())
+            }
+        }
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, body: dict, keep_alive: bool = False,
+                       extra_headers: Optional[list[tuple[str, str]]] = None) -> None:
+        payload = json.dumps(body, indent=2).encode("utf-8")
+        headers = [("Content-Type", "application/json"), ("Content-Length", str(len(payload))),
+                   ("Connection", "keep-alive" if keep_alive else "close")] + (extra_headers or [])
+        head = f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers)
+        writer.write(head.encode("latin-1") + b"\r\n" + payload)
+        await writer.drain()
+
+
+class RegistryRoutes:
+    """Routes read from ``registry.json``, reloaded when the file changes."""
+
+    def __init__(self, path: Path = DEFAULT_REGISTRY_PATH, check_interval: float = 1.0) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._apps: dict[str, AppRecord] = {}
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+
+    def __call__(self) -> dict[str, AppRecord]:
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            try:
+                mtime = self.path.stat().st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self._mtime = mtime
+                registry = Registry.load(self.path)
+                if not pid_alive(registry.supervisor_pid):
+                    for record in registry.apps.values():
+                        record.status = "stopped"
+                self._apps = registry.apps
+        return self._apps
+
+
+def static_routes(specs: list[str]) -> Callable[[], dict[str, AppRecord]]:
+    """Routes from ``name=host:port`` strings, always considered healthy."""
+    apps = {}
+    for spec in specs:
+        name, _, address = spec.partition("=")
+        host, _, port = address.rpartition(":")
+        apps[name] = AppRecord(name=name, host=host or "127.0.0.1", port=int(port), status="healthy")
+    return lambda: apps
+
+
+async def serve_forever(gateway: Gateway) -> None:
+    """Run ``gateway`` until SIGINT/SIGTERM."""
+    await gateway.start()
+    print(f"Gateway listening on http://{gateway.host}:{gateway.port}/apps/<name>/", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        await stop.wait()
+    finally:
+        await gateway.stop()
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Qi cockpit gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--registry", default=str(DEFAULT_REGISTRY_PATH), help="registry file to route from")
+    parser.add_argument("--route", action="append", default=[], metavar="NAME=HOST:PORT",
+                        help="static route instead of the registry (repeatable)")
+    args = parser.parse_args(argv)
+    routes = static_routes(args.route) if args.route else RegistryRoutes(Path(args.registry))
+    try:
+        asyncio.run(serve_forever(Gateway(routes, args.host, args.port)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
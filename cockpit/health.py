@@ -0,0 +1,167 @@
+"""Active health polling for cockpit-managed miniapps.
+
+Each app gets one :class:`KeepAliveProbe`, which holds a single persistent
+HTTP/1.1 connection and reuses it for every ``GET /health`` request. A new
+connection is only opened after the previous one failed or was closed by
+the server, so polling dozens of apps every few seconds costs one request
+per app per interval rather than a TCP handshake each time.
+
+The probe speaks just enough HTTP/1.1 for a health endpoint (status line,
+headers, ``Content-Length`` or chunked bodies) on top of asyncio streams, so
+it runs inside the supervisor's event loop without extra threads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional
+
+from registry import AppRecord
+
+# Weight of the newest sample in the moving average latency.
+LATENCY_EWMA_ALPHA = 0.2
+# Poll interval while an app is starting, so launch-to-healthy time is precise.
+STARTUP_POLL_INTERVAL = 0.05
+
+
+class ProbeError(Exception):
+    """Raised when a health request fails or returns a non-2xx status."""
+
+
+class KeepAliveProbe:
+    """Issue GET requests to one app over a reused connection."""
+
+    def __init__(self, host: str, port: int, path: str = "/health", timeout: float = 2.0) -> None:
+        self.host = host
+        self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def check(self) -> float:
+        """Perform one health request; return its latency in milliseconds."""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._request(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise ProbeError(f"timed out after {self.timeout:.1f}s")
+        except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            await self.close()
+            raise ProbeError(str(exc) or exc.__class__.__name__)
+        return (time.perf_counter() - started) * 1000.0
+
+    async def close(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _request(self) -> None:
+        if self._writer is None or self._writer.is_closing():
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+            self.connections_opened += 1
+        reader, writer = self._reader, self._writer
+        writer.write(
+            f"GET {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Connection: keep-alive\r\n"
+            "\r\n".encode("ascii")
+        )
+        await writer.drain()
+
+        head = await reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        parts = status_line.split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ValueError(f"malformed status line {status_line!r}")
+        version, status = parts[0], int(parts[1])
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip().lower()
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+        if headers.get("transfer-encoding") == "chunked":
+            await self._skip_chunked(reader)
+        elif "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+        else:
+            await reader.read()
+            keep_alive = False
+        if not keep_alive:
+            await self.close()
+        if not 200 <= status < 300:
+            raise ProbeError(f"HTTP {status}")
+
+    @staticmethod
+    async def _skip_chunked(reader: asyncio.StreamReader) -> None:
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                return
+
+
+class HealthPoller:
+    """Poll one app periodically and record the results on its registry entry."""
+
+    def __init__(self, record: AppRecord, interval: float = 5.0, timeout: float = 2.0,
+                 unhealthy_after: int = 3, startup_grace: float = 60.0) -> None:
+        self.record = record
+        self.interval = interval
+        self.unhealthy_after = unhealthy_after
+        self.startup_grace = startup_grace
+        self.probe = KeepAliveProbe(record.host, record.port, record.health_path, timeout)
+
+    async def run(self) -> None:
+        try:
+            while True:
+                await self.poll_once()
+                starting = self.record.status == "starting"
+                await asyncio.sleep(STARTUP_POLL_INTERVAL if starting else self.interval)
+        finally:
+            await self.probe.close()
+
+    async def poll_once(self) -> None:
+        record = self.record
+        now = time.time()
+        try:
+            latency = await self.probe.check()
+        except ProbeError as exc:
+            record.last_error = str(exc)
+            if record.status == "starting":
+                # Not listening yet is expected right after launch; only give
+                # up on an app that stays unreachable for the whole grace period.
+                if now - (record.started_at or now) > self.startup_grace:
+                    record.status = "unhealthy"
+                return
+            record.checks += 1
+            record.last_check = now
+            record.failures += 1
+            record.consecutive_failures += 1
+            if record.consecutive_failures >= self.unhealthy_after:
+                record.status = "unhealthy"
+        else:
+            record.checks += 1
+            record.last_check = now
+            if record.status == "starting" and record.started_at is not None:
+                record.launch_to_healthy_ms = round((time.time() - record.started_at) * 1000.0, 1)
+            record.consecutive_failures = 0
+            record.last_error = None
+            record.status = "healthy"
+            record.last_latency_ms = round(latency, 2)
+            if record.avg_latency_ms is None:
+                record.avg_latency_ms = record.last_latency_ms
+            else:
+                record.avg_latency_ms = round(
+                    LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * record.avg_latency_ms, 2
+                )
+        record.connections_opened = self.probe.connections_opened
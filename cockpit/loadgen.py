@@ -0,0 +1,63 @@
+"""Minimal HTTP load generator for comparing miniapp server modes.
+
+Each simulated client is a :class:`~health.KeepAliveProbe` issuing GET
+requests back to back over one persistent connection, so the numbers reflect
+the server (and its keep-alive handling) rather than TCP handshakes. All
+clients run in one event loop; on a small machine the generator itself can
+become the bottleneck, so compare modes against each other rather than
+reading the absolute requests/sec as a capacity figure.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from health import KeepAliveProbe, ProbeError
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_load(host: str, port: int, path: str = "/health", concurrency: int = 32,
+                   duration: float = 10.0, timeout: float = 5.0) -> dict:
+    """Hammer ``path`` with ``concurrency`` keep-alive clients for ``duration`` seconds."""
+    latencies: list[float] = []
+    errors = 0
+    connections = 0
+    deadline = time.perf_counter() + duration
+
+    async def client() -> None:
+        nonlocal errors, connections
+        probe = KeepAliveProbe(host, port, path, timeout)
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    latencies.append(await probe.check())
+                except ProbeError:
+                    errors += 1
+                    await asyncio.sleep(0.01)
+        finally:
+            connections += probe.connections_opened
+            await probe.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "connections": connections,
+        "seconds": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p90_ms": round(percentile(latencies, 0.90), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
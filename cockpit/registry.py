@@ -0,0 +1,139 @@
+"""Port registry for cockpit-managed miniapps.
+
+The supervisor assigns every miniapp a port before launching it (see
+:func:`assign_port`), passes it in through the environment and records it,
+together with runtime state such as pid, restarts and health-check results,
+in a small JSON file. Other cockpit commands (``status``, the gateway) read
+that file instead of talking to the supervisor.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_REGISTRY_PATH = Path(__file__).resolve().parent / "registry.json"
+
+
+@dataclass
+class AppRecord:
+    """Registry entry for one miniapp."""
+
+    name: str
+    host: str
+    port: int
+    health_path: str = "/health"
+    pid: Optional[int] = None
+    status: str = "stopped"  # starting | healthy | unhealthy | stopped
+    started_at: Optional[float] = None  # wall-clock time of the current launch
+    restarts: int = 0
+    checks: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_check: Optional[float] = None
+    last_latency_ms: Optional[float] = None
+    avg_latency_ms: Optional[float] = None
+    connections_opened: int = 0
+    last_error: Optional[str] = None
+    launch_mode: str = "spawn"  # spawn | fork
+    launch_to_healthy_ms: Optional[float] = None
+    resources: dict = field(default_factory=dict)  # latest sample and window summary, see resources.py
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def uptime(self, now: Optional[float] = None) -> Optional[float]:
+        if self.started_at is None or self.status == "stopped":
+            return None
+        return (now or time.time()) - self.started_at
+
+
+class Registry:
+    """In-memory view of the registry file with atomic saves."""
+
+    def __init__(self, path: Path = DEFAULT_REGISTRY_PATH) -> None:
+        self.path = Path(path)
+        self.apps: dict[str, AppRecord] = {}
+        self.updated_at: Optional[float] = None
+        self.supervisor_pid: Optional[int] = None
+        self.sampler_ms: Optional[float] = None  # CPU time of the last resource sampling round
+        self.gateway: Optional[dict] = None  # address and per-route counters, see gateway.py
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_REGISTRY_PATH) -> "Registry":
+        """Load the registry file; a missing or corrupt file yields an empty registry."""
+        registry = cls(path)
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return registry
+        known = {f.name for f in fields(AppRecord)}
+        for raw in data.get("apps", []):
+            record = AppRecord(**{k: v for k, v in raw.items() if k in known})
+            registry.apps[record.name] = record
+        registry.updated_at = data.get("updated_at")
+        registry.supervisor_pid = data.get("supervisor_pid")
+        registry.sampler_ms = data.get("sampler_ms")
+        registry.gateway = data.get("gateway")
+        return registry
+
+    def save(self) -> None:
+        """Write the registry atomically (readers never see a partial file)."""
+        self.updated_at = time.time()
+        data = {
+            "updated_at": self.updated_at,
+            "supervisor_pid": self.supervisor_pid,
+            "sampler_ms": self.sampler_ms,
+            "gateway": self.gateway,
+            "apps": [asdict(record) for record in self.apps.values()],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def used_ports(self) -> set[int]:
+        return {record.port for record in self.apps.values() if record.port}
+
+
+def assign_port(host: str, requested: int = 0, taken: Optional[set[int]] = None) -> int:
+    """Return ``requested`` if set, otherwise a free port on ``host``.
+
+    Free ports come from the OS (bind to port 0) and skip any port already
+    handed to another app in ``taken``. There is an unavoidable window between
+    picking the port and the miniapp binding it; the supervisor simply
+    restarts an app that fails to bind.
+    """
+    if requested:
+        return requested
+    taken = taken or set()
+    for _ in range(20):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind((host, 0))
+            port = s.getsockname()[1]
+        if port not in taken:
+            return port
+    raise RuntimeError(f"Could not find a free port on {host}")
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    """Best-effort check whether a process id is still running."""
+    if not pid:
+        return False
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows; assume it is alive.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
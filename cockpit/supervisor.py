@@ -0,0 +1,523 @@
+"""Asyncio supervisor used by ``cockpit up``.
+
+The supervisor starts several miniapps at once, multiplexes their output to
+the terminal with a per-app prefix, restarts apps that exit unexpectedly
+(with exponential backoff) and shuts everything down on Ctrl-C.
+
+Output handling is split so that no child can stall another one or the
+event loop:
+
+* one reader task per app (:func:`shared.process_utils.pump_stream`) pulls
+  raw bytes from the child's pipe in large chunks, splits them into lines
+  and records them in the app's :class:`~shared.process_utils.OutputBuffer`
+  (a ring buffer of recent output that can be queried at any time);
+* a single writer thread owns the terminal. It is fed through one bounded
+  ``drop_newest`` subscription attached to every app's buffer, so if the
+  terminal cannot keep up lines are dropped (and counted per app) instead
+  of blocking the readers.
+
+When a :class:`~registry.Registry` is given, every app is assigned a port up
+front (from its :class:`~shared.config_schema.MiniAppConfig`), receives it
+through the ``QI_APP_HOST``/``QI_APP_PORT`` environment variables and is
+polled by a :class:`~health.HealthPoller`; the registry file is rewritten
+every poll interval so ``cockpit status`` can report on the running apps.
+
+While apps run, a sampler task reads CPU, memory, file descriptor and thread
+counts of every app's process tree from ``/proc`` once per
+``sample_interval`` (see :mod:`resources`), keeps a rolling history per app
+and applies the app's :class:`~resources.ResourceLimits`: a sustained breach
+of a warn limit is logged, one of a restart limit restarts the app.
+
+An optional :class:`~gateway.Gateway` is started alongside the apps and
+serves them all on one port; its counters are stored in the registry too.
+
+Apps whose spec asks for ``launch_mode="fork"`` are forked from a warm
+:class:`~zygote.ZygoteClient` instead of spawning a fresh interpreter; if the
+zygote is unavailable they fall back to a normal spawn.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, Optional, TextIO
+
+from gateway import Gateway
+from health import HealthPoller, KeepAliveProbe, ProbeError
+from registry import AppRecord, Registry, assign_port
+from resources import ResourceHistory, ResourceLimits, TreeSampler, proc_available
+from shared.config_schema import MiniAppConfig
+from zygote import ZygoteClient
+from shared.process_utils import (
+    DROP_NEWEST,
+    OutputBuffer,
+    OutputSubscription,
+    pump_stream,
+    start_subprocess_async,
+)
+
+# Recent output lines kept per app.
+OUTPUT_BUFFER_LINES = 1000
+
+
+@dataclass
+class AppSpec:
+    """Everything needed to launch one miniapp."""
+
+    name: str
+    cwd: str
+    entry: str
+    python_executable: Optional[str] = None
+    env: dict[str, str] = field(default_factory=dict)
+    config: Optional[MiniAppConfig] = None
+    launch_mode: str = "spawn"  # spawn | fork
+    limits: ResourceLimits = field(default_factory=ResourceLimits)
+
+
+@dataclass
+class AppState:
+    """Runtime bookkeeping for a supervised miniapp."""
+
+    spec: AppSpec
+    output: OutputBuffer
+    process: Optional[object] = None  # asyncio.subprocess.Process or zygote.ForkedProcess
+    started_at: Optional[float] = None
+    restarts: int = 0
+    last_exit_code: Optional[int] = None
+    record: Optional[AppRecord] = None
+    poller: Optional[HealthPoller] = None
+    resources: ResourceHistory = field(default_factory=ResourceHistory)
+    resource_alert: Optional[str] = None  # name of the limit currently breached
+
+
+class OutputMultiplexer:
+    """Write prefixed lines from many apps to one stream from a dedicated thread."""
+
+    def __init__(self, stream: TextIO = sys.stdout, max_pending: int = 10_000) -> None:
+        self._stream = stream
+        self.subscription = OutputSubscription(max_pending, DROP_NEWEST)
+        self._prefixes: dict[str, str] = {}
+        self._thread = threading.Thread(target=self._run, name="cockpit-output", daemon=True)
+
+    def add_source(self, buffer: OutputBuffer, prefix: str) -> None:
+        """Print every line appended to ``buffer`` with ``prefix``."""
+        self._prefixes[buffer.name] = prefix
+        buffer.attach(self.subscription)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def write(self, source: str, line: str) -> None:
+        """Queue a line for output; never blocks the caller."""
+        self.subscription.offer(source, [line])
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Flush pending lines and stop the writer thread."""
+        self.subscription.close()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        reported_drops = 0
+        while True:
+            item = self.subscription.get(timeout=0.5)
+            if item is None:
+                if self.subscription.closed and not len(self.subscription):
+                    return
+                continue
+            # Drain whatever else is ready so we write in batches.
+            batch = [item] + self.subscription.drain(999)
+            lines = [f"{self._prefixes.get(source, source)} {line}" for source, line in batch]
+            dropped = self.subscription.dropped
+            if dropped > reported_drops:
+                lines.append(f"[cockpit] {dropped - reported_drops} output lines dropped (terminal too slow)")
+                reported_drops = dropped
+            try:
+                self._stream.write("\n".join(lines) + "\n")
+                self._stream.flush()
+            except (OSError, ValueError):
+                pass
+
+
+class Supervisor:
+    """Run several miniapps concurrently and keep them alive."""
+
+    def __init__(
+        self,
+        specs: list[AppSpec],
+        restart: bool = True,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 30.0,
+        stable_after: float = 60.0,
+        shutdown_timeout: float = 5.0,
+        output: Optional[OutputMultiplexer] = None,
+        registry: Optional[Registry] = None,
+        health_interval: float = 5.0,
+        health_timeout: float = 2.0,
+        zygote: Optional[ZygoteClient] = None,
+        sample_interval: float = 1.0,
+        gateway: Optional[Gateway] = None,
+    ) -> None:
+        self.apps = {
+            spec.name: AppState(spec, OutputBuffer(spec.name, OUTPUT_BUFFER_LINES)) for spec in specs
+        }
+        self.restart = restart
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.shutdown_timeout = shutdown_timeout
+        self.output = output or OutputMultiplexer()
+        self.registry = registry
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.zygote = zygote
+        self.sample_interval = sample_interval
+        self.gateway = gateway
+        self._stopping = asyncio.Event()
+        width = max((len(name) for name in self.apps), default=0)
+        for name, state in self.apps.items():
+            self.output.add_source(state.output, f"[{name}]".ljust(width + 2))
+
+    def log(self, message: str) -> None:
+        self.output.write("[cockpit]", message)
+
+    def tail(self, name: str, n: int = 50) -> list[str]:
+        """Return the last ``n`` output lines of an app."""
+        return self.apps[name].output.tail(n)
+
+    def stop(self) -> None:
+        """Ask the supervisor to shut all apps down."""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Start every app and supervise until :meth:`stop` is called."""
+        self.output.start()
+        loop = asyncio.get_running_loop()
+        installed = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+                installed.append(sig)
+            except (NotImplementedError, RuntimeError):
+                # Windows: KeyboardInterrupt cancels run() instead.
+                pass
+        if self.zygote is not None:
+            await self._start_zygote()
+        if self.registry is not None:
+            self._register_apps()
+        if self.gateway is not None:
+            await self._start_gateway()
+        tasks = [asyncio.create_task(self._supervise(state)) for state in self.apps.values()]
+        if self.registry is not None:
+            tasks.append(asyncio.create_task(self._save_registry_periodically()))
+        if self.sample_interval > 0:
+            if proc_available():
+                tasks.append(asyncio.create_task(self._sample_resources()))
+            else:
+                self.log("/proc not available; resource sampling disabled")
+        stop_waiter = asyncio.create_task(self._stopping.wait())
+        try:
+            # Return when asked to stop, or when every app has exited for good
+            # (only possible with restart disabled).
+            app_tasks = asyncio.gather(*tasks[: len(self.apps)], return_exceptions=True)
+            await asyncio.wait([stop_waiter, app_tasks], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop_waiter.cancel()
+            self.log("shutting down...")
+            await self._shutdown_all()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.gateway is not None:
+                await self.gateway.stop()
+            if self.zygote is not None:
+                await self.zygote.stop()
+            for sig in installed:
+                loop.remove_signal_handler(sig)
+            if self.registry is not None:
+                self.registry.supervisor_pid = None
+                if self.gateway is not None:
+                    self.registry.gateway = self.gateway.stats()
+                self.registry.save()
+            self.log("all apps stopped")
+            self.output.close()
+
+    async def _supervise(self, state: AppState) -> None:
+        backoff = self.backoff_initial
+        while not self._stopping.is_set():
+            spec = state.spec
+            launched_at = time.time()
+            proc, mode = await self._launch(spec)
+            if proc is not None:
+                state.process = proc
+                state.started_at = time.monotonic()
+                self.log(f"{spec.name}: started (pid {proc.pid}, {mode})")
+                health_task = self._on_started(state, proc.pid, launched_at, mode)
+                try:
+                    if proc.stdout is not None:
+                        await pump_stream(proc.stdout, state.output)
+                    code = await proc.wait()
+                finally:
+                    if health_task is not None:
+                        health_task.cancel()
+                    self._on_exited(state)
+                state.last_exit_code = code
+                uptime = time.monotonic() - state.started_at
+                state.process = None
+                if self._stopping.is_set():
+                    return
+                self.log(f"{spec.name}: exited with code {code} after {uptime:.1f}s")
+                if uptime >= self.stable_after:
+                    backoff = self.backoff_initial
+            if not self.restart:
+                return
+            self.log(f"{spec.name}: restarting in {backoff:.1f}s")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=backoff)
+                return
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, self.backoff_max)
+            state.restarts += 1
+
+    async def _start_zygote(self) -> None:
+        if not any(state.spec.launch_mode == "fork" for state in self.apps.values()):
+            self.zygote = None
+            return
+        try:
+            seconds = await self.zygote.start()
+        except Exception as exc:  # noqa: BLE001 - fall back to spawning
+            self.log(f"fork server failed to start ({exc}); spawning apps instead")
+            self.zygote = None
+            return
+        preloaded = ", ".join(self.zygote.preloaded) or "nothing"
+        self.log(f"fork server ready in {seconds:.2f}s (preloaded {preloaded})")
+
+    async def _start_gateway(self) -> None:
+        try:
+            await self.gateway.start()
+        except OSError as exc:
+            self.log(f"gateway failed to start on {self.gateway.host}:{self.gateway.port}: {exc}")
+            self.gateway = None
+            return
+        self.log(f"gateway listening on http://{self.gateway.host}:{self.gateway.port}/apps/<name>/")
+
+    async def _launch(self, spec: AppSpec) -> tuple[Optional[object], str]:
+        """Start an app, forking from the zygote when requested and possible."""
+        if spec.launch_mode == "fork" and self.zygote is not None and spec.python_executable is None:
+            try:
+                return await self.zygote.spawn(spec.cwd, spec.entry, spec.env), "fork"
+            except (OSError, RuntimeError) as exc:
+                self.log(f"{spec.name}: fork failed ({exc}), spawning instead")
+        try:
+            return await start_subprocess_async(spec.cwd, spec.entry, spec.python_executable, spec.env), "spawn"
+        except OSError as exc:
+            self.log(f"{spec.name}: failed to start: {exc}")
+            return None, "spawn"
+
+    def _register_apps(self) -> None:
+        """Assign ports, build registry records and pass addresses via the environment."""
+        registry = self.registry
+        registry.supervisor_pid = os.getpid()
+        registry.apps = {}
+        for name, state in self.apps.items():
+            config = state.spec.config or MiniAppConfig(name=name)
+            config.port = assign_port(config.host, config.port, registry.used_ports())
+            state.spec.config = config
+            state.spec.env.update(config.env())
+            state.record = AppRecord(name=name, host=config.host, port=config.port,
+                                     health_path=config.health_path)
+            state.record.extra["server"] = config.server
+            state.poller = HealthPoller(state.record, self.health_interval, self.health_timeout)
+            registry.apps[name] = state.record
+        registry.save()
+
+    def _on_started(self, state: AppState, pid: int, launched_at: float, mode: str) -> Optional[asyncio.Task]:
+        record = state.record
+        if record is None:
+            return None
+        record.pid = pid
+        record.started_at = launched_at
+        record.launch_mode = mode
+        record.launch_to_healthy_ms = None
+        record.status = "starting"
+        record.restarts = state.restarts
+        record.consecutive_failures = 0
+        self.registry.save()
+        return asyncio.create_task(state.poller.run())
+
+    def _on_exited(self, state: AppState) -> None:
+        record = state.record
+        if record is None:
+            return
+        record.pid = None
+        record.status = "stopped"
+        self.registry.save()
+
+    async def _save_registry_periodically(self) -> None:
+        interval = self.health_interval
+        if self.sample_interval > 0 and proc_available():
+            interval = min(interval, self.sample_interval)
+        while True:
+            await asyncio.sleep(interval)
+            if self.gateway is not None:
+                self.registry.gateway = self.gateway.stats()
+            self.registry.save()
+
+    async def _sample_resources(self) -> None:
+        """Sample every running app once per interval and enforce its limits."""
+        sampler = TreeSampler()
+        while True:
+            started = time.perf_counter()
+            sampler.begin_tick()
+            for state in self.apps.values():
+                proc = state.process
+                if proc is None or proc.returncode is not None:
+                    continue
+                sample = sampler.sample(proc.pid)
+                if sample is None:
+                    continue
+                state.resources.add(sample)
+                if state.record is not None:
+                    state.record.resources = state.resources.summary()
+                self._check_limits(state)
+            sampler.end_tick()
+            if self.registry is not None:
+                cost_ms = (time.perf_counter() - started) * 1000.0
+                self.registry.sampler_ms = round(cost_ms, 3)
+            await asyncio.sleep(self.sample_interval)
+
+    def _check_limits(self, state: AppState) -> None:
+        action, limit, message = state.spec.limits.check(state.resources)
+        name = state.spec.name
+        if action is None:
+            if state.resource_alert is not None:
+                self.log(f"{name}: back within resource limits")
+            state.resource_alert = None
+            return
+        if limit != state.resource_alert:
+            self.log(f"{name}: {message}" + (", restarting" if action == "restart" else ""))
+        state.resource_alert = limit
+        if action == "restart" and state.process is not None and state.process.returncode is None:
+            # Fresh history for the next run, so the old samples cannot retrigger.
+            state.resources = ResourceHistory(state.resources.timestamps.capacity)
+            state.resource_alert = None
+            try:
+                _signal_group(state.process)
+            except ProcessLookupError:
+                pass
+
+    async def _shutdown_all(self) -> None:
+        await asyncio.gather(
+            *(self._terminate(state) for state in self.apps.values()),
+            return_exceptions=True,
+        )
+
+    async def _terminate(self, state: AppState) -> None:
+        proc = state.process
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            _signal_group(proc)
+        except ProcessLookupError:
+            return
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            self.log(f"{state.spec.name}: did not exit after {self.shutdown_timeout:.0f}s, killing")
+            try:
+                _signal_group(proc, kill=True)
+            except ProcessLookupError:
+                return
+            await proc.wait()
+
+
+def _signal_group(proc, kill: bool = False) -> None:
+    """Terminate (or kill) an app together with its children.
+
+    Apps are started in their own session, so on POSIX the whole process
+    group is signalled and helpers an app spawned do not outlive it (or keep
+    its output pipe open). Elsewhere only the app itself is signalled.
+    """
+    if hasattr(os, "killpg"):
+        os.killpg(proc.pid, signal.SIGKILL if kill else signal.SIGTERM)
+    elif kill:
+        proc.kill()
+    else:
+        proc.terminate()
+
+
+async def measure_launch(spec: AppSpec, mode: str = "spawn", zygote: Optional[ZygoteClient] = None,
+                         timeout: float = 120.0,
+                         on_healthy: Optional[Callable[[str, int], Awaitable[None]]] = None) -> Optional[float]:
+    """Launch ``spec`` once and return seconds until its health check passes.
+
+    If given, ``on_healthy(host, port)`` is awaited once the app is healthy
+    (e.g. to load-test it). The app is stopped again afterwards. Returns ``None`` (after printing the
+    tail of its output) if it exits or never becomes healthy within ``timeout``.
+    """
+    config = spec.config or MiniAppConfig(name=spec.name)
+    host = config.host
+    port = assign_port(host, config.port)
+    env = dict(spec.env)
+    env.update(replace(config, port=port).env())
+    buffer = OutputBuffer(spec.name, 50)
+    probe = KeepAliveProbe(host, port, config.health_path, timeout=1.0)
+
+    started = time.perf_counter()
+    if mode == "fork":
+        if zygote is None:
+            raise ValueError("fork mode needs a running ZygoteClient")
+        proc = await zygote.spawn(spec.cwd, spec.entry, env)
+    else:
+        proc = await start_subprocess_async(spec.cwd, spec.entry, spec.python_executable, env)
+    pump = asyncio.create_task(pump_stream(proc.stdout, buffer))
+    elapsed = None
+    try:
+        while time.perf_counter() - started < timeout and not pump.done():
+            try:
+                await probe.check()
+            except ProbeError:
+                await asyncio.sleep(0.02)
+                continue
+            elapsed = time.perf_counter() - started
+            break
+        await probe.close()
+        if elapsed is not None and on_healthy is not None:
+            await on_healthy(host, port)
+    finally:
+        await probe.close()
+        try:
+            _signal_group(proc)
+        except ProcessLookupError:
+            pass
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=10.0)
+        except asyncio.TimeoutError:
+            _signal_group(proc, kill=True)
+            await proc.wait()
+        pump.cancel()
+    if elapsed is None:
+        print(f"{spec.name} ({mode}) never became healthy; last output:")
+        for line in buffer.tail(20):
+            print(f"    {line}")
+    return elapsed
+
+
+def run_supervisor(specs: list[AppSpec], **kwargs) -> None:
+    """Run a :class:`Supervisor` for ``specs`` until interrupted."""
+
+    async def _main() -> None:
+        supervisor = Supervisor(specs, **kwargs)
+        await supervisor.run()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        # Only reached where signal handlers are unavailable (Windows); run()
+        # has already shut the apps down from its finally block.
+        pass
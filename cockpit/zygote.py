@@ -0,0 +1,364 @@
+"""Fork server ("zygote") that launches miniapps from a warm interpreter.
+
+Starting a miniapp normally means a fresh ``sys.executable`` that imports
+Flask, FastAPI, qdrant_client... from scratch, which
+can take seconds. In fork mode the cockpit starts this module once as a
+long-lived process that imports those heavy modules up front and then
+``fork()``s a child per launch request, so each miniapp starts with the
+imports already in memory (shared copy-on-write).
+
+Protocol (over a Unix domain socket, one connection per launched app):
+
+1. the cockpit sends one JSON line ``{"cwd", "entry", "env"}`` together with
+   the write end of a pipe (``SCM_RIGHTS``) that becomes the child's
+   stdout/stderr;
+2. the zygote forks, replies ``{"pid": <pid>}`` and keeps the connection;
+3. when the child exits the zygote sends ``{"exit": <code>}`` and closes
+   the connection. If the cockpit closes the connection first, the child
+   is terminated.
+
+Fork mode is POSIX only and only suitable for apps that run on the
+cockpit's own interpreter; apps with their own virtualenv are spawned
+normally. Preloaded modules must be fork-safe: importing them is fine, but
+they must not start worker threads before the fork.
+
+Usage (normally started by the cockpit)::
+
+    python zygote.py SOCKET_PATH [--preload flask,fastapi,...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from typing import Optional
+
+# Imported by the zygote before it starts forking; missing modules are skipped.
+# torch / sentence_transformers are deliberately absent: torch may start
+# OpenMP / intra-op threads on import, which is not safe across fork(). Add
+# them to ``zygote_preload`` only after checking that for your build.
+DEFAULT_PRELOAD = [
+    "flask",
+    "fastapi",
+    "pydantic",
+    "uvicorn",
+    "requests",
+    "yaml",
+    "qdrant_client",
+]
+
+
+# --------------------------------------------------------------------------
+# Server side (runs inside the zygote process)
+# --------------------------------------------------------------------------
+
+def preload(modules: list[str]) -> list[str]:
+    """Import ``modules``; return the ones that were available."""
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as exc:  # noqa: BLE001 - any import failure just skips the module
+            print(f"[zygote] skipping {name}: {exc.__class__.__name__}: {exc}", file=sys.stderr, flush=True)
+        else:
+            loaded.append(name)
+    return loaded
+
+
+def _run_child(request: dict, out_fd: int) -> None:
+    """Turn the freshly forked process into the requested miniapp. Never returns."""
+    code = 1
+    try:
+        os.setsid()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        os.dup2(out_fd, 1)
+        os.dup2(out_fd, 2)
+        os.close(out_fd)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        sys.stdout.reconfigure(line_buffering=True, write_through=True)
+        sys.stderr.reconfigure(line_buffering=True, write_through=True)
+
+        cwd = request["cwd"]
+        entry = request["entry"]
+        os.chdir(cwd)
+        os.environ.update(request.get("env") or {})
+        sys.argv = [entry]
+        sys.path[0] = cwd
+        runpy.run_path(entry, run_name="__main__")
+        code = 0
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:  # noqa: BLE001 - report anything the app raised
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(socket_path: str, modules: list[str]) -> None:
+    """Preload modules, then fork a child for every request on ``socket_path``."""
+    loaded = preload(modules)
+    parent = os.getppid()
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener.bind(socket_path)
+    listener.listen(64)
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    children: dict[int, socket.socket] = {}
+    print(json.dumps({"ready": True, "preloaded": loaded}), flush=True)
+
+    def handle_request(conn: socket.socket) -> None:
+        conn.settimeout(5.0)
+        data, fds, _, _ = socket.recv_fds(conn, 65536, 1)
+        if not data or not fds:
+            conn.close()
+            return
+        request = json.loads(data.decode("utf-8"))
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            selector.close()
+            listener.close()
+            for other in children.values():
+                other.close()
+            conn.close()
+            _run_child(request, fds[0])
+        os.close(fds[0])
+        conn.sendall(json.dumps({"pid": pid}).encode("utf-8") + b"\n")
+        conn.setblocking(False)
+        children[pid] = conn
+        selector.register(conn, selectors.EVENT_READ, pid)
+
+    try:
+        while True:
+            for key, _ in selector.select(timeout=0.2):
+                if key.fileobj is listener:
+                    conn, _ = listener.accept()
+                    try:
+                        handle_request(conn)
+                    except (OSError, ValueError) as exc:
+                        print(f"[zygote] bad request: {exc}", file=sys.stderr, flush=True)
+                        conn.close()
+                    continue
+                # Activity on a child's control connection: the cockpit hung up.
+                try:
+                    closed = key.fileobj.recv(1) == b""
+                except BlockingIOError:
+                    closed = False
+                except OSError:
+                    closed = True
+                if closed:
+                    selector.unregister(key.fileobj)
+                    try:
+                        os.killpg(key.data, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+            _reap(children, selector)
+            if os.getppid() != parent:
+                break
+    finally:
+        for pid in list(children):
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+
+def _reap(children: dict[int, socket.socket], selector: selectors.BaseSelector) -> None:
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            selector.unregister(conn)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.setblocking(True)
+            conn.sendall(json.dumps({"exit": os.waitstatus_to_exitcode(status)}).encode("utf-8") + b"\n")
+        except OSError:
+            pass
+        conn.close()
+
+
+# --------------------------------------------------------------------------
+# Client side (used by the cockpit supervisor)
+# --------------------------------------------------------------------------
+
+def fork_supported() -> bool:
+    return hasattr(os, "fork") and hasattr(socket, "send_fds")
+
+
+class ForkedProcess:
+    """Handle for a zygote child, mirroring ``asyncio.subprocess.Process``."""
+
+    def __init__(self, pid: int, stdout: asyncio.StreamReader, control: asyncio.StreamReader,
+                 control_writer: asyncio.StreamWriter) -> None:
+        self.pid = pid
+        self.stdout = stdout
+        self.returncode: Optional[int] = None
+        self._control = control
+        self._control_writer = control_writer
+        self._waiter: Optional[asyncio.Task] = None
+
+    async def wait(self) -> int:
+        """Wait for the child to exit; safe to call from several tasks at once."""
+        if self._waiter is None:
+            self._waiter = asyncio.ensure_future(self._read_exit())
+        return await asyncio.shield(self._waiter)
+
+    async def _read_exit(self) -> int:
+        line = await self._control.readline()
+        try:
+            self.returncode = int(json.loads(line)["exit"])
+        except (ValueError, KeyError):
+            # Zygote died. The child has its own session (setsid), so it is
+            # still running: kill its group before reporting the exit, or a
+            # restarted copy would collide with the orphan over the port.
+            try:
+                os.killpg(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self.returncode = -signal.SIGKILL
+        self._control_writer.close()
+        return self.returncode
+
+    def send_signal(self, sig: int) -> None:
+        if self.returncode is not None:
+            return
+        os.killpg(self.pid, sig)
+
+    def terminate(self) -> None:
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self) -> None:
+        self.send_signal(signal.SIGKILL)
+
+
+class ZygoteClient:
+    """Start a zygote process and request forks from it."""
+
+    def __init__(self, preload_modules: Optional[list[str]] = None) -> None:
+        self.preload_modules = preload_modules if preload_modules is not None else DEFAULT_PRELOAD
+        self.preloaded: list[str] = []
+        self.socket_path = os.path.join(tempfile.mkdtemp(prefix="qi-zygote-"), "zygote.sock")
+        self._process: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self, python_executable: Optional[str] = None, timeout: float = 120.0) -> float:
+        """Start the zygote and wait until its preloads finish; return seconds taken."""
+        started = time.perf_counter()
+        self._process = await asyncio.create_subprocess_exec(
+            python_executable or sys.executable, os.path.abspath(__file__), self.socket_path,
+            "--preload", ",".join(self.preload_modules),
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+        line = await asyncio.wait_for(self._process.stdout.readline(), timeout=timeout)
+        if not line:
+            raise RuntimeError("zygote exited during startup")
+        self.preloaded = json.loads(line).get("preloaded", [])
+        return time.perf_counter() - started
+
+    async def spawn(self, cwd: str, entry: str, env: Optional[dict[str, str]] = None) -> ForkedProcess:
+        """Fork a miniapp from the zygote."""
+        if self._process is None or self._process.returncode is not None:
+            raise RuntimeError("zygote is not running")
+        loop = asyncio.get_running_loop()
+        child_env = {"PYTHONUNBUFFERED": "1"}
+        child_env.update(env or {})
+        request = json.dumps({"cwd": cwd, "entry": entry, "env": child_env}).encode("utf-8")
+
+        read_fd, write_fd = os.pipe()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+            socket.send_fds(sock, [request], [write_fd])
+        except OSError:
+            sock.close()
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        stdout = asyncio.StreamReader(limit=2 ** 20)
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(stdout), os.fdopen(read_fd, "rb", buffering=0)
+        )
+        control, control_writer = await asyncio.open_unix_connection(sock=sock)
+        reply = await control.readline()
+        try:
+            pid = int(json.loads(reply)["pid"])
+        except (ValueError, KeyError):
+            control_writer.close()
+            raise RuntimeError("zygote did not report a pid")
+        return ForkedProcess(pid, stdout, control, control_writer)
+
+    async def stop(self) -> None:
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        try:
+            os.rmdir(os.path.dirname(self.socket_path))
+        except OSError:
+            pass
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Qi cockpit fork server")
+    parser.add_argument("socket_path")
+    parser.add_argument("--preload", default=",".join(DEFAULT_PRELOAD),
+                        help="comma separated modules to import before forking")
+    args = parser.parse_args(argv)
+    # The cockpit decides when apps stop; a terminal Ctrl-C must not reach us.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        serve(args.socket_path, [m for m in args.preload.split(",") if m])
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,87 +1,366 @@
 import os
+import sys
+import gzip
+import json
+import hashlib
+import time
+import queue
+import threading
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def print_directory_tree(root_dir, show_files=True, max_depth=None, current_depth=0, prefix='', log_file=None, include_hidden=True, exclude_dirs=None):
+# Directories skipped by default (any directory whose name contains one of these)
+DEFAULT_EXCLUDE_DIRS = [
+    'venv', '__pycache__', 'data', 'logs',
+    '.git', '.vscode', '.idea', '.pytest_cache',
+    '.venv', '.DS_Store', '.env', '.env.local',
+    '.env.development.local', '.env.test.local',
+    '.env.production.local', 'Empty_Folders',
+    '.docusaurus', '.docusaurus-plugin-content-docs-current',
+    # Node / frontend bloat
+    'node_modules', '.node_modules',
+    # Tools/programs we don't want
+    'mpc-hc', 'losslesscut', 'OCR', 'pdf-main', 'my-pdf-main',
+    # Tests (ignore any folder containing these patterns)
+    'test', 'tests', '__tests__',
+    # Plugins and cache
+    'plugins', '.local'
+]
+
+SNAPSHOT_VERSION = 1
+
+
+def is_excluded(name, exclude_dirs):
+    """Return True if a directory name matches or contains any exclude pattern."""
+    lowered = name.lower()
+    return any(ex.lower() in lowered for ex in exclude_dirs)
+
+
+class SimulatedLatencyFS:
     """
-    Recursively prints the directory tree structure up to the specified depth and writes to a log file.
+    Filesystem stand-in that delegates to os but sleeps before every stat/scandir.
+
+    Used by --benchmark to mimic rclone/Dropbox/SMB mounts, where every call is a
+    network round trip, on top of a local tree.
     """
-    if exclude_dirs is None:
-        exclude_dirs = [
-            'venv', '__pycache__', 'data', 'logs',
-            '.git', '.vscode', '.idea', '.pytest_cache',
-            '.venv', '.DS_Store', '.env', '.env.local',
-            '.env.development.local', '.env.test.local',
-            '.env.production.local', 'Empty_Folders',
-            '.docusaurus', '.docusaurus-plugin-content-docs-current',
-            # Node / frontend bloat
-            'node_modules', '.node_modules',
-            # Tools/programs we don't want
-            'mpc-hc', 'losslesscut', 'OCR', 'pdf-main', 'my-pdf-main',
-            # Tests (ignore any folder containing these patterns)
-            'test', 'tests', '__tests__',
-            # Plugins and cache
-            'plugins', '.local'
-        ]
 
-    if max_depth is not None and current_depth >= max_depth:
-        return
+    def __init__(self, latency):
+        self.latency = latency
 
+    def stat(self, path):
+        time.sleep(self.latency)
+        return os.stat(path)
+
+    def scandir(self, path):
+        time.sleep(self.latency)
+        return os.scandir(path)
+
+
+def scan_directory(path, exclude_dirs, fs=os):
+    """
+    Lists a single directory and returns a snapshot node for it.
+
+    The node holds the directory mtime (nanoseconds), the sorted names of the files
+    and the sorted child directory nodes. Child nodes are created unlisted (no
+    "dirs"/"files" keys); the caller decides whether to descend into them.
+    """
+    name = os.path.basename(path.rstrip(os.sep)) or path
     try:
-        # Get the list of items in the directory
-        items = os.listdir(root_dir)
+        mtime = fs.stat(path).st_mtime_ns
+        with fs.scandir(path) as it:
+            entries = list(it)
     except PermissionError:
-        message = prefix + "└── [Permission Denied]"
-        print(message)
-        if log_file:
-            log_file.write(message + "\n")
-        return
+        return {"name": name, "error": "Permission Denied"}
     except FileNotFoundError:
-        message = prefix + "└── [Directory Not Found]"
-        print(message)
-        if log_file:
-            log_file.write(message + "\n")
-        return
+        return {"name": name, "error": "Directory Not Found"}
 
-    # Sort items: directories first, then files
-    items = sorted(items, key=lambda s: s.lower())
-    directories = [item for item in items if os.path.isdir(os.path.join(root_dir, item))]
-    files = [item for item in items if not os.path.isdir(os.path.join(root_dir, item))]
+    dirs = []
+    files = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir:
+            if not is_excluded(entry.name, exclude_dirs):
+                # Symlinked directories are shown but never descended into,
+                # which keeps link cycles from recursing forever.
+                dirs.append({"name": entry.name, "link": True} if entry.is_symlink() else {"name": entry.name})
+        else:
+            files.append(entry.name)
 
-    # Exclude directories that match or contain any exclude pattern
-    directories = [
-        item for item in directories
-        if not any(ex.lower() in item.lower() for ex in exclude_dirs)
-    ]
+    dirs.sort(key=lambda d: d["name"].lower())
+    files.sort(key=lambda s: s.lower())
+    return {
+        "name": name,
+        "mtime": mtime,
+        "dirs": dirs,
+        "files": files,
+    }
 
-    # Show files or just folders
-    items = directories if not show_files else directories + files
 
-    for index, item in enumerate(items):
-        if not include_hidden and item.startswith('.'):
-            continue
+def _visit_directory(path, cached, exclude_dirs, fs):
+    """
+    Returns (node, reused) for path, reusing cached when its mtime is unchanged.
+
+    A directory's mtime only changes when entries are added, removed or renamed
+    directly inside it, so an unchanged directory keeps its cached listing and
+    costs a single stat.
+    """
+    if cached and "dirs" in cached:
+        try:
+            if fs.stat(path).st_mtime_ns == cached.get("mtime"):
+                node = {
+                    "name": cached["name"],
+                    "mtime": cached["mtime"],
+                    "dirs": [
+                        {"name": child["name"], "link": True} if child.get("link") else {"name": child["name"]}
+                        for child in cached["dirs"]
+                    ],
+                    "files": cached["files"],
+                }
+                return node, True
+        except OSError:
+            pass
+    return scan_directory(path, exclude_dirs, fs), False
+
+
+def build_snapshot(root_dir, max_depth=None, exclude_dirs=None, previous=None, stats=None,
+                   workers=8, timeout=None, fs=os):
+    """
+    Builds a snapshot tree for root_dir, reusing unchanged parts of a previous snapshot.
+
+    Directories are visited by a pool of `workers` threads: as soon as a directory
+    is listed, all of its subdirectories are queued, so siblings are listed
+    concurrently. This matters on network mounts where each listdir is a round
+    trip. The tree is assembled in sorted order, so the output does not depend on
+    completion order. A directory that takes longer than `timeout` seconds is
+    recorded as "[Timed Out]" (its worker thread is abandoned, not interrupted).
+    Directories at max_depth are recorded by name only and left unlisted.
+
+    Returns the snapshot dict (header + "root" node). If stats is a dict it is
+    filled with "listed", "reused", "timed_out", "seconds" and "dirs_per_sec".
+    """
+    if exclude_dirs is None:
+        exclude_dirs = DEFAULT_EXCLUDE_DIRS
+    if stats is None:
+        stats = {}
+    stats.update(listed=0, reused=0, timed_out=0)
+    root_dir = os.path.abspath(root_dir)
+
+    prev_root = None
+    if previous and previous.get("version") == SNAPSHOT_VERSION \
+            and previous.get("root_dir") == root_dir \
+            and previous.get("exclude_dirs") == list(exclude_dirs):
+        prev_root = previous.get("root")
+
+    started_at = {}
+    completed = queue.Queue()
+    pending = {}
+    # Keys whose directory a worker is still listing (guarded by lock)
+    in_flight = set()
+    lock = threading.Lock()
+
+    def visit(key, path, cached):
+        started_at[key] = time.monotonic()
+        try:
+            outcome = (key, _visit_directory(path, cached, exclude_dirs, fs), None)
+        except Exception as exc:
+            outcome = (key, None, exc)
+        with lock:
+            in_flight.discard(key)
+        completed.put(outcome)
+
+    def submit(pool, slots, index, path, cached, depth):
+        if max_depth is not None and depth >= max_depth:
+            return
+        key = (id(slots), index)
+        pending[key] = (slots, index, path, cached, depth)
+        with lock:
+            in_flight.add(key)
+        pool.submit(visit, key, path, cached)
+
+    started = time.monotonic()
+    root_name = os.path.basename(root_dir.rstrip(os.sep)) or root_dir
+    holder = [{"name": root_name}]
 
-        path = os.path.join(root_dir, item)
-        # Determine tree connector style
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        submit(pool, holder, 0, root_dir, prev_root, 0)
+        poll = None if timeout is None else min(timeout / 4.0, 0.05)
+        next_check = time.monotonic() + (poll or 0)
+        while pending:
+            try:
+                key, result, error = completed.get(timeout=poll)
+            except queue.Empty:
+                key = None
+            if key is not None and key in pending:
+                slots, index, path, cached, depth = pending.pop(key)
+                started_at.pop(key, None)
+                if error is not None:
+                    raise error
+                node, reused = result
+                stats["reused" if reused else "listed"] += 1
+                slots[index] = node
+                cached_children = {}
+                if cached and "dirs" in cached:
+                    cached_children = {child["name"]: child for child in cached["dirs"]}
+                for child_index, child in enumerate(node.get("dirs", [])):
+                    if child.get("link"):
+                        continue
+                    submit(pool, node["dirs"], child_index, os.path.join(path, child["name"]),
+                           cached_children.get(child["name"]), depth + 1)
+            if timeout is not None and time.monotonic() >= next_check:
+                # Results already queued are not timed out: only directories
+                # still being listed by a worker are checked.
+                now = time.monotonic()
+                next_check = now + poll
+                for key in [k for k, began in list(started_at.items()) if now - began > timeout]:
+                    del started_at[key]
+                    with lock:
+                        if key not in in_flight:
+                            continue
+                        in_flight.discard(key)
+                    slots, index = pending.pop(key)[:2]
+                    slots[index] = {"name": slots[index]["name"], "error": "Timed Out"}
+                    stats["timed_out"] += 1
+    finally:
+        pool.shutdown(wait=not stats["timed_out"], cancel_futures=True)
+
+    elapsed = time.monotonic() - started
+    visited = stats["listed"] + stats["reused"]
+    stats["seconds"] = elapsed
+    stats["dirs_per_sec"] = visited / elapsed if elapsed > 0 else float(visited)
+    return {
+        "version": SNAPSHOT_VERSION,
+        "root_dir": root_dir,
+        "exclude_dirs": list(exclude_dirs),
+        "max_depth": max_depth,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "root": holder[0],
+    }
+
+
+def run_benchmark(root_dir, max_depth=None, workers=8, latency=0.02):
+    """
+    Compares serial and concurrent traversal of root_dir under simulated latency.
+
+    Every stat/scandir is delayed by `latency` seconds to stand in for a network
+    mount. Both runs must produce identical trees.
+    """
+    fs = SimulatedLatencyFS(latency)
+    results = {}
+    trees = {}
+    for label, count in (("serial", 1), (f"{workers} workers", workers)):
+        stats = {}
+        snapshot = build_snapshot(root_dir, max_depth, stats=stats, workers=count, fs=fs)
+        trees[label] = snapshot["root"]
+        results[label] = stats
+        print(f"{label:>12}: {stats['seconds']:.2f}s, "
+              f"{stats['listed'] + stats['reused']} directories, {stats['dirs_per_sec']:.1f} dirs/sec")
+    serial, concurrent = results.values()
+    if len({json.dumps(tree, sort_keys=True) for tree in trees.values()}) != 1:
+        print("WARNING: serial and concurrent trees differ")
+    if concurrent["seconds"] > 0:
+        print(f"Speedup: {serial['seconds'] / concurrent['seconds']:.1f}x "
+              f"at {latency * 1000:.0f} ms simulated latency per call")
+    return results
+
+
+def default_snapshot_path(root_dir):
+    """Returns the default cache location for the snapshot of root_dir."""
+    root_dir = os.path.abspath(root_dir)
+    digest = hashlib.sha1(root_dir.encode("utf-8")).hexdigest()[:12]
+    base = "".join(c for c in os.path.basename(root_dir) if c.isalnum() or c in ('_', '-')) or "root"
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "directory_mapper")
+    return os.path.join(cache_dir, f"{base}_{digest}.json.gz")
+
+
+def load_snapshot(path):
+    """Loads a gzip-compressed JSON snapshot, or returns None if it is missing or unreadable."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(snapshot, path):
+    """Writes a snapshot as compact gzip-compressed JSON (atomically replaces path)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _visible_children(node, show_files, include_hidden):
+    """Returns (name, child_node_or_None) pairs for a node in display order."""
+    items = [(d["name"], d) for d in node.get("dirs", [])]
+    if show_files:
+        items += [(f, None) for f in node.get("files", [])]
+    if not include_hidden:
+        items = [item for item in items if not item[0].startswith('.')]
+    return items
+
+
+def iter_tree_lines(node, show_files=True, include_hidden=True, prefix=''):
+    """Yields the ASCII tree lines for a snapshot node ("├── " / "└── " connectors)."""
+    if "error" in node:
+        yield prefix + f"└── [{node['error']}]"
+        return
+    items = _visible_children(node, show_files, include_hidden)
+    for index, (name, child) in enumerate(items):
         if index == len(items) - 1:
-            connector = '└── '
-            extension = '    '
+            connector, extension = '└── ', '    '
         else:
-            connector = '├── '
-            extension = '│   '
+            connector, extension = '├── ', '│   '
+        yield prefix + connector + name
+        if child is not None:
+            yield from iter_tree_lines(child, show_files, include_hidden, prefix + extension)
+
 
-        # Print and log
-        message = prefix + connector + item
-        print(message)
-        if log_file:
-            log_file.write(message + "\n")
+def iter_records(node, show_files=True, include_hidden=True, rel_path='', depth=0):
+    """Yields one flat record per entry of a snapshot node (used for NDJSON output)."""
+    if "error" in node:
+        yield {"path": rel_path, "type": "error", "depth": depth, "error": node["error"]}
+        return
+    for name, child in _visible_children(node, show_files, include_hidden):
+        path = f"{rel_path}/{name}" if rel_path else name
+        if child is None:
+            yield {"path": path, "type": "file", "depth": depth}
+            continue
+        record = {"path": path, "type": "dir", "depth": depth}
+        if child.get("link"):
+            record["link"] = True
+        if "mtime" in child:
+            record["mtime"] = child["mtime"]
+        yield record
+        yield from iter_records(child, show_files, include_hidden, path, depth + 1)
+
+
+def filter_tree(node, show_files=True, include_hidden=True):
+    """Returns a nested, display-filtered copy of a snapshot node (used for JSON output)."""
+    if "error" in node:
+        return {"name": node["name"], "error": node["error"]}
+    result = {"name": node["name"]}
+    if node.get("link"):
+        result["link"] = True
+    if "dirs" in node:
+        result["dirs"] = [
+            filter_tree(child, show_files, include_hidden)
+            for name, child in _visible_children(node, False, include_hidden)
+        ]
+    if show_files and "files" in node:
+        result["files"] = [
+            name for name in node["files"]
+            if include_hidden or not name.startswith('.')
+        ]
+    return result
 
-        # Recurse into directories
-        if os.path.isdir(path):
-            print_directory_tree(path, show_files, max_depth, current_depth + 1,
-                                 prefix + extension, log_file, include_hidden, exclude_dirs)
 
-def create_log_file(filename_prefix, suffix=""):
+def create_log_file(filename_prefix, suffix="", extension=".txt"):
     """Creates a timestamped log file in Downloads."""
     downloads_dir = os.path.join(os.path.expanduser("~"), "Downloads")
 
@@ -91,38 +370,109 @@ def create_log_file(filename_prefix, suffix=""):
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     base_log_file_name = f"{sanitized_prefix}_{timestamp}{suffix}"
-    log_file_name = f"{base_log_file_name}.txt"
+    log_file_name = f"{base_log_file_name}{extension}"
     log_file_path = os.path.join(downloads_dir, log_file_name)
 
     counter = 1
     while os.path.exists(log_file_path):
-        log_file_name = f"{base_log_file_name}_{counter}.txt"
+        log_file_name = f"{base_log_file_name}_{counter}{extension}"
         log_file_path = os.path.join(downloads_dir, log_file_name)
         counter += 1
 
     return open(log_file_path, "w", encoding="utf-8")
 
-def main():
+def parse_args(argv=None):
+    """Parses command line options."""
+    parser = argparse.ArgumentParser(description="Generate a directory tree listing.")
+    parser.add_argument("root_dir", nargs="?", default=os.getcwd(),
+                        help="directory to map (default: current working directory)")
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="maximum depth to descend (default: unlimited)")
+    parser.add_argument("--no-files", dest="show_files", action="store_false",
+                        help="list folders only")
+    parser.add_argument("--no-hidden", dest="include_hidden", action="store_false",
+                        help="skip entries starting with '.'")
+    parser.add_argument("--format", choices=("tree", "json", "ndjson"), default="tree",
+                        help="output format (default: tree)")
+    parser.add_argument("--output", default=None,
+                        help="output file (default: timestamped file in ~/Downloads)")
+    parser.add_argument("--snapshot", default=None,
+                        help="snapshot cache file (default: under ~/.cache/directory_mapper)")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="do not read or write the snapshot cache")
+    parser.add_argument("--quiet", action="store_true",
+                        help="do not echo the tree to the terminal")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="directories listed concurrently (default: 8, 1 = serial)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="per-directory timeout in seconds (default: none)")
+    parser.add_argument("--benchmark", type=float, default=None, metavar="LATENCY_MS",
+                        help="compare serial vs concurrent traversal with simulated per-call latency")
+    return parser.parse_args(argv)
+
+
+def write_output(snapshot, out, fmt, show_files=True, include_hidden=True, echo=False):
+    """Writes a snapshot to an open text file in the requested format."""
+    root = snapshot["root"]
+    if fmt == "json":
+        json.dump({
+            "root_dir": snapshot["root_dir"],
+            "created": snapshot["created"],
+            "tree": filter_tree(root, show_files, include_hidden),
+        }, out, indent=2)
+        out.write("\n")
+    elif fmt == "ndjson":
+        for record in iter_records(root, show_files, include_hidden):
+            out.write(json.dumps(record, separators=(",", ":")) + "\n")
+    else:
+        out.write(f"Resolved path: {snapshot['root_dir']}\n")
+        for line in iter_tree_lines(root, show_files, include_hidden):
+            if echo:
+                print(line)
+            out.write(line + "\n")
+
+
+def main(argv=None):
     """Main orchestrator for generating directory tree."""
     try:
-        # Set default path to project root (current working directory)
-        root_dir = os.getcwd()
-        
-        # Default settings: show both files and folders, no depth limit
-        show_files = True
-        max_depth = None
-
-        log_file_tree = create_log_file(os.path.basename(root_dir), "_tree")
-        print(f"Log file created: {log_file_tree.name}")
+        args = parse_args(argv)
+        root_dir = os.path.abspath(args.root_dir)
         print(f"Resolved path: {root_dir}")
-        log_file_tree.write(f"Resolved path: {root_dir}\n")
 
-        print_directory_tree(root_dir, show_files, max_depth, log_file=log_file_tree)
-        log_file_tree.close()
-        print(f"Directory structure logged in: {log_file_tree.name}")
+        if args.benchmark is not None:
+            run_benchmark(root_dir, args.max_depth, args.workers, args.benchmark / 1000.0)
+            return 0
+
+        snapshot_path = None
+        previous = None
+        if not args.no_snapshot:
+            snapshot_path = args.snapshot or default_snapshot_path(root_dir)
+            previous = load_snapshot(snapshot_path)
+
+        stats = {}
+        snapshot = build_snapshot(root_dir, args.max_depth, previous=previous, stats=stats,
+                                  workers=args.workers, timeout=args.timeout)
+        print(f"Scanned in {stats['seconds']:.2f}s "
+              f"({stats['listed']} directories listed, {stats['reused']} reused from snapshot, "
+              f"{stats['timed_out']} timed out, {stats['dirs_per_sec']:.1f} dirs/sec)")
+        if snapshot_path:
+            save_snapshot(snapshot, snapshot_path)
+
+        extension = {"tree": ".txt", "json": ".json", "ndjson": ".ndjson"}[args.format]
+        if args.output:
+            out = open(args.output, "w", encoding="utf-8")
+        else:
+            out = create_log_file(os.path.basename(root_dir), "_tree", extension)
+        print(f"Log file created: {out.name}")
+        with out:
+            write_output(snapshot, out, args.format, args.show_files, args.include_hidden,
+                         echo=args.format == "tree" and not args.quiet)
+        print(f"Directory structure logged in: {out.name}")
 
     except Exception as e:
         print(f"An unexpected error occurred in main: {e}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,7 +1,12 @@
-import json, os, socket
+import json, os, socket, sys
 from pathlib import Path
 from flask import Flask, jsonify
 
+# Make the repository's `shared` package importable.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.config_schema import MiniAppConfig
+from shared.serving import serve
+
 CFG = json.loads(Path("config.json").read_text())
 app = Flask(__name__)
 
@@ -14,6 +19,9 @@ def index():
     return jsonify({"hello": CFG["name"]})
 
 def _pick_port():
+    # The cockpit assigns a port and passes it in through the environment.
+    if os.environ.get("QI_APP_PORT"):
+        return int(os.environ["QI_APP_PORT"])
     if CFG.get("port", 0):
         return CFG["port"]
     s = socket.socket()
@@ -24,5 +32,6 @@ def _pick_port():
 
 if __name__ == "__main__":
     port = _pick_port()
-    print(f"{CFG['name']} starting on http://{CFG['host']}:{port}")
-    app.run(host=CFG["host"], port=port)
+    host = os.environ.get("QI_APP_HOST") or CFG["host"]
+    print(f"{CFG['name']} starting on http://{host}:{port}")
+    serve(app, MiniAppConfig.from_dict(CFG), host, port)
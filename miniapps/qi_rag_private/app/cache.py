@@ -0,0 +1,198 @@
+"""Semantic cache of retrieval results, keyed by question embedding.
+
+Paraphrased questions embed close to each other. Instead of searching every
+tier again, :class:`SemanticCache` keeps the embeddings of recent questions
+in one NumPy matrix and reuses the retrieval of the most similar cached
+question when its cosine similarity reaches ``threshold`` and it was asked
+for exactly the same set of tiers.
+
+* The tier set of each row is a bitmask, so matching the tier set and
+  invalidating every row that touches an ingested tier are single vectorised
+  comparisons. Only the configured ``tiers`` get a bit (at most 63, the
+  mask is an int64); a question on any other tier name is never cached, so
+  arbitrary tier names from clients cannot exhaust the bits.
+* The cache holds at most ``capacity`` rows; a full cache replaces the least
+  recently used row.
+* :attr:`generation` advances on every invalidation; passing the value read
+  before a search to :meth:`store` keeps a search that overlapped an ingest
+  from caching results that are already stale.
+* Rows older than ``ttl`` seconds are ignored, which bounds staleness when
+  documents are ingested by another process (the folder watcher) whose
+  ingests this process never sees.
+
+A lookup is one matrix-vector product over at most ``capacity`` rows: about
+30 µs for 512 rows of 384 dimensions, against milliseconds for one Qdrant
+search per tier. NumPy is imported on first use.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+MAX_TIERS = 63
+
+
+class SemanticCache:
+    def __init__(self, capacity: int = 512, threshold: float = 0.95, ttl: float = 300.0,
+                 tiers: Iterable[str] = ()) -> None:
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Fixed at construction; tiers beyond MAX_TIERS are simply not cached
+        self._tier_bits: Dict[str, int] = {
+            tier: 1 << bit for bit, tier in enumerate(sorted(set(tiers))[:MAX_TIERS])
+        }
+        self._matrix = None  # (capacity, dim) float32, unit rows; allocated on first store
+        self._masks = None  # tier-set bitmask per row (int64: up to 63 tiers), 0 = empty slot
+        self._stored_at = None
+        self._used_at = None
+        self._results: List[Any] = [None] * capacity
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidated = 0
+        self.generation = 0
+        self._lookup_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _mask(self, tiers: Iterable[str]) -> int:
+        """Bitmask of ``tiers``; -1 if one is not a cacheable tier."""
+        mask = 0
+        for tier in tiers:
+            bit = self._tier_bits.get(tier)
+            if bit is None:
+                return -1
+            mask |= bit
+        return mask
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]):
+        import numpy as np
+
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def _live(self, now: float):
+        live = self._masks != 0
+        if self.ttl:
+            live &= (now - self._stored_at) <= self.ttl
+        return live
+
+    def lookup(self, embedding: Sequence[float], tiers: Iterable[str]) -> Optional[Any]:
+        """Cached results for a question this close on the same tiers, else ``None``."""
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        with self._lock:
+            try:
+                mask = self._mask(tiers)
+                if self._matrix is None or mask <= 0:
+                    self.misses += 1
+                    return None
+                import numpy as np
+
+                candidates = self._live(time.time()) & (self._masks == mask)
+                if not candidates.any():
+                    self.misses += 1
+                    return None
+                sims = self._matrix @ self._unit(embedding)
+                sims[~candidates] = -np.inf
+                row = int(np.argmax(sims))
+                if sims[row] < self.threshold:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                self._tick += 1
+                self._used_at[row] = self._tick
+                return self._results[row]
+            finally:
+                self._lookup_seconds += time.perf_counter() - started
+
+    def store(self, embedding: Sequence[float], tiers: Iterable[str], results: Any,
+              generation: Optional[int] = None) -> None:
+        """Cache ``results``; skipped if an invalidation happened since ``generation`` was read."""
+        if not self.enabled:
+            return
+        import numpy as np
+
+        vec = self._unit(embedding)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            mask = self._mask(tiers)
+            if mask <= 0:
+                return
+            if self._matrix is None or self._matrix.shape[1] != vec.shape[0]:
+                self._matrix = np.zeros((self.capacity, vec.shape[0]), dtype=np.float32)
+                self._masks = np.zeros(self.capacity, dtype=np.int64)
+                self._stored_at = np.zeros(self.capacity, dtype=np.float64)
+                self._used_at = np.zeros(self.capacity, dtype=np.int64)
+            now = time.time()
+            free = np.flatnonzero(~self._live(now))
+            if free.size:
+                row = int(free[0])
+            else:
+                row = int(np.argmin(self._used_at))
+                self.evictions += 1
+            self._tick += 1
+            self._masks[row] = mask
+            self._matrix[row] = vec
+            self._stored_at[row] = now
+            self._used_at[row] = self._tick
+            self._results[row] = results
+            self.stores += 1
+
+    def invalidate_tiers(self, tiers: Iterable[str]) -> int:
+        """Drop every row whose tier set includes one of ``tiers``; returns how many."""
+        with self._lock:
+            self.generation += 1
+            if self._matrix is None:
+                return 0
+            bits = 0
+            for tier in tiers:
+                bits |= self._tier_bits.get(tier, 0)
+            if not bits:
+                return 0
+            stale = (self._masks & bits) != 0
+            count = int(stale.sum())
+            self._masks[stale] = 0
+            for row in stale.nonzero()[0]:
+                self._results[row] = None
+            self.invalidated += count
+            return count
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            if self._masks is not None:
+                self._masks[:] = 0
+            self._results = [None] * self.capacity
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            size = int(self._live(time.time()).sum()) if self._masks is not None else 0
+            return {
+                "enabled": self.enabled,
+                "size": size,
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidated": self.invalidated,
+                "avg_lookup_us": round(1e6 * self._lookup_seconds / lookups, 1) if lookups else 0.0,
+            }
@@ -0,0 +1,261 @@
+"""Single-read document loading pipeline.
+
+Every file is read from disk exactly once. The bytes then go through a
+fixed sequence of stages, each timed per format:
+
+``read`` → ``parse`` (bytes to text, by a format parser) → ``meta``
+(front-matter, for formats that have it) → ``tier`` → ``chunk``
+
+and the result is a :class:`Document` carrying everything ingestion needs.
+Format parsers register themselves by suffix with :func:`register_parser`;
+unknown suffixes fall back to plain text. Parsers for PDF (pdfminer.six) and
+DOCX/HTML (standard library) receive the bytes already in memory, so no
+parser opens the file again.
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+import time
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .utils import parse_front_matter
+
+ParseFunc = Callable[[bytes], Tuple[str, Dict]]
+
+STAGES = ("read", "parse", "meta", "tier", "chunk")
+
+
+@dataclass
+class Parser:
+    name: str
+    func: ParseFunc
+    front_matter: bool = False  # run the ``meta`` stage on the parsed text
+
+
+PARSERS: Dict[str, Parser] = {}
+
+
+def register_parser(*suffixes: str, name: Optional[str] = None, front_matter: bool = False):
+    """Decorator registering ``func(data: bytes) -> (text, metadata)`` for ``suffixes``."""
+
+    def decorator(func: ParseFunc) -> ParseFunc:
+        parser = Parser(name or suffixes[0].lstrip("."), func, front_matter)
+        for suffix in suffixes:
+            PARSERS[suffix.lower()] = parser
+        return func
+
+    return decorator
+
+
+def parser_for(path: Path) -> Parser:
+    return PARSERS.get(path.suffix.lower(), PARSERS[".txt"])
+
+
+def decode(data: bytes) -> str:
+    """Decode text bytes as UTF-8 (BOM tolerated), dropping undecodable bytes."""
+    return data.decode("utf-8-sig", errors="ignore")
+
+
+@register_parser(".txt", ".text", ".rst", ".csv", ".log", name="text")
+def parse_text(data: bytes) -> Tuple[str, Dict]:
+    return decode(data), {}
+
+
+@register_parser(".md", ".markdown", name="markdown", front_matter=True)
+def parse_markdown(data: bytes) -> Tuple[str, Dict]:
+    return decode(data), {}
+
+
+@register_parser(".pdf")
+def parse_pdf(data: bytes) -> Tuple[str, Dict]:
+    """Extract text with pdfminer.six; raises ImportError if it is not installed."""
+    from pdfminer.high_level import extract_text  # type: ignore
+
+    return extract_text(io.BytesIO(data)), {}
+
+
+class _HTMLText(HTMLParser):
+    """Collects visible text and the ``<title>``."""
+
+    SKIP = {"script", "style", "noscript", "template"}
+    BLOCK = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in self.BLOCK:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skip:
+            self._skip -= 1
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self.parts.append(data)
+
+
+@register_parser(".html", ".htm", name="html")
+def parse_html(data: bytes) -> Tuple[str, Dict]:
+    extractor = _HTMLText()
+    extractor.feed(decode(data))
+    extractor.close()
+    meta = {"title": extractor.title.strip()} if extractor.title.strip() else {}
+    return "".join(extractor.parts), meta
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DC = "{http://purl.org/dc/elements/1.1/}"
+
+
+@register_parser(".docx")
+def parse_docx(data: bytes) -> Tuple[str, Dict]:
+    """Paragraph text of ``word/document.xml`` plus the core title, via zipfile."""
+    import zipfile
+    from xml.etree import ElementTree
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+        meta: Dict = {}
+        if "docProps/core.xml" in archive.namelist():
+            title = ElementTree.fromstring(archive.read("docProps/core.xml")).findtext(f"{_DC}title")
+            if title:
+                meta["title"] = title
+    paragraphs = ["".join(t.text or "" for t in p.iter(f"{_W}t")) for p in root.iter(f"{_W}p")]
+    return "\n".join(p for p in paragraphs if p), meta
+
+
+def split_text(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Split text into chunks of at most ``chunk_size`` words overlapping by ``chunk_overlap``."""
+    words = text.split()
+    if not words:
+        return []
+    chunks: List[str] = []
+    step = chunk_size - chunk_overlap
+    for i in range(0, len(words), step):
+        chunks.append(" ".join(words[i : i + chunk_size]))
+        if i + chunk_size >= len(words):
+            break
+    return chunks
+
+
+class TierResolver:
+    """Maps a file to its tier by folder name, cached per directory.
+
+    Only the directories below ``data_root`` are checked (the first match
+    from the root down wins) and the answer is remembered per directory, so
+    further files in the same folder cost one dict lookup. This is the only
+    folder-to-tier rule; front matter overrides it in :func:`load_document`.
+    """
+
+    def __init__(self, folder_tiers: Dict[str, str], data_root: Optional[Path] = None) -> None:
+        self.folder_tiers = folder_tiers
+        self.data_root = Path(data_root).resolve() if data_root else None
+        self._cache: Dict[Path, Optional[str]] = {}
+
+    def for_path(self, path: Path) -> Optional[str]:
+        parent = path.parent
+        try:
+            return self._cache[parent]
+        except KeyError:
+            pass
+        parts = parent.parts
+        if self.data_root is not None:
+            try:
+                parts = parent.resolve().relative_to(self.data_root).parts
+            except ValueError:
+                pass  # outside the data root: check every component
+        tier = next((self.folder_tiers[p] for p in parts if p in self.folder_tiers), None)
+        self._cache[parent] = tier
+        return tier
+
+
+@dataclass
+class Document:
+    """A file after the load pipeline."""
+
+    path: Path
+    format: str
+    size: int
+    text: str  # body, front-matter removed
+    meta: Dict
+    tier: str
+    chunks: List[str]
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+
+class StageStats:
+    """Per-format totals of stage timings, files and bytes (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._formats: Dict[str, Dict] = {}
+
+    def add(self, doc: Document) -> None:
+        with self._lock:
+            entry = self._formats.setdefault(doc.format, {"files": 0, "bytes": 0, "ms": dict.fromkeys(STAGES, 0.0)})
+            entry["files"] += 1
+            entry["bytes"] += doc.size
+            for stage, ms in doc.timings_ms.items():
+                entry["ms"][stage] += ms
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """``{format: {files, bytes, ms: {stage: total}, avg_ms: {stage: per file}}}``."""
+        with self._lock:
+            return {
+                fmt: {
+                    "files": e["files"],
+                    "bytes": e["bytes"],
+                    "ms": {s: round(v, 3) for s, v in e["ms"].items()},
+                    "avg_ms": {s: round(v / e["files"], 3) for s, v in e["ms"].items()},
+                }
+                for fmt, e in self._formats.items()
+            }
+
+
+def load_document(path: Path, tiers: TierResolver, chunk_size: int, chunk_overlap: int,
+                  stats: Optional[StageStats] = None) -> Document:
+    """Run the pipeline for ``path``: one read, then parse, meta, tier and chunk."""
+    timings: Dict[str, float] = {}
+    clock = time.perf_counter
+    parser = parser_for(path)
+
+    t0 = clock()
+    data = path.read_bytes()
+    t1 = clock()
+    text, meta = parser.func(data)
+    t2 = clock()
+    if parser.front_matter:
+        front, text = parse_front_matter(text)
+        if isinstance(front, dict):
+            meta = {**meta, **front}
+    t3 = clock()
+    tier = str(meta.get("classification") or "").strip().upper() or tiers.for_path(path) or "UNCLASS"
+    t4 = clock()
+    chunks = split_text(text, chunk_size, chunk_overlap)
+    t5 = clock()
+
+    for stage, start, end in zip(STAGES, (t0, t1, t2, t3, t4), (t1, t2, t3, t4, t5)):
+        timings[stage] = (end - start) * 1000.0
+    doc = Document(path, parser.name, len(data), text, meta, tier, chunks, timings)
+    if stats is not None:
+        stats.add(doc)
+    return doc
@@ -3,13 +3,31 @@
 This module encapsulates calls to a local language model (via Ollama) or to a
 remote provider.  It exposes a simple `generate_answer` function which
 constructs a prompt from the user question and retrieved context.
+
+Generations go through a shared :class:`~.scheduler.LLMScheduler`, which
+limits how many run at once (``LLM_MAX_CONCURRENCY``), queues the rest by
+priority (``LLM_MAX_QUEUE``, ``LLM_QUEUE_TIMEOUT``) and lets identical
+prompts that are in flight together share one generation.
 """
 
 from __future__ import annotations
 
+import hashlib
 import os
-import requests
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
+
+from .scheduler import DEFAULT_PRIORITY, LLMScheduler
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> LLMScheduler:
+    """The process-wide scheduler, configured from the environment on first use."""
+    return LLMScheduler(
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "1")),
+        max_queue=int(os.getenv("LLM_MAX_QUEUE", "32")),
+        queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "30")),
+    )
 
 
 def build_prompt(question: str, contexts: List[str]) -> str:
@@ -34,9 +52,12 @@ def call_ollama(prompt: str, model: str) -> str:
     """Send a prompt to a local Ollama server and return the generated text.
 
     Requires the `ollama/ollama` Docker container to be running with port
-    11434 exposed.  See the project README for details.
+    11434 exposed, or another server at ``OLLAMA_URL``.  See the project
+    README for details.
     """
-    url = "http://localhost:11434/api/generate"
+    import requests
+
+    url = os.getenv("OLLAMA_URL", "http://localhost:11434").rstrip("/") + "/api/generate"
     payload = {"model": model, "prompt": prompt, "stream": False}
     try:
         resp = requests.post(url, json=payload, timeout=60)
@@ -47,15 +68,21 @@ def call_ollama(prompt: str, model: str) -> str:
         raise RuntimeError(f"Failed to call Ollama: {exc}")
 
 
-def generate_answer(question: str, contexts: List[str]) -> str:
+def generate_answer(question: str, contexts: List[str], priority: int = DEFAULT_PRIORITY,
+                    timeout: Optional[float] = None) -> str:
     """Generate an answer to a question given a list of context passages.
 
     Depending on your environment variables this function will either call a
     local Ollama server or another provider.  For the MVP we support only
     the local Ollama pathway.
+
+    The call waits for a scheduler slot (lower ``priority`` first, at most
+    ``timeout`` seconds, default ``LLM_QUEUE_TIMEOUT``) and raises
+    :class:`~.scheduler.SchedulerError` if it is not admitted.
     """
     prompt = build_prompt(question, contexts)
     model = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
+    key = (model, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
     # In a more complete implementation you could branch here based on
     # LLM_PROVIDER environment variables or similar.
-    return call_ollama(prompt, model)
\ No newline at end of file
+    return get_scheduler().run(lambda: call_ollama(prompt, model), key=key, priority=priority, timeout=timeout)
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""In-process exact vector search for small tiers.
+
+For a tier with a few thousand chunks, a brute-force dot product over all of
+its vectors takes well under a millisecond, which is less than the network
+round trip to Qdrant alone, and the results are exact. :class:`LocalIndex`
+keeps one tier's vectors on disk and searches them in process:
+
+``vectors.f32``
+    Unit-length float32 rows, appended in place and memory-mapped for
+    search, so the OS page cache rather than the Python heap holds them.
+``log.jsonl``
+    One line per operation: ``{"op": "add", "id", "payload"}`` for each row
+    (in row order) and ``{"op": "del", "id"}`` for deletions. Replaying it
+    on open restores the ids, payloads and which rows are alive.
+
+Deleting only marks rows dead. Once dead rows are more than
+``compact_ratio`` of the file, :meth:`LocalIndex.compact` rewrites both files
+with the live rows only (written to temporary files, then swapped in).
+
+Search is a single matrix product for a batch of queries
+(``rows × dim @ dim × queries``) followed by ``argpartition`` per query, so
+batching queries amortises the pass over the matrix.
+
+Several processes may open the same directory (the API, ``ingest.py``,
+``watch_folder.py``, queue workers). Every operation holds an ``fcntl``
+lock on ``lock`` and first catches up with the files: new log lines
+written by another process are replayed, and a compaction elsewhere
+triggers a full reload (``lock`` holds a generation number that every
+compaction bumps). Without ``fcntl`` (Windows) readers still catch up, but
+only one process may write.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class LocalIndex:
+    def __init__(self, directory: Path, compact_ratio: float = 0.25) -> None:
+        import numpy as np
+
+        self._np = np
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.log_path = self.directory / "log.jsonl"
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._depth = 0  # nesting of _locked() in the thread holding _lock
+        # Unbuffered, so reading the generation always hits the file
+        self._lock_file = open(self.directory / "lock", "a+b", buffering=0)
+        self._reset()
+        with self._locked():
+            pass
+
+    # --- persistence ---------------------------------------------------------
+
+    def _reset(self) -> None:
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+        self._alive = self._np.zeros(0, dtype=bool)
+        self._matrix = None  # memmap of the first len(self._ids) rows
+        self._log_generation: Optional[int] = None  # compaction generation of the log replayed
+        self._log_offset = 0  # bytes of the log replayed so far
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the thread and file locks, caught up with other processes' writes."""
+        with self._lock:
+            outer = self._depth == 0
+            self._depth += 1
+            try:
+                if outer:
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                    self._refresh()
+                yield
+            finally:
+                self._depth -= 1
+                if outer and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _generation(self) -> int:
+        self._lock_file.seek(0)
+        return int(self._lock_file.read() or 0)
+
+    def _refresh(self) -> None:
+        """Replay log lines appended since the last call; reload after a compaction."""
+        generation = self._generation()
+        size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        if self._log_generation is not None and generation != self._log_generation \
+                or size < self._log_offset:
+            self._reset()
+        if size > self._log_offset:
+            self._replay()
+        self._log_generation = generation
+
+    def _replay(self) -> None:
+        np = self._np
+        with open(self.log_path, "r+b") as fh:
+            fh.seek(self._log_offset)
+            good = self._log_offset
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    # Torn last line from a crash mid-append (writers hold the
+                    # lock, so it is not a write in progress): drop it so the
+                    # next append starts on a fresh line. Without the lock it
+                    # may be another process's write: just stop before it.
+                    if fcntl is not None:
+                        fh.truncate(good)
+                    break
+                good += len(line)
+                entry = json.loads(line)
+                if entry["op"] == "add":
+                    self._row_of[entry["id"]] = len(self._ids)
+                    self._ids.append(entry["id"])
+                    self._payloads.append(entry["payload"])
+                    if self.dim is None:
+                        self.dim = entry.get("dim")
+                elif entry["op"] == "del":
+                    self._row_of.pop(entry["id"], None)
+            self._log_offset = good
+        rows = len(self._ids)
+        self._alive = np.zeros(rows, dtype=bool)
+        self._alive[list(self._row_of.values())] = True
+        if rows and self.dim:
+            size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+            if size < rows * self.dim * 4:
+                raise RuntimeError(f"{self.vectors_path} is shorter than its log; delete the index to rebuild it")
+        self._remap()
+
+    def _append_log(self, entries: Iterator[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(entry) + "\n" for entry in entries).encode("utf-8")
+        with open(self.log_path, "ab") as fh:
+            fh.write(data)
+            fh.flush()
+            self._log_offset = os.fstat(fh.fileno()).st_size
+
+    def _remap(self) -> None:
+        rows = len(self._ids)
+        if rows and self.dim:
+            self._matrix = self._np.memmap(self.vectors_path, dtype=self._np.float32, mode="r", shape=(rows, self.dim))
+        else:
+            self._matrix = None
+
+    # --- writes --------------------------------------------------------------
+
+    def add(self, ids: Sequence[str], vectors: Any, payloads: Sequence[Dict[str, Any]]) -> None:
+        """Append rows; an id that already exists is replaced."""
+        np = self._np
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or len(matrix) != len(ids) or len(ids) != len(payloads):
+            raise ValueError("ids, vectors and payloads must have the same length")
+        if not len(ids):
+            return
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        with self._locked():
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"vector size {matrix.shape[1]} does not match index size {self.dim}")
+            self._delete_ids([i for i in ids if i in self._row_of])
+            with open(self.vectors_path, "ab") as fh:
+                # Rows beyond the log (crash between the two writes) are cut
+                # off, so row i of the file is always the i-th logged add
+                expected = len(self._ids) * self.dim * 4
+                if os.fstat(fh.fileno()).st_size != expected:
+                    fh.truncate(expected)
+                fh.write(matrix.tobytes())
+            self._append_log(
+                {"op": "add", "id": pid, "payload": payload, "dim": self.dim}
+                for pid, payload in zip(ids, payloads)
+            )
+            start = len(self._ids)
+            for offset, (pid, payload) in enumerate(zip(ids, payloads)):
+                self._row_of[pid] = start + offset
+                self._ids.append(pid)
+                self._payloads.append(payload)
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            self._remap()
+
+    def _delete_ids(self, ids: Sequence[str]) -> int:
+        rows = [self._row_of.pop(pid) for pid in ids if pid in self._row_of]
+        if not rows:
+            return 0
+        self._alive[rows] = False
+        self._append_log({"op": "del", "id": self._ids[row]} for row in rows)
+        return len(rows)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        with self._locked():
+            deleted = self._delete_ids(ids)
+            self._maybe_compact()
+            return deleted
+
+    def delete_where(self, key: str, value: Any) -> int:
+        """Delete every live row whose payload has ``key == value``."""
+        with self._locked():
+            ids = [pid for pid, row in self._row_of.items() if self._payloads[row].get(key) == value]
+            deleted = self._delete_ids(ids)
+            self._maybe_compact()
+            return deleted
+
+    def _maybe_compact(self) -> None:
+        total = len(self._ids)
+        if total and (total - len(self._row_of)) / total > self.compact_ratio:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the files with live rows only."""
+        np = self._np
+        with self._locked():
+            keep = np.flatnonzero(self._alive)
+            tmp_vectors = self.vectors_path.with_suffix(".f32.tmp")
+            tmp_log = self.log_path.with_suffix(".jsonl.tmp")
+            if self._matrix is not None and len(keep):
+                np.ascontiguousarray(self._matrix[keep]).tofile(tmp_vectors)
+            else:
+                tmp_vectors.write_bytes(b"")
+            with open(tmp_log, "w", encoding="utf-8") as fh:
+                fh.writelines(
+                    json.dumps({"op": "add", "id": self._ids[row], "payload": self._payloads[row], "dim": self.dim})
+                    + "\n"
+                    for row in keep
+                )
+            self._matrix = None  # release the mapping before replacing the file (Windows)
+            os.replace(tmp_vectors, self.vectors_path)
+            os.replace(tmp_log, self.log_path)
+            self._log_generation = self._generation() + 1
+            self._lock_file.truncate(0)
+            self._lock_file.write(str(self._log_generation).encode())
+            self._log_offset = self.log_path.stat().st_size
+            self._ids = [self._ids[row] for row in keep]
+            self._payloads = [self._payloads[row] for row in keep]
+            self._row_of = {pid: row for row, pid in enumerate(self._ids)}
+            self._alive = np.ones(len(self._ids), dtype=bool)
+            self._remap()
+
+    # --- search --------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def search_batch(self, queries: Any, k: int, with_vectors: bool = False) -> List[List[tuple]]:
+        """Exact top-``k`` by cosine similarity for each row of ``queries``.
+
+        Hits are ``(score, id, payload)``, or ``(score, id, payload, vector)``
+        with ``with_vectors``.
+        """
+        np = self._np
+        q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        q = q / np.where((n := np.linalg.norm(q, axis=1, keepdims=True)) == 0, 1, n)
+        with self._locked():
+            matrix, alive, ids, payloads = self._matrix, self._alive, self._ids, self._payloads
+            live = int(alive.sum()) if matrix is not None else 0
+        if not live:
+            return [[] for _ in range(len(q))]
+        scores = matrix @ q.T  # (rows, queries)
+        if live < len(alive):
+            scores[~alive] = -np.inf
+        k = min(k, live)
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]  # (k, queries), unordered
+        results = []
+        for col in range(q.shape[0]):
+            rows = top[:, col]
+            rows = rows[np.argsort(-scores[rows, col])]
+            if with_vectors:
+                vectors = np.asarray(matrix[rows])
+                results.append([(float(scores[row, col]), ids[row], payloads[row], vec)
+                                for row, vec in zip(rows, vectors)])
+            else:
+                results.append([(float(scores[row, col]), ids[row], payloads[row]) for row in rows])
+        return results
+
+    def search(self, query: Any, k: int, with_vectors: bool = False) -> List[tuple]:
+        return self.search_batch([query], k, with_vectors)[0]
+
+    def iter_rows(self, chunk: int = 4096) -> Iterator[Tuple[List[str], Any, List[Dict[str, Any]]]]:
+        """Yield ``(ids, vectors, payloads)`` of the live rows, ``chunk`` rows at a time."""
+        np = self._np
+        with self._locked():
+            matrix, alive, ids, payloads = self._matrix, self._alive, self._ids, self._payloads
+        if matrix is None:
+            return
+        rows = np.flatnonzero(alive)
+        for start in range(0, len(rows), chunk):
+            selected = rows[start:start + chunk]
+            yield [ids[row] for row in selected], np.asarray(matrix[selected]), [payloads[row] for row in selected]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._locked():
+            rows = len(self._ids)
+            return {
+                "live": len(self._row_of),
+                "rows": rows,
+                "dim": self.dim,
+                "file_mb": round(rows * (self.dim or 0) * 4 / 2 ** 20, 2),
+            }
@@ -1,29 +1,56 @@
-"""FastAPI application for the tiered RAG backend."""
+"""FastAPI application for the tiered RAG backend.
+
+The :class:`RagEngine` is built on the first request that needs it rather
+than at import time, so the server binds its port before the embedding
+model and Qdrant client are loaded.
+"""
 
 from __future__ import annotations
 
 import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-import requests
 from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 
-from .llm import generate_answer
+from .llm import generate_answer, get_scheduler
 from .rag import RagEngine
+from .scheduler import SchedulerError, load_tier_priorities, priority_for_tiers
 from .utils import load_tier_policies
 
-# Instantiate the engine once at startup
-engine = RagEngine()
 app = FastAPI(title="Tiered RAG API", version="0.1.0")
 
 # Load tier policies and cloud endpoint from environment
 tier_policies = load_tier_policies()
+# LLM queue priority per tier (lower runs first)
+tier_priorities = load_tier_priorities()
 cloud_endpoint = os.getenv("CLOUD_ENDPOINT", "").strip() or None
 
 
+_engine: Optional[RagEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RagEngine:
+    """Return the shared engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RagEngine()
+    return _engine
+
+
+def set_engine(engine: RagEngine) -> None:
+    """Serve requests with ``engine`` (e.g. one built on stub backends)."""
+    global _engine
+    _engine = engine
+
+
 class IngestRequest(BaseModel):
     path: str
 
@@ -31,6 +58,7 @@ class IngestRequest(BaseModel):
 @app.post("/ingest")
 def ingest(req: IngestRequest) -> dict:
     """Ingest a single file specified by its path relative to DATA_ROOT."""
+    engine = get_engine()
     # Resolve path relative to data root
     full_path = Path(engine.data_root) / req.path
     if not full_path.exists() or not full_path.is_file():
@@ -46,11 +74,23 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[dict]
     fallback_used: bool
+    # Per-stage latency of this request: embed, cache, search, postprocess, total, llm
+    timings_ms: Dict[str, float] = {}
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> ChatResponse:
-    """Answer a question using content from the specified classification tiers."""
+def chat(
+    question: str = Query(...),
+    tiers: Optional[str] = Query(None),
+    priority: Optional[int] = Query(
+        None, description="LLM queue priority, lower runs first; cannot be more urgent than the tiers' priority"
+    ),
+) -> ChatResponse:
+    """Answer a question using content from the specified classification tiers.
+
+    Responds 503 with ``Retry-After`` when the LLM queue is full or the
+    request could not get a generation slot in time.
+    """
     # Determine which tiers to search
     if tiers:
         requested_tiers = [t.strip().upper() for t in tiers.split(",") if t.strip()]
@@ -59,9 +99,11 @@ def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> Chat
         requested_tiers = ["UNCLASS", "CLASSIFIED"]
 
     # Query local collections
-    results = engine.query(question, requested_tiers)
+    retrieval = get_engine().retrieve(question, requested_tiers)
+    results = retrieval.results
+    timings = dict(retrieval.timings_ms)
     # Determine which tiers returned nothing and allow fallback
-    missing_tiers = set(requested_tiers) - {res[2].get("tier") for res in results}
+    missing_tiers = set(requested_tiers) - retrieval.tiers_with_hits
     fallback_used = False
     remote_answer: Optional[str] = None
 
@@ -70,6 +112,8 @@ def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> Chat
         allowed_tiers = [t for t in missing_tiers if tier_policies.get(t, False)]
         if allowed_tiers:
             # Proxy the query to the remote endpoint
+            import requests
+
             try:
                 resp = requests.post(
                     cloud_endpoint.rstrip("/") + "/chat",
@@ -86,7 +130,15 @@ def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> Chat
     # Compose context texts for the local answer
     contexts = [res[0] for res in results]
     if contexts:
-        answer = generate_answer(question, contexts)
+        # A caller may lower its own urgency but never jump ahead of its tiers
+        tier_priority = priority_for_tiers(requested_tiers, tier_priorities)
+        priority = tier_priority if priority is None else max(priority, tier_priority)
+        started = time.perf_counter()
+        try:
+            answer = generate_answer(question, contexts, priority=priority)
+            timings["llm"] = (time.perf_counter() - started) * 1000
+        except SchedulerError as exc:
+            raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
     elif remote_answer:
         answer = remote_answer
     else:
@@ -103,7 +155,21 @@ def chat(question: str = Query(...), tiers: Optional[str] = Query(None)) -> Chat
         for res in results
     ]
 
-    return ChatResponse(answer=answer, sources=sources, fallback_used=fallback_used)
+    return ChatResponse(answer=answer, sources=sources, fallback_used=fallback_used,
+                        timings_ms={k: round(v, 3) for k, v in timings.items()})
+
+
+@app.get("/metrics")
+def metrics() -> dict:
+    """Query cache hit rate, retrieval stage latencies, LLM queue state, local index sizes and document load timings."""
+    engine = get_engine()
+    return {
+        "query_cache": engine.query_cache.stats(),
+        "retrieval": engine.retrieval_stats.snapshot(),
+        "local_index": {tier: engine.local_index(tier).stats() for tier in sorted(engine.local_tiers)},
+        "llm": get_scheduler().stats(),
+        "document_load": engine.load_stats.snapshot(),
+    }
 
 
 @app.get("/")
@@ -0,0 +1,139 @@
+"""Post-retrieval selection of the contexts handed to the LLM.
+
+Each tier returns its ``candidates_per_tier`` best chunks with their
+vectors. :func:`select` then picks at most ``max_contexts`` of them:
+
+* candidates scoring below ``min_score`` are dropped;
+* maximal marginal relevance: each pick maximises
+  ``λ · score − (1 − λ) · (highest similarity to an already picked chunk)``,
+  so near-duplicates of a chosen chunk lose out to slightly less relevant
+  but different ones (``mmr_lambda = 1`` ranks by score only);
+* no more than ``max_per_file`` chunks come from one file (``0`` = no cap).
+
+The pairwise similarities of all candidates come from one matrix product.
+Each of the at most ``max_contexts`` greedy steps is then a handful of
+vector operations over the candidates, with no Python loop over them.
+
+Settings come from the environment (:meth:`PostProcessConfig.from_env`);
+:class:`PostProcessStats` keeps per-request stage timings and drop counts
+for ``/metrics``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class PostProcessConfig:
+    min_score: float = 0.0
+    max_per_file: int = 2
+    mmr_lambda: float = 0.7
+    max_contexts: int = 5
+    candidates_per_tier: int = 20
+
+    @property
+    def needs_vectors(self) -> bool:
+        return self.mmr_lambda < 1.0
+
+    @classmethod
+    def from_env(cls, top_k: int) -> "PostProcessConfig":
+        """Read ``MIN_SCORE``, ``MAX_CHUNKS_PER_FILE``, ``MMR_LAMBDA``, ``CANDIDATES_PER_TIER``
+        and ``MAX_CONTEXTS`` (default ``top_k``)."""
+        max_contexts = int(os.getenv("MAX_CONTEXTS", str(top_k)))
+        return cls(
+            min_score=float(os.getenv("MIN_SCORE", "0.0")),
+            max_per_file=int(os.getenv("MAX_CHUNKS_PER_FILE", "2")),
+            mmr_lambda=min(1.0, max(0.0, float(os.getenv("MMR_LAMBDA", "0.7")))),
+            max_contexts=max_contexts,
+            candidates_per_tier=max(max_contexts, int(os.getenv("CANDIDATES_PER_TIER", "20"))),
+        )
+
+
+def select(scores: Sequence[float], vectors: Optional[Sequence[Any]], files: Sequence[str],
+           config: PostProcessConfig) -> Tuple[List[int], Dict[str, int]]:
+    """Indices of the chosen candidates in pick order, and how many were dropped why.
+
+    ``vectors`` may be ``None`` (or contain ``None`` rows, e.g. points from
+    a backend that returned no vector); such candidates are never penalised
+    as redundant.
+    """
+    import numpy as np
+
+    rel = np.asarray(scores, dtype=np.float32)
+    n = len(rel)
+    counts = {"candidates": n, "below_min_score": 0, "file_capped": 0, "selected": 0}
+    if n == 0:
+        return [], counts
+    available = rel >= config.min_score
+    counts["below_min_score"] = int(n - available.sum())
+
+    sim = None
+    if config.needs_vectors and vectors is not None:
+        present = [v for v in vectors if v is not None]
+        if present:
+            matrix = np.zeros((n, len(present[0])), dtype=np.float32)
+            for row, vec in enumerate(vectors):
+                if vec is not None:
+                    matrix[row] = vec
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+            sim = matrix @ matrix.T
+
+    _, file_codes = np.unique(np.asarray(files, dtype=object), return_inverse=True)
+    per_file = np.zeros(int(file_codes.max()) + 1, dtype=np.int32)
+    closest = np.zeros(n, dtype=np.float32)  # similarity to the nearest picked candidate
+    lam = config.mmr_lambda
+    chosen: List[int] = []
+    while len(chosen) < config.max_contexts and available.any():
+        objective = rel if sim is None or not chosen else lam * rel - (1 - lam) * closest
+        pick = int(np.argmax(np.where(available, objective, -np.inf)))
+        chosen.append(pick)
+        available[pick] = False
+        if sim is not None:
+            np.maximum(closest, sim[pick], out=closest)
+        if config.max_per_file:
+            code = file_codes[pick]
+            per_file[code] += 1
+            if per_file[code] >= config.max_per_file:
+                same_file = available & (file_codes == code)
+                counts["file_capped"] += int(same_file.sum())
+                available &= ~same_file
+    counts["selected"] = len(chosen)
+    return chosen, counts
+
+
+class PostProcessStats:
+    """Per-request retrieval stage timings (last ``history`` requests) and selection totals (thread-safe)."""
+
+    def __init__(self, history: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self._timings: deque = deque(maxlen=history)
+        self.requests = 0
+        self.totals = dict.fromkeys(("cache_hits", "search_errors", "candidates", "below_min_score", "file_capped",
+                                     "selected"), 0)
+
+    def record(self, timings_ms: Dict[str, float], counts: Dict[str, int]) -> None:
+        with self._lock:
+            self.requests += 1
+            self._timings.append(timings_ms)
+            for key in self.totals:
+                self.totals[key] += counts.get(key, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {"requests": self.requests, **self.totals}
+            searched = self.requests - self.totals["cache_hits"]
+            if searched:
+                out["avg_candidates"] = round(self.totals["candidates"] / searched, 1)
+                out["avg_selected"] = round(self.totals["selected"] / searched, 1)
+            stages = sorted({stage for t in self._timings for stage in t})
+            for stage in stages:
+                values = sorted(t[stage] for t in self._timings if stage in t)
+                out[f"{stage}_ms_p50"] = round(values[len(values) // 2], 3)
+                out[f"{stage}_ms_p95"] = round(values[min(len(values) - 1, int(0.95 * len(values)))], 3)
+            return out
@@ -0,0 +1,182 @@
+"""Per-tier Qdrant collection profiles.
+
+A profile says how a tier's collection stores and searches its vectors:
+
+* ``on_disk`` – keep the original float32 vectors memory-mapped on disk
+  instead of in RAM;
+* ``quantization: "int8"`` – scalar quantization; the int8 copy (a quarter of
+  the size) stays in RAM (``always_ram``) and is searched first, then the top
+  ``limit × oversampling`` candidates are rescored against the originals
+  (``rescore``);
+* ``hnsw_m`` / ``hnsw_ef_construct`` – graph degree and build effort;
+* ``ef`` – search-time HNSW beam width (``None`` lets Qdrant decide);
+* ``exact`` – skip the index and compare against every vector, which is
+  both exact and fast for small tiers.
+
+Built-in profiles are listed in :data:`BUILTIN_PROFILES`. Tiers pick one via
+the ``COLLECTION_PROFILES`` environment variable, a single-line JSON object
+mapping a tier to a profile name or to overrides of one::
+
+    COLLECTION_PROFILES={"UNCLASS": "large", "MEO": "exact", "ULTRA": {"base": "default", "ef": 256}}
+
+Tiers that are not listed use ``default``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Any, Dict, Optional
+
+PATH_FIELD = "path"
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    name: str = "default"
+    on_disk: bool = False
+    quantization: Optional[str] = None  # None | "int8"
+    quantile: float = 0.99
+    always_ram: bool = True
+    rescore: bool = True
+    oversampling: float = 2.0
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    ef: Optional[int] = None
+    exact: bool = False
+
+    # --- Qdrant models -------------------------------------------------------
+
+    def vectors_config(self, size: int):
+        from qdrant_client.http import models as qmodels
+
+        return qmodels.VectorParams(size=size, distance=qmodels.Distance.COSINE, on_disk=self.on_disk)
+
+    def hnsw_config(self):
+        from qdrant_client.http import models as qmodels
+
+        return qmodels.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk)
+
+    def quantization_config(self):
+        """Quantization for create; ``None`` means none."""
+        from qdrant_client.http import models as qmodels
+
+        if self.quantization is None:
+            return None
+        if self.quantization != "int8":
+            raise ValueError(f"unsupported quantization {self.quantization!r} in profile {self.name!r}")
+        return qmodels.ScalarQuantization(
+            scalar=qmodels.ScalarQuantizationConfig(
+                type=qmodels.ScalarType.INT8, quantile=self.quantile, always_ram=self.always_ram
+            )
+        )
+
+    def search_params(self):
+        from qdrant_client.http import models as qmodels
+
+        quantization = None
+        if self.quantization:
+            quantization = qmodels.QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        return qmodels.SearchParams(hnsw_ef=self.ef, exact=self.exact, quantization=quantization)
+
+    # --- comparing with an existing collection -------------------------------
+
+    def differences(self, info: Any) -> Dict[str, tuple]:
+        """Settings of collection ``info`` (a ``CollectionInfo``) that differ from this profile.
+
+        Returns ``{setting: (current, wanted)}``; search-time settings
+        (``ef``, ``exact``, rescoring) are not stored in the collection and
+        never show up here.
+        """
+        current: Dict[str, Any] = {}
+        vectors = info.config.params.vectors
+        current["on_disk"] = bool(getattr(vectors, "on_disk", False))
+        hnsw = info.config.hnsw_config
+        current["hnsw_m"] = hnsw.m
+        current["hnsw_ef_construct"] = hnsw.ef_construct
+        current["hnsw_on_disk"] = bool(hnsw.on_disk)
+        quant = info.config.quantization_config
+        scalar = getattr(quant, "scalar", None)
+        current["quantization"] = "int8" if scalar is not None else None
+        if scalar is not None:
+            current["quantile"] = scalar.quantile if scalar.quantile is not None else 0.99
+            current["always_ram"] = bool(scalar.always_ram)
+        wanted = asdict(self)
+        return {k: (v, wanted[k]) for k, v in current.items() if v != wanted[k]}
+
+    def update_kwargs(self) -> Dict[str, Any]:
+        """Arguments for ``QdrantClient.update_collection`` that apply this profile in place."""
+        from qdrant_client.http import models as qmodels
+
+        quantization = self.quantization_config()
+        return {
+            "vectors_config": {"": qmodels.VectorParamsDiff(on_disk=self.on_disk)},
+            "hnsw_config": self.hnsw_config(),
+            "quantization_config": quantization if quantization is not None else qmodels.Disabled.DISABLED,
+        }
+
+
+BUILTIN_PROFILES: Dict[str, CollectionProfile] = {
+    # Qdrant's defaults: float32 vectors and HNSW graph in RAM
+    "default": CollectionProfile(),
+    # Big tiers: originals on disk, int8 copy in RAM, rescored
+    "large": CollectionProfile(name="large", on_disk=True, quantization="int8", ef=128),
+    # Big tiers where RAM matters more than the last bit of recall
+    "compact": CollectionProfile(name="compact", on_disk=True, quantization="int8", rescore=False,
+                                 hnsw_m=8, hnsw_ef_construct=64, hnsw_on_disk=True),
+    # Small tiers: brute force, exact results; m=0 skips building the graph
+    "exact": CollectionProfile(name="exact", exact=True, hnsw_m=0),
+}
+
+_FIELDS = {f.name for f in fields(CollectionProfile)}
+
+
+def make_profile(spec: Any) -> CollectionProfile:
+    """Build a profile from a built-in name or a dict of overrides (``base`` picks the starting point)."""
+    if isinstance(spec, str):
+        if spec not in BUILTIN_PROFILES:
+            raise ValueError(f"unknown collection profile {spec!r}; built-in: {', '.join(BUILTIN_PROFILES)}")
+        return BUILTIN_PROFILES[spec]
+    if isinstance(spec, dict):
+        spec = dict(spec)
+        base = make_profile(spec.pop("base", "default"))
+        unknown = set(spec) - _FIELDS
+        if unknown:
+            raise ValueError(f"unknown collection profile settings: {', '.join(sorted(unknown))}")
+        spec.setdefault("name", f"{base.name}+custom" if spec else base.name)
+        return replace(base, **spec)
+    raise ValueError(f"a collection profile is a name or an object, not {spec!r}")
+
+
+def load_collection_profiles(raw: Optional[str] = None) -> Dict[str, CollectionProfile]:
+    """Parse ``COLLECTION_PROFILES`` into ``{tier: profile}``; invalid JSON means no overrides."""
+    raw = os.getenv("COLLECTION_PROFILES", "") if raw is None else raw
+    if not raw.strip():
+        return {}
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return {}
+    return {str(tier).upper(): make_profile(spec) for tier, spec in data.items()}
+
+
+def is_local_mode(client: Any) -> bool:
+    """In-process Qdrant (``":memory:"`` or ``path=``): not thread-safe, no payload indexes."""
+    from qdrant_client.local.qdrant_local import QdrantLocal
+
+    return isinstance(getattr(client, "_client", None), QdrantLocal)
+
+
+def ensure_path_index(client: Any, collection: str, payload_schema: Optional[dict] = None) -> None:
+    """Keyword-index the ``path`` payload so a file's old points are deleted without a full scan.
+
+    ``payload_schema`` is the collection's current schema, if known; nothing
+    is sent when ``path`` is already indexed or the client is in-process.
+    """
+    from qdrant_client.http import models as qmodels
+
+    if PATH_FIELD in (payload_schema or {}) or is_local_mode(client):
+        return
+    client.create_payload_index(collection, PATH_FIELD, field_schema=qmodels.PayloadSchemaType.KEYWORD, wait=True)
@@ -2,32 +2,72 @@
 
 This module provides helper functions to create a Qdrant client, split
 documents into chunks, generate embeddings and perform similarity search.
+Files are loaded through the single-read pipeline in :mod:`.documents`, and
+each chunk's text is stored in its point's payload so that search results
+never go back to the file. How each tier's collection stores and searches
+its vectors comes from its profile (see :mod:`.profiles`). Results of
+recent questions are reused for paraphrases by a semantic cache (see
+:mod:`.cache`), which is invalidated per tier on ingest. Tiers listed in
+``LOCAL_INDEX_TIERS`` are stored and searched in process by a
+:class:`~.local_index.LocalIndex` instead of Qdrant. Retrieved candidates
+pass a score threshold, a per-file cap and MMR diversification (see
+:mod:`.postprocess`) before they reach the LLM.
+
+``qdrant_client`` and ``sentence_transformers`` (which pulls in torch) are
+only imported when the client or the embedder is first used, so importing
+this module, constructing a :class:`RagEngine` or running a CLI with
+``--help`` stays cheap.
 """
 
 from __future__ import annotations
 
 import os
+import time
 import uuid
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from .cache import SemanticCache
+from .documents import Document, StageStats, TierResolver, load_document, split_text
+from .local_index import LocalIndex
+from .postprocess import PostProcessConfig, PostProcessStats, select
+from .profiles import BUILTIN_PROFILES, CollectionProfile, ensure_path_index, load_collection_profiles
+from .utils import load_env_mapping
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from sentence_transformers import SentenceTransformer
+
 
-from qdrant_client import QdrantClient
-from qdrant_client.http import models as qmodels
-from sentence_transformers import SentenceTransformer
+def point_id(path: Path, chunk_index: int) -> str:
+    """Deterministic point id of a file's chunk, so re-ingesting overwrites it."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{path}#{chunk_index}"))
 
-from .utils import (
-    determine_tier_for_file,
-    load_env_mapping,
-    parse_front_matter,
-    read_pdf,
-    read_text_file,
-)
+
+@dataclass
+class Retrieval:
+    """Selected contexts of one query plus how they were obtained."""
+
+    results: List[Tuple[str, float, Dict]]
+    # Requested tiers that had at least one candidate scoring MIN_SCORE or more
+    tiers_with_hits: frozenset
+    timings_ms: Dict[str, float]
+    counts: Dict[str, int] = field(default_factory=dict)
+    cached: bool = False
 
 
 class RagEngine:
-    """Encapsulates embedding, storage and retrieval operations."""
+    """Encapsulates embedding, storage and retrieval operations.
+
+    ``client`` and ``embedder`` replace the Qdrant client and the
+    sentence-transformers model that would otherwise be created on first
+    use; anything with the same ``search``/``upsert`` and ``encode`` methods
+    works, such as ``QdrantClient(":memory:")`` in a load test.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, client: Optional["QdrantClient"] = None,
+                 embedder: Optional["SentenceTransformer"] = None) -> None:
         # Load environment variables
         self.data_root = Path(os.getenv("DATA_ROOT", "."))
         self.qdrant_host = os.getenv("QDRANT_HOST", "localhost")
@@ -40,27 +80,54 @@ class RagEngine:
         # Load mapping from env
         self.tier_collections = load_env_mapping("TIER_COLLECTIONS")
         self.folder_tiers = load_env_mapping("FOLDER_TIERS")
+        self.tiers = TierResolver(self.folder_tiers, self.data_root)
+        # Per-format stage timings of every document loaded
+        self.load_stats = StageStats()
+        self.collection_profiles = load_collection_profiles()
+        # Tiers searched in process instead of through Qdrant
+        self.local_tiers = {t.strip().upper() for t in os.getenv("LOCAL_INDEX_TIERS", "").split(",") if t.strip()}
+        self.query_cache = SemanticCache(
+            capacity=int(os.getenv("QUERY_CACHE_SIZE", "512")),
+            threshold=float(os.getenv("QUERY_CACHE_THRESHOLD", "0.95")),
+            ttl=float(os.getenv("QUERY_CACHE_TTL", "300")),
+            tiers=self.known_tiers(),
+        )
+        # Score threshold, per-file cap and MMR applied to retrieved candidates
+        self.postprocess = PostProcessConfig.from_env(self.top_k)
+        self.retrieval_stats = PostProcessStats()
+        self._ready_collections: set = set()
+        self.local_index_dir = Path(os.getenv("LOCAL_INDEX_DIR", "./local_index"))
+        self._local_indexes: Dict[str, LocalIndex] = {}
 
-        # Initialise components
-        self._client = QdrantClient(host=self.qdrant_host, port=self.qdrant_port)
-        self._embedder: Optional[SentenceTransformer] = None
+        # Components are created on first use
+        self._client: Optional["QdrantClient"] = client
+        self._embedder: Optional["SentenceTransformer"] = embedder
 
-    def embedder(self) -> SentenceTransformer:
+    def client(self) -> "QdrantClient":
+        """Lazy create the Qdrant client."""
+        if self._client is None:
+            from qdrant_client import QdrantClient
+
+            self._client = QdrantClient(host=self.qdrant_host, port=self.qdrant_port)
+        return self._client
+
+    def embedder(self) -> "SentenceTransformer":
         """Lazy load the embedding model."""
         if self._embedder is None:
+            from sentence_transformers import SentenceTransformer
+
             self._embedder = SentenceTransformer(self.embedding_model_name)
         return self._embedder
 
     # Document handling
+    def read_document(self, path: Path) -> Document:
+        """Read, parse, classify and chunk a file with a single read."""
+        return load_document(path, self.tiers, self.chunk_size, self.chunk_overlap, self.load_stats)
+
     def load_document(self, path: Path) -> Tuple[str, Dict[str, str]]:
         """Load the contents of a document and return (text, metadata)."""
-        if path.suffix.lower() == ".pdf":
-            text = read_pdf(path)
-        else:
-            text = read_text_file(path)
-        # Extract front‑matter if present
-        meta, body = parse_front_matter(text) if path.suffix.lower() in {".md", ".markdown"} else ({}, text)
-        return body, meta or {}
+        doc = self.read_document(path)
+        return doc.text, doc.meta
 
     def split_text(self, text: str) -> List[str]:
         """Split a document into overlapping chunks.
@@ -70,91 +137,266 @@ class RagEngine:
         `chunk_overlap` words overlap with the previous chunk.  You may
         substitute a more sophisticated tokeniser here.
         """
-        words = text.split()
-        if not words:
-            return []
-        chunks: List[str] = []
-        step = self.chunk_size - self.chunk_overlap
-        for i in range(0, len(words), step):
-            chunk_words = words[i : i + self.chunk_size]
-            chunk = " ".join(chunk_words)
-            chunks.append(chunk)
-            if i + self.chunk_size >= len(words):
-                break
-        return chunks
-
-    def ensure_collection(self, collection_name: str, vector_size: int) -> None:
-        """Create a collection if it does not already exist."""
+        return split_text(text, self.chunk_size, self.chunk_overlap)
+
+    def known_tiers(self) -> set:
+        """Tiers named in the configuration (plus the default UNCLASS)."""
+        tiers = set(self.tier_collections) | set(self.collection_profiles) | set(self.folder_tiers.values())
+        return {t.upper() for t in tiers} | self.local_tiers | {"UNCLASS"}
+
+    def collection_for(self, tier: str) -> str:
+        return self.tier_collections.get(tier, f"q_{tier.lower()}")
+
+    def profile_for(self, tier: str) -> CollectionProfile:
+        return self.collection_profiles.get(tier, BUILTIN_PROFILES["default"])
+
+    def uses_local_index(self, tier: str) -> bool:
+        return tier in self.local_tiers
+
+    def local_index(self, tier: str) -> LocalIndex:
+        """Open the tier's local index on first use."""
+        index = self._local_indexes.get(tier)
+        if index is None:
+            index = self._local_indexes[tier] = LocalIndex(self.local_index_dir / self.collection_for(tier))
+        return index
+
+    def ensure_collection(self, collection_name: str, vector_size: int,
+                          profile: Optional[CollectionProfile] = None) -> None:
+        """Create a collection with ``profile`` if it does not already exist.
+
+        Existing collections are left as they are; :meth:`apply_profiles`
+        brings them in line with their profiles. Either way the ``path``
+        payload gets its keyword index.
+        """
+        if collection_name in self._ready_collections:
+            return
+        profile = profile or BUILTIN_PROFILES["default"]
         try:
-            self._client.get_collection(collection_name)
+            schema = self.client().get_collection(collection_name).payload_schema
         except Exception:
-            # Use default configuration: HNSW + cosine distance
-            self._client.create_collection(
+            self.client().create_collection(
                 collection_name=collection_name,
-                vectors_config=qmodels.VectorParams(size=vector_size, distance=qmodels.Distance.COSINE),
+                vectors_config=profile.vectors_config(vector_size),
+                hnsw_config=profile.hnsw_config(),
+                quantization_config=profile.quantization_config(),
             )
+            schema = None
+        ensure_path_index(self.client(), collection_name, schema)
+        self._ready_collections.add(collection_name)
 
-    def upsert_document(self, path: Path) -> None:
-        """Ingest a single file into the appropriate tier collection."""
-        body, meta = self.load_document(path)
-        tier = determine_tier_for_file(path, self.folder_tiers)
-        collection = self.tier_collections.get(tier, f"q_{tier.lower()}")
+    def apply_profiles(self, dry_run: bool = False) -> Dict[str, dict]:
+        """Update existing tier collections in place to match their profiles.
 
-        # Split into chunks and embed
-        chunks = self.split_text(body)
-        if not chunks:
-            return
-        embeddings = self.embedder().encode(chunks).tolist()
-        # Ensure collection exists
-        self.ensure_collection(collection, len(embeddings[0]))
-        points: List[qmodels.PointStruct] = []
-        for idx, vector in enumerate(embeddings):
-            payload = {
+        Returns ``{tier: {"collection", "profile", "changes", "status"}}``
+        where ``changes`` maps each setting to ``(current, wanted)``. Qdrant
+        rebuilds indexes and quantized vectors in the background after an
+        update; the collection stays searchable meanwhile.
+        """
+        report: Dict[str, dict] = {}
+        tiers = set(self.tier_collections) | set(self.collection_profiles)
+        for tier in sorted(tiers):
+            collection = self.collection_for(tier)
+            profile = self.profile_for(tier)
+            entry = {"collection": collection, "profile": profile.name, "changes": {}}
+            if self.uses_local_index(tier):
+                entry["status"] = "local index"
+                report[tier] = entry
+                continue
+            try:
+                info = self.client().get_collection(collection)
+            except Exception:
+                entry["status"] = "missing"
+                report[tier] = entry
+                continue
+            entry["changes"] = profile.differences(info)
+            if not entry["changes"]:
+                entry["status"] = "ok"
+            elif dry_run:
+                entry["status"] = "would update"
+            else:
+                self.client().update_collection(collection, **profile.update_kwargs())
+                entry["status"] = "updated"
+            report[tier] = entry
+        return report
+
+    def upsert_document(self, path: Path) -> int:
+        """Ingest a single file into the appropriate tier collection; returns its chunk count."""
+        return self.upsert_documents([path]).get(path, 0)
+
+    def upsert_documents(self, paths: Iterable[Path]) -> Dict[Path, int]:
+        """Ingest several files, embedding all of their chunks in one batch.
+
+        Returns the number of chunks written per file. Batching amortises
+        the per-call cost of the embedder and sends one upsert per tier
+        instead of one per file.
+        """
+        docs = [(path, self.read_document(path)) for path in paths]
+        counts = {path: len(doc.chunks) for path, doc in docs}
+        if not docs:
+            return counts
+        # Callers spell the same file differently (relative, absolute, via a
+        # symlink); ids and the ``path`` payload must not depend on that
+        docs = [(Path(path).resolve(), doc) for path, doc in docs]
+        # Embed the chunks produced by the pipeline
+        texts = [chunk for _, doc in docs for chunk in doc.chunks]
+        embeddings = self.embedder().encode(texts) if texts else None
+        by_tier: Dict[str, list] = {}
+        offset = 0
+        for path, doc in docs:
+            # Files without chunks (emptied, unparseable) still go through so
+            # that their previous points are deleted
+            vectors = embeddings[offset:offset + len(doc.chunks)] if doc.chunks else None
+            by_tier.setdefault(doc.tier, []).append((path, doc, vectors))
+            offset += len(doc.chunks)
+        for tier, items in by_tier.items():
+            self._write_tier(tier, items)
+        self.query_cache.invalidate_tiers(list(by_tier))
+        return counts
+
+    def _write_tier(self, tier: str, items: List[tuple]) -> None:
+        """Replace the points of ``(path, document, embeddings)`` items of one tier."""
+        payloads = [
+            {
                 "path": str(path),
                 "tier": tier,
-                "metadata": meta,
+                "metadata": doc.meta,
                 "chunk_index": idx,
+                "text": chunk,
             }
+            for path, doc, _ in items
+            for idx, chunk in enumerate(doc.chunks)
+        ]
+        ids = [point_id(path, idx) for path, doc, _ in items for idx in range(len(doc.chunks))]
+        # A file can be ingested again (changed, lease reclaimed, batch retried):
+        # replace its previous chunks rather than adding to them
+        paths = [str(path) for path, _, _ in items]
+        if self.uses_local_index(tier):
+            import numpy as np
+
+            index = self.local_index(tier)
+            for path in paths:
+                index.delete_where("path", path)
+            if ids:
+                index.add(ids, np.concatenate([e for _, _, e in items if e is not None]), payloads)
+            return
+        from qdrant_client.http import models as qmodels
+
+        vectors = [vector for _, _, emb in items if emb is not None for vector in emb.tolist()]
+        collection = self.collection_for(tier)
+        if vectors:
+            self.ensure_collection(collection, len(vectors[0]), self.profile_for(tier))
+        elif collection not in self._ready_collections:
+            try:
+                self.client().get_collection(collection)
+            except Exception:
+                return  # nothing was ever stored for this tier
+        self.client().delete(
+            collection_name=collection,
+            points_selector=qmodels.FilterSelector(filter=qmodels.Filter(must=[
+                qmodels.FieldCondition(key="path", match=qmodels.MatchAny(any=paths)),
+            ])),
+        )
+        if not vectors:
+            return
+        points: List["qmodels.PointStruct"] = []
+        for pid, vector, payload in zip(ids, vectors, payloads):
             points.append(
                 qmodels.PointStruct(
-                    id=str(uuid.uuid4()),
+                    id=pid,
                     vector=vector,
                     payload=payload,
                 )
             )
         # Upsert points
-        self._client.upsert(collection_name=collection, points=points)
+        self.client().upsert(collection_name=collection, points=points)
 
-    def query(self, question: str, tiers: List[str]) -> List[Tuple[str, float, Dict[str, str]]]:
-        """Search for relevant chunks across multiple tiers.
+    def _chunk_text(self, payload: Dict) -> str:
+        chunk = payload.get("text")
+        if chunk is None:
+            # Points ingested before the text was stored: re-read the
+            # document and split it again.
+            try:
+                chunk = self.read_document(Path(payload.get("path", ""))).chunks[payload.get("chunk_index", 0)]
+            except Exception:
+                chunk = ""
+        return chunk
 
-        Returns a list of tuples `(text, score, payload)`.  The text is the chunk
-        content, score is the similarity score (the higher the better), and
-        payload contains metadata such as the original file path and tier.
+    def retrieve(self, question: str, tiers: List[str]) -> Retrieval:
+        """Search ``tiers`` and select the contexts for ``question``.
+
+        Each tier contributes up to ``CANDIDATES_PER_TIER`` candidates (with
+        their vectors when MMR needs them); :func:`.postprocess.select` then
+        keeps at most ``MAX_CONTEXTS`` of them in pick order. Stage timings
+        are returned and recorded in :attr:`retrieval_stats`. The selection is
+        cached only if every tier was searched successfully.
         """
+        clock = time.perf_counter
+        cfg = self.postprocess
+        t0 = clock()
         # Embed the question
-        q_emb = self.embedder().encode([question]).tolist()[0]
-        results: List[Tuple[str, float, Dict[str, str]]] = []
+        q_vec = self.embedder().encode([question])[0]
+        q_emb = q_vec.tolist()
+        t1 = clock()
+        cached = self.query_cache.lookup(q_emb, tiers)
+        t2 = clock()
+        timings = {"embed": (t1 - t0) * 1000, "cache": (t2 - t1) * 1000}
+        if cached is not None:
+            results, tiers_with_hits = cached
+            timings["total"] = (t2 - t0) * 1000
+            self.retrieval_stats.record(timings, {"cache_hits": 1})
+            return Retrieval(list(results), tiers_with_hits, timings, cached=True)
+        generation = self.query_cache.generation
+        # (text or None, score, payload, vector or None)
+        candidates: List[tuple] = []
+        failed = 0  # tiers whose search raised
         for tier in tiers:
-            collection = self.tier_collections.get(tier, f"q_{tier.lower()}")
+            if self.uses_local_index(tier):
+                for hit in self.local_index(tier).search(q_vec, cfg.candidates_per_tier, cfg.needs_vectors):
+                    candidates.append((hit[2].get("text", ""), hit[0], hit[2], hit[3] if cfg.needs_vectors else None))
+                continue
+            collection = self.collection_for(tier)
             try:
-                search_res = self._client.search(collection, q_emb, limit=self.top_k)
-            except Exception:
+                search_res = self.client().search(
+                    collection, q_emb, limit=cfg.candidates_per_tier,
+                    search_params=self.profile_for(tier).search_params(), with_vectors=cfg.needs_vectors,
+                )
+            except Exception as exc:
+                # A tier nothing was ingested into yet has no collection: that
+                # is an empty result, not a failure (REST answers 404, gRPC
+                # NOT_FOUND, local mode "Collection ... not found").
+                if "not found" not in str(exc).lower().replace("_", " "):
+                    failed += 1
                 continue
             for res in search_res:
                 payload = res.payload or {}
-                # We need to fetch the actual chunk text.  Qdrant stores only the
-                # embedding and payload; to reconstruct the text we must read
-                # the document and split again.  For MVP we include the chunk
-                # index in the payload and re‑compute the split.
-                path = Path(payload.get("path", ""))
-                idx = payload.get("chunk_index", 0)
-                try:
-                    text, _ = self.load_document(path)
-                    chunk = self.split_text(text)[idx]
-                except Exception:
-                    chunk = ""
-                results.append((chunk, res.score, payload))
-        # Sort results by descending score
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
\ No newline at end of file
+                candidates.append((payload.get("text"), res.score, payload, res.vector))
+        t3 = clock()
+        picks, counts = select(
+            [c[1] for c in candidates],
+            [c[3] for c in candidates] if cfg.needs_vectors else None,
+            [c[2].get("path", "") for c in candidates],
+            cfg,
+        )
+        results = [(self._chunk_text(candidates[i][2]) if candidates[i][0] is None else candidates[i][0],
+                    candidates[i][1], candidates[i][2]) for i in picks]
+        tiers_with_hits = frozenset(c[2].get("tier") for c in candidates if c[1] >= cfg.min_score)
+        t4 = clock()
+        timings.update(search=(t3 - t2) * 1000, postprocess=(t4 - t3) * 1000, total=(t4 - t0) * 1000)
+        counts["search_errors"] = failed
+        self.retrieval_stats.record(timings, counts)
+        if not failed:
+            # A partial result (e.g. during a Qdrant outage) is not cached,
+            # or paraphrases would get it until QUERY_CACHE_TTL runs out.
+            self.query_cache.store(q_emb, tiers, (tuple(results), tiers_with_hits), generation)
+        return Retrieval(results, tiers_with_hits, timings, counts)
+
+    def query(self, question: str, tiers: List[str]) -> List[Tuple[str, float, Dict[str, str]]]:
+        """Search for relevant chunks across multiple tiers.
+
+        Returns a list of tuples `(text, score, payload)`.  The text is the chunk
+        content, score is the similarity score (the higher the better), and
+        payload contains metadata such as the original file path and tier.
+        The list holds the selected contexts in MMR pick order (see
+        :meth:`retrieve`).
+        """
+        return self.retrieve(question, tiers).results
@@ -0,0 +1,223 @@
+"""Admission control in front of the LLM.
+
+One local Ollama instance slows down for everyone when it runs many
+generations at once, so :class:`LLMScheduler` lets at most
+``max_concurrency`` generations run and parks the rest in a bounded
+priority queue:
+
+* a request finding ``max_queue`` others already waiting is rejected at once
+  with :class:`QueueFull`;
+* a queued request that is not admitted within ``queue_timeout`` seconds
+  gives up with :class:`QueueTimeout`; both map to ``503`` with a
+  ``Retry-After`` estimate (``SchedulerError.retry_after``);
+* the queue is ordered by priority (lower runs first), FIFO within one;
+* identical requests (same ``key``) arriving while one is queued or running
+  join it instead of generating again (single flight) and get its result or
+  its error.
+
+Callers block in their own thread (FastAPI runs sync endpoints in a thread
+pool), so the scheduler uses plain ``threading`` primitives.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional
+
+DEFAULT_PRIORITY = 10
+
+
+class SchedulerError(RuntimeError):
+    """The request was not admitted; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(SchedulerError):
+    pass
+
+
+class QueueTimeout(SchedulerError):
+    pass
+
+
+class _Waiter:
+    __slots__ = ("event", "granted", "cancelled")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = 1, max_queue: int = 32, queue_timeout: float = 30.0,
+                 history: int = 1000) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._heap: list = []  # (priority, seq, waiter); cancelled waiters are dropped lazily
+        self._seq = itertools.count()
+        self._running = 0
+        self._depth = 0  # waiters in the heap that are neither granted nor cancelled
+        self._flights: Dict[Any, _Flight] = {}
+        self._waits = deque(maxlen=history)  # seconds spent queued, admitted requests only
+        self._gen_avg: Optional[float] = None  # moving average of generation seconds
+        self.counters = dict.fromkeys(
+            ("submitted", "admitted", "coalesced", "rejected", "timed_out", "completed", "failed"), 0)
+        self.max_depth_seen = 0
+
+    # --- admission -----------------------------------------------------------
+
+    def _retry_after(self) -> int:
+        per_generation = self._gen_avg or 5.0
+        return max(1, math.ceil(per_generation * (self._depth + 1) / self.max_concurrency))
+
+    def _acquire(self, priority: int, timeout: float) -> None:
+        started = time.monotonic()
+        with self._lock:
+            if self._running < self.max_concurrency and self._depth == 0:
+                self._running += 1
+                self._admitted(0.0)
+                return
+            if self._depth >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise QueueFull(f"LLM queue is full ({self._depth} waiting)", self._retry_after())
+            waiter = _Waiter()
+            heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+            self._depth += 1
+            self.max_depth_seen = max(self.max_depth_seen, self._depth)
+            if len(self._heap) > 2 * self.max_queue + 16:
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+        waiter.event.wait(timeout)
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                self._depth -= 1
+                self.counters["timed_out"] += 1
+                raise QueueTimeout(f"no LLM slot within {timeout:g}s", self._retry_after())
+            self._admitted(time.monotonic() - started)
+
+    def _admitted(self, waited: float) -> None:
+        self.counters["admitted"] += 1
+        self._waits.append(waited)
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                if not waiter.cancelled:
+                    # Hand the slot straight over; the running count stays the same
+                    waiter.granted = True
+                    self._depth -= 1
+                    waiter.event.set()
+                    return
+            self._running -= 1
+
+    # --- public --------------------------------------------------------------
+
+    def run(self, fn: Callable[[], Any], key: Any = None, priority: int = DEFAULT_PRIORITY,
+            timeout: Optional[float] = None) -> Any:
+        """Run ``fn`` when a slot is free; requests with an equal ``key`` share one call."""
+        timeout = self.queue_timeout if timeout is None else timeout
+        leader = True
+        flight = None
+        with self._lock:
+            self.counters["submitted"] += 1
+            if key is not None:
+                flight = self._flights.get(key)
+                if flight is not None:
+                    leader = False
+                    self.counters["coalesced"] += 1
+                else:
+                    flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            self._acquire(priority, timeout)
+            try:
+                started = time.monotonic()
+                result = fn()
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self._gen_avg = elapsed if self._gen_avg is None else 0.8 * self._gen_avg + 0.2 * elapsed
+                    self.counters["completed"] += 1
+            except BaseException:
+                with self._lock:
+                    self.counters["failed"] += 1
+                raise
+            finally:
+                self._release()
+        except BaseException as exc:
+            if flight is not None:
+                flight.error = exc
+            raise
+        else:
+            if flight is not None:
+                flight.result = result
+            return result
+        finally:
+            if flight is not None:
+                with self._lock:
+                    self._flights.pop(key, None)
+                flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+
+            def pct(fraction: float) -> float:
+                return round(1000 * waits[min(len(waits) - 1, int(fraction * len(waits)))], 1) if waits else 0.0
+
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "running": self._running,
+                "queue_depth": self._depth,
+                "max_queue_depth": self.max_depth_seen,
+                "in_flight_keys": len(self._flights),
+                **self.counters,
+                "wait_ms_p50": pct(0.50),
+                "wait_ms_p95": pct(0.95),
+                "wait_ms_max": round(1000 * waits[-1], 1) if waits else 0.0,
+                "generation_ms_avg": round(1000 * self._gen_avg, 1) if self._gen_avg is not None else None,
+            }
+
+
+def load_tier_priorities() -> Dict[str, int]:
+    """Parse ``LLM_TIER_PRIORITIES`` (JSON ``{tier: priority}``, lower runs first)."""
+    try:
+        data = json.loads(os.getenv("LLM_TIER_PRIORITIES", "{}"))
+        return {str(k).upper(): int(v) for k, v in data.items()}
+    except Exception:
+        return {}
+
+
+def priority_for_tiers(tiers: Iterable[str], priorities: Dict[str, int]) -> int:
+    """The most urgent priority among ``tiers``."""
+    return min((priorities.get(t, DEFAULT_PRIORITY) for t in tiers), default=DEFAULT_PRIORITY)
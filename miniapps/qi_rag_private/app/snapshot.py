@@ -0,0 +1,320 @@
+"""Portable snapshots of a tier's points: export once, bulk-load anywhere.
+
+Copying a tier to another Qdrant instance or to a collection with a
+different profile does not need the documents to be re-embedded. Export
+streams the stored points (ids, vectors, payloads) into a file, and import
+bulk-loads that file.
+
+File layout (little-endian)::
+
+    b"QSNAP1\\n"  uint32 header length  JSON header
+    chunk*        b"CHNK" uint32 rows  uint64 ids bytes  uint64 payload bytes  uint32 crc32
+                  ids (msgpack list)  vectors (rows x dim float32, row-major)  payloads (msgpack list)
+    b"END!"       uint64 total rows
+
+The JSON header holds the format version, source tier and collection,
+vector size, distance and profile name. Each chunk's vectors are one
+contiguous float32 block, read straight into a NumPy array without parsing.
+The CRC covers the whole chunk body, so a truncated or damaged file fails
+loudly instead of loading partial data.
+
+Import creates the target collection with indexing disabled
+(``indexing_threshold=0``). It then sends large batches from several
+threads at once and restores the indexing threshold at the end, so Qdrant
+builds the HNSW graph once instead of repeatedly while points stream in.
+
+``msgpack`` is imported on first use.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .profiles import ensure_path_index, is_local_mode
+
+if TYPE_CHECKING:
+    from .profiles import CollectionProfile
+    from .rag import RagEngine
+
+MAGIC = b"QSNAP1\n"
+CHUNK = struct.Struct("<4sIQQI")
+TRAILER = struct.Struct("<4sQ")
+VERSION = 1
+# Qdrant's default, used when a new collection is created for the import
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+
+class SnapshotError(ValueError):
+    """The file is not a snapshot, is damaged, or does not fit the target."""
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError as exc:  # pragma: no cover - depends on the environment
+        raise RuntimeError("snapshots need the msgpack package (pip install msgpack)") from exc
+    return msgpack
+
+
+@dataclass
+class TransferStats:
+    rows: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    index_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "mb": round(self.bytes / 2 ** 20, 2),
+            "seconds": round(self.seconds, 2),
+            "rows_per_s": round(self.rows / self.seconds, 1) if self.seconds else None,
+            "mb_per_s": round(self.bytes / 2 ** 20 / self.seconds, 1) if self.seconds else None,
+            "index_seconds": round(self.index_seconds, 2),
+        }
+
+
+class SnapshotWriter:
+    def __init__(self, fh: BinaryIO, header: Dict[str, Any]) -> None:
+        self._fh = fh
+        self._packer = _msgpack().Packer(use_bin_type=True)
+        self.dim = int(header["dim"])
+        self.rows = 0
+        raw = json.dumps({"version": VERSION, **header}).encode("utf-8")
+        fh.write(MAGIC + struct.pack("<I", len(raw)) + raw)
+        self.bytes = len(MAGIC) + 4 + len(raw)
+
+    def write(self, ids: List[Any], vectors: Any, payloads: List[Dict[str, Any]]) -> None:
+        import numpy as np
+
+        matrix = np.ascontiguousarray(vectors, dtype="<f4")
+        if matrix.shape != (len(ids), self.dim) or len(payloads) != len(ids):
+            raise SnapshotError(f"chunk shape {matrix.shape} does not match {len(ids)} rows of {self.dim}")
+        ids_raw = self._packer.pack(list(ids))
+        payload_raw = self._packer.pack(list(payloads))
+        body = ids_raw + matrix.tobytes() + payload_raw
+        self._fh.write(CHUNK.pack(b"CHNK", len(ids), len(ids_raw), len(payload_raw), zlib.crc32(body)))
+        self._fh.write(body)
+        self.rows += len(ids)
+        self.bytes += CHUNK.size + len(body)
+
+    def close(self) -> None:
+        self._fh.write(TRAILER.pack(b"END!", self.rows))
+        self.bytes += TRAILER.size
+
+
+class SnapshotReader:
+    def __init__(self, fh: BinaryIO) -> None:
+        self._fh = fh
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError("not a snapshot file")
+        (length,) = struct.unpack("<I", fh.read(4))
+        self.header: Dict[str, Any] = json.loads(fh.read(length))
+        if self.header.get("version") != VERSION:
+            raise SnapshotError(f"unsupported snapshot version {self.header.get('version')}")
+        self.dim = int(self.header["dim"])
+        self.bytes = len(MAGIC) + 4 + length
+
+    def chunks(self) -> Iterator[Tuple[List[Any], Any, List[Dict[str, Any]]]]:
+        """Yield ``(ids, vectors, payloads)`` per chunk; vectors is a ``rows × dim`` float32 array."""
+        import numpy as np
+
+        msgpack = _msgpack()
+        rows = 0
+        while True:
+            head = self._fh.read(4)
+            if head == b"END!":
+                (total,) = struct.unpack("<Q", self._fh.read(8))
+                if total != rows:
+                    raise SnapshotError(f"trailer says {total} rows, read {rows}")
+                self.bytes += TRAILER.size
+                return
+            rest = self._fh.read(CHUNK.size - 4)
+            if head != b"CHNK" or len(rest) != CHUNK.size - 4:
+                raise SnapshotError("truncated or damaged snapshot (bad chunk header)")
+            _, count, ids_len, payload_len, crc = CHUNK.unpack(head + rest)
+            vec_len = count * self.dim * 4
+            body = self._fh.read(ids_len + vec_len + payload_len)
+            if len(body) != ids_len + vec_len + payload_len or zlib.crc32(body) != crc:
+                raise SnapshotError("truncated or damaged snapshot (chunk checksum mismatch)")
+            ids = msgpack.unpackb(body[:ids_len], raw=False)
+            vectors = np.frombuffer(body, dtype="<f4", count=count * self.dim, offset=ids_len).reshape(count, self.dim)
+            payloads = msgpack.unpackb(body[ids_len + vec_len:], raw=False)
+            rows += count
+            self.bytes += CHUNK.size + len(body)
+            yield ids, vectors, payloads
+
+
+# --- export -------------------------------------------------------------------
+
+
+def export_tier(engine: "RagEngine", tier: str, path: Path, chunk: int = 2048,
+                client: Any = None) -> TransferStats:
+    """Write every point of ``tier`` (Qdrant collection or local index) to ``path``."""
+    stats = TransferStats()
+    started = time.perf_counter()
+    collection = engine.collection_for(tier)
+    header = {"tier": tier, "collection": collection, "distance": "Cosine", "created": time.time()}
+    tmp = path.with_name(path.name + ".part")
+    with open(tmp, "wb") as fh:
+        if engine.uses_local_index(tier):
+            index = engine.local_index(tier)
+            if index.dim is None:
+                raise SnapshotError(f"local index for {tier} is empty")
+            writer = SnapshotWriter(fh, {**header, "dim": index.dim, "source": "local"})
+            for ids, vectors, payloads in index.iter_rows(chunk):
+                writer.write(ids, vectors, payloads)
+        else:
+            client = client or engine.client()
+            info = client.get_collection(collection)
+            params = info.config.params.vectors
+            if not hasattr(params, "size"):
+                raise SnapshotError(f"{collection} uses named vectors, which snapshots do not support")
+            writer = SnapshotWriter(fh, {**header, "dim": params.size, "distance": str(params.distance.value),
+                                         "source": "qdrant", "profile": engine.profile_for(tier).name})
+            offset = None
+            while True:
+                records, offset = client.scroll(collection, limit=chunk, offset=offset,
+                                                with_payload=True, with_vectors=True)
+                if records:
+                    writer.write([r.id for r in records], [r.vector for r in records],
+                                 [r.payload or {} for r in records])
+                if offset is None:
+                    break
+        writer.close()
+    tmp.replace(path)
+    stats.rows, stats.bytes = writer.rows, writer.bytes
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+# --- import -------------------------------------------------------------------
+
+
+def _prepare_collection(client: Any, collection: str, dim: int, profile: "CollectionProfile",
+                        replace: bool) -> int:
+    """Create (or reuse) ``collection`` with indexing off; returns the threshold to restore."""
+    from qdrant_client.http import models as qmodels
+
+    if replace:
+        client.delete_collection(collection)
+    try:
+        info = client.get_collection(collection)
+    except Exception:
+        info = None
+    if info is None:
+        client.create_collection(
+            collection_name=collection,
+            vectors_config=profile.vectors_config(dim),
+            hnsw_config=profile.hnsw_config(),
+            quantization_config=profile.quantization_config(),
+            optimizers_config=qmodels.OptimizersConfigDiff(indexing_threshold=0),
+        )
+        ensure_path_index(client, collection)
+        return DEFAULT_INDEXING_THRESHOLD
+    size = getattr(info.config.params.vectors, "size", None)
+    if size != dim:
+        raise SnapshotError(f"{collection} holds vectors of size {size}, the snapshot has {dim}")
+    ensure_path_index(client, collection, info.payload_schema)
+    threshold = info.config.optimizer_config.indexing_threshold
+    client.update_collection(collection, optimizers_config=qmodels.OptimizersConfigDiff(indexing_threshold=0))
+    return DEFAULT_INDEXING_THRESHOLD if threshold is None else threshold
+
+
+def _wait_indexed(client: Any, collection: str, timeout: float) -> None:
+    from qdrant_client.http import models as qmodels
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if client.get_collection(collection).status == qmodels.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+
+
+def import_snapshot(engine: "RagEngine", path: Path, tier: Optional[str] = None,
+                    collection: Optional[str] = None, profile: Optional["CollectionProfile"] = None,
+                    replace: bool = False, batch: int = 1024, parallel: int = 4, wait_indexed: float = 0.0,
+                    client: Any = None) -> TransferStats:
+    """Bulk-load a snapshot into ``tier`` (default: the tier it was exported from).
+
+    ``collection`` and ``profile`` override the tier's collection name and
+    profile, e.g. to load a copy next to the live collection; a
+    ``collection`` always means Qdrant, even for a local-index tier. At most
+    ``2 × parallel`` batches are held in memory at once. With
+    ``wait_indexed`` > 0 the call also waits up to that many seconds for
+    Qdrant to finish indexing and reports that time separately.
+    """
+    from qdrant_client.http import models as qmodels
+
+    stats = TransferStats()
+    started = time.perf_counter()
+    with open(path, "rb") as fh:
+        reader = SnapshotReader(fh)
+        tier = (tier or reader.header["tier"]).upper()
+        if engine.uses_local_index(tier) and collection is None:
+            index = engine.local_index(tier)
+            if replace:
+                index.delete([pid for ids, _, _ in index.iter_rows() for pid in ids])
+                index.compact()
+            for ids, vectors, payloads in reader.chunks():
+                index.add([str(pid) for pid in ids], vectors, payloads)
+                stats.rows += len(ids)
+            engine.query_cache.invalidate_tiers([tier])
+            stats.bytes = reader.bytes
+            stats.seconds = time.perf_counter() - started
+            return stats
+
+        client = client or engine.client()
+        collection = collection or engine.collection_for(tier)
+        profile = profile or engine.profile_for(tier)
+        threshold = _prepare_collection(client, collection, reader.dim, profile, replace)
+        if is_local_mode(client):
+            parallel = 1
+        lock = threading.Lock()
+
+        def send(ids: List[Any], vectors: Any, payloads: List[Dict[str, Any]]) -> None:
+            client.upsert(collection, points=qmodels.Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads),
+                          wait=True)
+            with lock:
+                stats.rows += len(ids)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+                pending: set = set()
+                for ids, vectors, payloads in reader.chunks():
+                    for start in range(0, len(ids), batch):
+                        if len(pending) >= 2 * parallel:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                future.result()
+                        pending.add(pool.submit(send, ids[start:start + batch], vectors[start:start + batch],
+                                                payloads[start:start + batch]))
+                for future in pending:
+                    future.result()
+        finally:
+            client.update_collection(collection,
+                                     optimizers_config=qmodels.OptimizersConfigDiff(indexing_threshold=threshold))
+        stats.bytes = reader.bytes
+    stats.seconds = time.perf_counter() - started
+    if wait_indexed > 0:
+        index_started = time.perf_counter()
+        _wait_indexed(client, collection, wait_indexed)
+        stats.index_seconds = time.perf_counter() - index_started
+    engine.query_cache.invalidate_tiers([tier])
+    return stats
+
+
+def describe(path: Path) -> Dict[str, Any]:
+    """Header and row count of a snapshot, verifying every chunk's checksum."""
+    with open(path, "rb") as fh:
+        reader = SnapshotReader(fh)
+        rows = sum(len(ids) for ids, _, _ in reader.chunks())
+        return {**reader.header, "rows": rows, "mb": round(reader.bytes / 2 ** 20, 2)}
@@ -0,0 +1,370 @@
+"""Durable ingestion work queue shared by any number of worker processes.
+
+A coordinator enumerates files into a SQLite database (:meth:`WorkQueue.enqueue`);
+workers on the same host or on other hosts that mount the same filesystem
+claim batches of them (:meth:`WorkQueue.claim`), ingest them and mark them
+done. Each claimed job carries a lease:
+
+* a worker extends the leases of its jobs with :meth:`WorkQueue.heartbeat`
+  while it makes progress (:func:`run_worker` stops renewing once one
+  ingest call has run for ``stall`` seconds);
+* a job whose lease expired (its worker crashed or hung) goes back to
+  ``pending`` on the next claim by anyone, up to ``max_attempts`` claims,
+  after which it is ``failed``;
+* completing a job is refused once its lease has moved to another worker,
+  so a worker that stalled past its lease cannot overwrite the newer
+  result.
+
+Claims run in ``BEGIN IMMEDIATE`` transactions, so two workers never get
+the same job. Paths are stored as given (resolve them first), so workers on
+other hosts need the data mounted at the same path.
+
+The database uses SQLite's rollback journal rather than WAL, because WAL
+needs shared memory and does not work across hosts. Put it on a filesystem
+with working POSIX locks (local disk, or NFS with locking enabled). Each
+claim or update is a single short transaction, so a batch of files costs a
+few transactions in total.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER,
+    mtime REAL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    chunks INTEGER,
+    error TEXT,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (lease_owner);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started REAL,
+    heartbeat REAL,
+    files INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+def worker_id() -> str:
+    """``host:pid``, unique among live workers."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path: Path, max_attempts: int = 3, timeout: float = 60.0) -> None:
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened explicitly where needed
+        self._db = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _write(self, sql: str, params: Iterable[Any] = ()) -> sqlite3.Cursor:
+        return self._db.execute(sql, tuple(params))
+
+    # --- coordinator -----------------------------------------------------------
+
+    def enqueue(self, files: Iterable[Tuple[str, int, float]], force: bool = False) -> Dict[str, int]:
+        """Add ``(path, size, mtime)`` jobs.
+
+        A known path is queued again when its size or mtime changed since it
+        was enqueued (or always with ``force``); otherwise it is left alone.
+        """
+        counts = {"added": 0, "requeued": 0, "unchanged": 0}
+        rows = list(files)
+        self._write("BEGIN IMMEDIATE")
+        try:
+            for path, size, mtime in rows:
+                current = self._db.execute("SELECT size, mtime, state FROM jobs WHERE path = ?", (path,)).fetchone()
+                if current is None:
+                    self._write("INSERT INTO jobs (path, size, mtime) VALUES (?, ?, ?)", (path, size, mtime))
+                    counts["added"] += 1
+                elif force or (current[0], current[1]) != (size, mtime):
+                    self._write(
+                        "UPDATE jobs SET size = ?, mtime = ?, state = 'pending', attempts = 0, lease_owner = NULL,"
+                        " lease_expires = NULL, error = NULL WHERE path = ?",
+                        (size, mtime, path),
+                    )
+                    counts["requeued"] += 1
+                else:
+                    counts["unchanged"] += 1
+            self._write("COMMIT")
+        except BaseException:
+            self._write("ROLLBACK")
+            raise
+        return counts
+
+    def retry_failed(self) -> int:
+        """Put every failed job back to pending with a fresh attempt budget."""
+        return self._write(
+            "UPDATE jobs SET state = 'pending', attempts = 0, error = NULL WHERE state = 'failed'"
+        ).rowcount
+
+    # --- workers ---------------------------------------------------------------
+
+    def register(self, worker: str) -> None:
+        now = time.time()
+        host, _, pid = worker.rpartition(":")
+        self._write(
+            "INSERT INTO workers (id, host, pid, started, heartbeat) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET started = excluded.started, heartbeat = excluded.heartbeat",
+            (worker, host, int(pid) if pid.isdigit() else None, now, now),
+        )
+
+    def _reclaim_expired(self, now: float) -> None:
+        # Runs inside the caller's transaction
+        self._write(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " error = CASE WHEN attempts >= ? THEN 'lease expired ' || attempts || ' times' ELSE error END,"
+            " lease_owner = NULL, lease_expires = NULL"
+            " WHERE state = 'leased' AND lease_expires < ?",
+            (self.max_attempts, self.max_attempts, now),
+        )
+
+    def claim(self, worker: str, batch: int, lease: float) -> List[Tuple[int, str]]:
+        """Lease up to ``batch`` pending jobs to ``worker`` for ``lease`` seconds."""
+        now = time.time()
+        self._write("BEGIN IMMEDIATE")
+        try:
+            self._reclaim_expired(now)
+            rows = self._db.execute(
+                "SELECT id, path FROM jobs WHERE state = 'pending' ORDER BY id LIMIT ?", (batch,)
+            ).fetchall()
+            if rows:
+                self._db.executemany(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_owner = ?,"
+                    " lease_expires = ? WHERE id = ?",
+                    [(worker, now + lease, job_id) for job_id, _ in rows],
+                )
+            self._write("UPDATE workers SET heartbeat = ? WHERE id = ?", (now, worker))
+            self._write("COMMIT")
+        except BaseException:
+            self._write("ROLLBACK")
+            raise
+        return [(job_id, path) for job_id, path in rows]
+
+    def heartbeat(self, worker: str, lease: float) -> int:
+        """Extend the leases ``worker`` still holds; returns how many."""
+        now = time.time()
+        self._write("UPDATE workers SET heartbeat = ? WHERE id = ?", (now, worker))
+        return self._write(
+            "UPDATE jobs SET lease_expires = ? WHERE lease_owner = ? AND state = 'leased'", (now + lease, worker)
+        ).rowcount
+
+    def complete(self, worker: str, results: Dict[int, int]) -> Tuple[int, int]:
+        """Mark ``{job_id: chunks}`` done; jobs whose lease ``worker`` lost are skipped.
+
+        Returns the ``(files, chunks)`` that were actually recorded.
+        """
+        now = time.time()
+        self._write("BEGIN IMMEDIATE")
+        try:
+            done = chunks_done = 0
+            for job_id, chunks in results.items():
+                if self._write(
+                    "UPDATE jobs SET state = 'done', chunks = ?, finished = ?, error = NULL, lease_owner = NULL,"
+                    " lease_expires = NULL WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                    (chunks, now, job_id, worker),
+                ).rowcount:
+                    done += 1
+                    chunks_done += chunks
+            self._write(
+                "UPDATE workers SET files = files + ?, chunks = chunks + ?, heartbeat = ? WHERE id = ?",
+                (done, chunks_done, now, worker),
+            )
+            self._write("COMMIT")
+        except BaseException:
+            self._write("ROLLBACK")
+            raise
+        return done, chunks_done
+
+    def fail(self, worker: str, job_id: int, error: str) -> None:
+        """Record a failed attempt; the job is retried until it has used ``max_attempts``."""
+        self._write("BEGIN IMMEDIATE")
+        try:
+            self._write(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?,"
+                " lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                (self.max_attempts, error[:2000], job_id, worker),
+            )
+            self._write("UPDATE workers SET failed = failed + 1 WHERE id = ?", (worker,))
+            self._write("COMMIT")
+        except BaseException:
+            self._write("ROLLBACK")
+            raise
+
+    def release(self, worker: str) -> int:
+        """Return the jobs ``worker`` still holds to pending (clean shutdown); the attempt is not counted."""
+        return self._write(
+            "UPDATE jobs SET state = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL,"
+            " lease_expires = NULL WHERE lease_owner = ? AND state = 'leased'",
+            (worker,),
+        ).rowcount
+
+    # --- reporting -------------------------------------------------------------
+
+    def remaining(self) -> int:
+        """Jobs that are pending or leased."""
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def progress(self, window: float = 60.0, stale_after: float = 60.0) -> Dict[str, Any]:
+        """Aggregate progress across all workers.
+
+        ``files_per_s`` is the completion rate over the last ``window``
+        seconds; workers that have not sent a heartbeat for ``stale_after``
+        seconds are reported as not alive.
+        """
+        now = time.time()
+        counts = dict.fromkeys(STATES, 0)
+        for state, count in self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+            counts[state] = count
+        total = sum(counts.values())
+        recent, chunks = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM jobs WHERE state = 'done' AND finished >= ?",
+            (now - window,),
+        ).fetchone()
+        rate = recent / window
+        remaining = counts["pending"] + counts["leased"]
+        workers = [
+            {
+                "id": wid,
+                "alive": now - heartbeat < stale_after,
+                "heartbeat_age_s": round(now - heartbeat, 1),
+                "files": files,
+                "chunks": worker_chunks,
+                "failed": failed,
+                "leased": leased,
+            }
+            for wid, heartbeat, files, worker_chunks, failed, leased in self._db.execute(
+                "SELECT w.id, w.heartbeat, w.files, w.chunks, w.failed,"
+                " (SELECT COUNT(*) FROM jobs j WHERE j.lease_owner = w.id AND j.state = 'leased')"
+                " FROM workers w ORDER BY w.id"
+            )
+        ]
+        errors = self._db.execute(
+            "SELECT path, error FROM jobs WHERE state = 'failed' ORDER BY id LIMIT 10"
+        ).fetchall()
+        return {
+            "total": total,
+            **counts,
+            "percent_done": round(100 * counts["done"] / total, 1) if total else 0.0,
+            "files_per_s": round(rate, 2),
+            "chunks_per_s": round(chunks / window, 1),
+            "eta_s": round(remaining / rate) if rate else None,
+            "workers": workers,
+            "recent_failures": [{"path": p, "error": e} for p, e in errors],
+        }
+
+
+def enumerate_files(paths: Iterable[Path]) -> List[Tuple[str, int, float]]:
+    """``(resolved path, size, mtime)`` of every file under ``paths``."""
+    out = []
+    for root in paths:
+        candidates = [root] if root.is_file() else sorted(p for p in root.rglob("*") if p.is_file())
+        for item in candidates:
+            st = item.stat()
+            out.append((str(item.resolve()), st.st_size, st.st_mtime))
+    return out
+
+
+def run_worker(engine: Any, queue: WorkQueue, worker: Optional[str] = None, batch: int = 16,
+               lease: float = 300.0, poll: float = 2.0, exit_when_done: bool = False,
+               stall: float = 1800.0, log=print) -> Dict[str, int]:
+    """Claim and ingest batches until the queue is drained (``exit_when_done``) or interrupted.
+
+    Each batch is embedded and upserted together through
+    ``engine.upsert_documents``; if the batch fails, its files are retried
+    one by one so a single bad file only fails itself. A background thread
+    extends the worker's leases every ``lease / 3`` seconds, but only while
+    the current ``upsert_documents`` call has run for less than ``stall``
+    seconds: a worker hung inside the engine lets its leases expire, so
+    other workers reclaim the files. The heartbeat uses its own connection
+    because SQLite connections are not meant to be shared between threads.
+    """
+    import threading
+
+    worker = worker or worker_id()
+    queue.register(worker)
+    stop = threading.Event()
+    # Start of the ingest call in progress (monotonic), None between calls
+    busy_since: List[Optional[float]] = [None]
+
+    def beat() -> None:
+        hb = WorkQueue(queue.path, queue.max_attempts)
+        try:
+            while not stop.wait(lease / 3):
+                started = busy_since[0]
+                if started is not None and time.monotonic() - started > stall:
+                    continue  # hung: stop renewing
+                hb.heartbeat(worker, lease)
+        finally:
+            hb.close()
+
+    heart = threading.Thread(target=beat, name="ingest-heartbeat", daemon=True)
+    heart.start()
+    totals = {"files": 0, "chunks": 0, "failed": 0}
+    try:
+        while True:
+            jobs = queue.claim(worker, batch, lease)
+            if not jobs:
+                if exit_when_done and queue.remaining() == 0:
+                    break
+                time.sleep(poll)
+                continue
+            paths = [Path(path) for _, path in jobs]
+            try:
+                busy_since[0] = time.monotonic()
+                results = engine.upsert_documents(paths)
+                done = {job_id: results.get(path, 0) for (job_id, _), path in zip(jobs, paths)}
+            except Exception as exc:
+                log(f"[{worker}] batch of {len(jobs)} failed ({exc}); retrying files one by one")
+                done = {}
+                for (job_id, _), path in zip(jobs, paths):
+                    try:
+                        busy_since[0] = time.monotonic()
+                        done[job_id] = engine.upsert_documents([path]).get(path, 0)
+                    except Exception as file_exc:
+                        log(f"[{worker}] failed to ingest {path}: {file_exc}")
+                        queue.fail(worker, job_id, f"{type(file_exc).__name__}: {file_exc}")
+                        totals["failed"] += 1
+            busy_since[0] = None
+            if done:
+                files, chunks = queue.complete(worker, done)
+                totals["files"] += files
+                totals["chunks"] += chunks
+                lost = len(done) - files
+                log(f"[{worker}] ingested {files} files ({chunks} chunks)"
+                    + (f"; {lost} lost their lease and were not recorded" if lost else ""))
+    except KeyboardInterrupt:
+        log(f"[{worker}] interrupted, releasing {queue.release(worker)} leased jobs")
+    finally:
+        stop.set()
+        heart.join()
+    return totals
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""Bring existing tier collections in line with their collection profiles.
+
+Usage:
+    python scripts/apply_profiles.py --dry-run   # show what would change
+    python scripts/apply_profiles.py             # update collections in place
+
+Profiles come from ``COLLECTION_PROFILES`` (see ``app/profiles.py``).  Only
+stored settings (on-disk vectors, quantization, HNSW parameters) are
+updated; search-time settings take effect on the next query anyway.
+Collections that do not exist yet are created with their profile on first
+ingest.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply collection profiles to existing Qdrant collections.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the differences")
+    args = parser.parse_args()
+
+    from app.rag import RagEngine
+
+    engine = RagEngine()
+    for tier, entry in engine.apply_profiles(dry_run=args.dry_run).items():
+        print(f"{tier:12} {entry['collection']:20} {entry['profile']:16} {entry['status']}")
+        for setting, (current, wanted) in entry["changes"].items():
+            print(f"{'':14}{setting}: {current} -> {wanted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""Measure how ingestion throughput scales with the number of queue workers.
+
+Usage:
+    python scripts/bench_ingest_queue.py --workers 1 2 4 8 --files 2000 --work-ms 20
+    python scripts/bench_ingest_queue.py --workers 4 --kill-one 2 --lease 3
+
+Each run enqueues ``--files`` synthetic jobs into a fresh queue and starts
+that many worker processes running :func:`app.workqueue.run_worker`. The
+workers use a stand-in engine that spends ``--work-ms`` per file, without
+holding the GIL, in place of embedding and upserting. The bench therefore
+measures what the queue itself costs (claims, leases, completions under
+contention), not the embedder or Qdrant. Reported per worker count:
+files/s, speed-up over the per-worker rate of the first row, and efficiency
+(speed-up / workers).
+
+``--kill-one N`` SIGKILLs one worker after N seconds. Its leased files come
+back once ``--lease`` expires and the other workers finish them; with a
+single worker nothing is left to reclaim them, so that run ends short
+(files/s counts completed files only).
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from pathlib import Path
+
+
+class SleepEngine:
+    def __init__(self, work_ms: float) -> None:
+        self.work_s = work_ms / 1000
+
+    def upsert_documents(self, paths):
+        time.sleep(self.work_s * len(paths))
+        return {path: 4 for path in paths}
+
+
+def worker(queue_path: str, work_ms: float, batch: int, lease: float) -> None:
+    from app.workqueue import WorkQueue, run_worker
+
+    run_worker(SleepEngine(work_ms), WorkQueue(Path(queue_path)), batch=batch, lease=lease, poll=0.1,
+               exit_when_done=True, log=lambda *_: None)
+
+
+def run(workers: int, args: argparse.Namespace) -> dict:
+    from app.workqueue import WorkQueue
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue_path = os.path.join(tmp, "queue.db")
+        queue = WorkQueue(Path(queue_path))
+        queue.enqueue((f"/bench/doc_{n:06d}.txt", 1000, 0.0) for n in range(args.files))
+        started = time.perf_counter()
+        procs = [multiprocessing.Process(target=worker, args=(queue_path, args.work_ms, args.batch, args.lease))
+                 for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        if args.kill_one:
+            time.sleep(args.kill_one)
+            os.kill(procs[0].pid, signal.SIGKILL)
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - started
+        report = queue.progress(window=elapsed + 1)
+        return {"workers": workers, "seconds": round(elapsed, 2), "files_per_s": round(report["done"] / elapsed, 1),
+                "done": report["done"], "failed": report["failed"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark work-queue ingestion scaling.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--work-ms", type=float, default=20.0, help="Simulated embed + upsert time per file")
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--lease", type=float, default=30.0)
+    parser.add_argument("--kill-one", type=float, metavar="SECONDS", help="SIGKILL one worker after SECONDS")
+    args = parser.parse_args()
+
+    rows = [run(n, args) for n in args.workers]
+    base = rows[0]["files_per_s"] / rows[0]["workers"]
+    print(f"{args.files} files, {args.work_ms} ms each, batches of {args.batch}")
+    print(f"{'workers':>8} {'seconds':>9} {'files/s':>9} {'speed-up':>9} {'efficiency':>11} {'done':>6} {'failed':>7}")
+    for row in rows:
+        speedup = row["files_per_s"] / base if base else 0.0
+        print(f"{row['workers']:>8} {row['seconds']:>9} {row['files_per_s']:>9} {speedup:>9.2f}"
+              f" {speedup / row['workers']:>11.0%} {row['done']:>6} {row['failed']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""Compare the in-process local index with Qdrant for a small tier.
+
+Usage:
+    python scripts/bench_local_index.py --points 5000 --dim 384
+    python scripts/bench_local_index.py --profiles exact default --local
+
+Both backends get the same synthetic clustered unit vectors (see
+``bench_profiles.py``) and the same queries. Reported per backend:
+
+``recall``
+    Recall@k against exact top-k computed with NumPy.
+``p50_ms`` / ``p95_ms`` / ``qps``
+    Latency of sequential single-query searches, as ``RagEngine.query``
+    issues them.
+``batch_qps``
+    Throughput when all queries are sent at once (``search_batch`` for the
+    local index, ``search_batch`` of the Qdrant client otherwise).
+``build_s``
+    Time to insert every point in batches of 1000.
+
+The local index is additionally timed deleting a tenth of its rows and
+compacting. It is built in a temporary directory; Qdrant scratch
+collections ``bench_local_<n>`` are deleted afterwards. ``--local`` runs
+Qdrant in process, which removes the network hop and ignores index settings,
+so it understates what a Qdrant server costs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench_profiles import make_data
+
+
+def summarise(name: str, latencies, hits: int, total: int, batch_s: float, queries: int, build_s: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "backend": name,
+        "recall": round(hits / total, 4),
+        "p50_ms": round(latencies[len(latencies) // 2], 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "qps": round(1000 * len(latencies) / sum(latencies), 1),
+        "batch_qps": round(queries / batch_s, 1),
+        "build_s": round(build_s, 2),
+    }
+
+
+def bench_local(data, queries, truth, top_k: int) -> tuple:
+    from app.local_index import LocalIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = LocalIndex(tmp)
+        started = time.perf_counter()
+        for start in range(0, len(data), 1000):
+            batch = data[start:start + 1000]
+            index.add([str(i) for i in range(start, start + len(batch))], batch,
+                      [{"row": i} for i in range(start, start + len(batch))])
+        build_s = time.perf_counter() - started
+
+        latencies = []
+        hits = 0
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            found = index.search(q, top_k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len({int(pid) for _, pid, _ in found} & set(expected.tolist()))
+        t0 = time.perf_counter()
+        index.search_batch(queries, top_k)
+        batch_s = time.perf_counter() - t0
+        row = summarise("local", latencies, hits, top_k * len(queries), batch_s, len(queries), build_s)
+
+        doomed = [str(i) for i in range(0, len(data), 10)]
+        t0 = time.perf_counter()
+        index.delete(doomed)
+        delete_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        index.compact()
+        compact_ms = (time.perf_counter() - t0) * 1000
+        maintenance = {"deleted": len(doomed), "delete_ms": round(delete_ms, 1), "compact_ms": round(compact_ms, 1),
+                       "file_mb": index.stats()["file_mb"]}
+    return row, maintenance
+
+
+def bench_qdrant(client, n: int, profile, data, queries, truth, top_k: int) -> dict:
+    from qdrant_client.http import models as qmodels
+
+    name = f"bench_local_{n}"
+    client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=profile.vectors_config(data.shape[1]),
+        hnsw_config=profile.hnsw_config(),
+        quantization_config=profile.quantization_config(),
+    )
+    try:
+        started = time.perf_counter()
+        for start in range(0, len(data), 1000):
+            batch = data[start:start + 1000]
+            client.upsert(name, points=qmodels.Batch(ids=list(range(start, start + len(batch))),
+                                                     vectors=batch.tolist()), wait=True)
+        build_s = time.perf_counter() - started
+
+        params = profile.search_params()
+        latencies = []
+        hits = 0
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            found = client.search(name, q.tolist(), limit=top_k, search_params=params)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len({p.id for p in found} & set(expected.tolist()))
+        requests = [qmodels.SearchRequest(vector=q.tolist(), limit=top_k, params=params) for q in queries]
+        t0 = time.perf_counter()
+        client.search_batch(name, requests)
+        batch_s = time.perf_counter() - t0
+        return summarise(f"qdrant:{profile.name}", latencies, hits, top_k * len(queries), batch_s,
+                         len(queries), build_s)
+    finally:
+        client.delete_collection(name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the local index against Qdrant.")
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--profiles", nargs="*", default=["exact", "default"],
+                        help="Qdrant profiles to compare against (none to skip Qdrant)")
+    parser.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+    parser.add_argument("--local", action="store_true", help="Use in-process Qdrant (no network hop)")
+    args = parser.parse_args()
+
+    import numpy as np
+
+    from app.profiles import make_profile
+
+    data, queries = make_data(args.points, args.queries, args.dim, args.clusters, args.seed)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, : args.top_k]
+
+    local_row, maintenance = bench_local(data, queries, truth, args.top_k)
+    rows = [local_row]
+    if args.profiles:
+        from qdrant_client import QdrantClient
+
+        client = QdrantClient(":memory:") if args.local else QdrantClient(host=args.host, port=args.port, timeout=120)
+        for n, spec in enumerate(args.profiles):
+            profile = make_profile(json.loads(spec) if spec.lstrip().startswith("{") else spec)
+            rows.append(bench_qdrant(client, n, profile, data, queries, truth, args.top_k))
+
+    mode = "in-process" if args.local else f"{args.host}:{args.port}"
+    print(f"{args.points} points x {args.dim} dims, {args.queries} queries, k={args.top_k}, qdrant {mode}")
+    header = list(rows[0])
+    print("  ".join(f"{h:>14}" for h in header))
+    for row in rows:
+        print("  ".join(f"{row[h]:>14}" for h in header))
+    print("local maintenance: " + ", ".join(f"{k}={v}" for k, v in maintenance.items()))
+
+
+if __name__ == "__main__":
+    main()
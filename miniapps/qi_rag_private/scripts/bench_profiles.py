@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Compare collection profiles: memory versus recall versus search latency.
+
+Usage:
+    python scripts/bench_profiles.py --points 50000 --dim 384
+    python scripts/bench_profiles.py --profiles default large '{"base": "large", "ef": 64}'
+
+For every profile a scratch collection ``bench_<n>`` is filled with the same
+synthetic clustered unit vectors, the script waits for Qdrant to finish
+indexing, then runs the same queries against it.  Reported per profile:
+
+``ram_mb``
+    Estimated resident size: float32 vectors unless ``on_disk``, the int8
+    copy when quantized with ``always_ram``, and the HNSW links
+    (``2 × m`` 4-byte ids per point on level 0) unless the graph is on disk.
+``recall``
+    Recall@k against exact top-k computed with NumPy.
+``p50_ms`` / ``p95_ms`` / ``qps``
+    Client-side latency of sequential searches.
+
+The scratch collections are deleted afterwards unless ``--keep`` is given.
+``--local`` runs against qdrant_client's in-process mode, which ignores
+index and quantization settings; use it only to check the script itself.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+
+def estimate_ram_mb(profile, points: int, dim: int) -> float:
+    total = 0 if profile.on_disk else points * dim * 4
+    if profile.quantization == "int8" and profile.always_ram:
+        total += points * dim
+    if not profile.hnsw_on_disk:
+        total += points * profile.hnsw_m * 2 * 4
+    return total / 2 ** 20
+
+
+def make_data(points: int, queries: int, dim: int, clusters: int, seed: int):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=points + queries)
+    data = centers[labels] + 0.6 * rng.normal(size=(points + queries, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data[:points], data[points:]
+
+
+def wait_indexed(client, name: str, points: int, timeout: float) -> None:
+    from qdrant_client.http import models as qmodels
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get_collection(name)
+        if info.status == qmodels.CollectionStatus.GREEN and (info.points_count or 0) >= points:
+            return
+        time.sleep(0.5)
+    print(f"warning: {name} still indexing after {timeout:.0f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Qdrant collection profiles.")
+    parser.add_argument("--profiles", nargs="+", default=["default", "large", "compact", "exact"],
+                        help="Built-in profile names or JSON overrides")
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+    parser.add_argument("--local", action="store_true", help="Use in-process Qdrant (ignores index settings)")
+    parser.add_argument("--index-timeout", type=float, default=600.0)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch collections")
+    args = parser.parse_args()
+
+    import numpy as np
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qmodels
+
+    from app.profiles import make_profile
+
+    profiles = [make_profile(json.loads(p) if p.lstrip().startswith("{") else p) for p in args.profiles]
+    client = QdrantClient(":memory:") if args.local else QdrantClient(host=args.host, port=args.port, timeout=120)
+    data, queries = make_data(args.points, args.queries, args.dim, args.clusters, args.seed)
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, : args.top_k]
+
+    rows = []
+    for n, profile in enumerate(profiles):
+        name = f"bench_{n}"
+        client.delete_collection(name)
+        client.create_collection(
+            collection_name=name,
+            vectors_config=profile.vectors_config(args.dim),
+            hnsw_config=profile.hnsw_config(),
+            quantization_config=profile.quantization_config(),
+        )
+        started = time.perf_counter()
+        for start in range(0, args.points, 1000):
+            batch = data[start:start + 1000]
+            client.upsert(name, points=qmodels.Batch(ids=list(range(start, start + len(batch))),
+                                                     vectors=batch.tolist()), wait=True)
+        wait_indexed(client, name, args.points, args.index_timeout)
+        build_s = time.perf_counter() - started
+
+        params = profile.search_params()
+        latencies = []
+        hits = 0
+        for q, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            found = client.search(name, q.tolist(), limit=args.top_k, search_params=params)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len({p.id for p in found} & set(expected.tolist()))
+        latencies.sort()
+        rows.append({
+            "profile": profile.name,
+            "ram_mb": round(estimate_ram_mb(profile, args.points, args.dim), 1),
+            "recall": round(hits / (args.top_k * len(queries)), 4),
+            "p50_ms": round(latencies[len(latencies) // 2], 2),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+            "qps": round(1000 * len(latencies) / sum(latencies), 1),
+            "build_s": round(build_s, 1),
+        })
+        if not args.keep:
+            client.delete_collection(name)
+
+    mode = "in-process (settings ignored)" if args.local else f"{args.host}:{args.port}"
+    print(f"{args.points} points x {args.dim} dims, {args.queries} queries, k={args.top_k}, {mode}")
+    header = list(rows[0])
+    print("  ".join(f"{h:>16}" for h in header))
+    for row in rows:
+        print("  ".join(f"{row[h]:>16}" for h in header))
+
+
+if __name__ == "__main__":
+    main()
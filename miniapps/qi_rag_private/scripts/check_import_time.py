@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""Fail if cold start of the RAG entry points exceeds an import-time budget.
+
+Each entry point runs in a fresh interpreter with ``python -X importtime``
+and the cumulative time of its top-level imports is summed.  The check fails
+(exit status 1) when that sum exceeds the entry point's budget or when a heavy module that
+should only load on first use (torch, sentence_transformers, qdrant_client,
+watchdog) shows up during the cold start.
+
+Usage:
+    python scripts/check_import_time.py                 # check against the default budgets
+    python scripts/check_import_time.py --scale 2       # slow machine
+    python scripts/check_import_time.py --record importtime.txt
+
+``--record`` writes the raw ``-X importtime`` output of every entry point to
+the given file so a profile can be kept alongside a change.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+APP_ROOT = Path(__file__).resolve().parent.parent
+
+# name -> (interpreter arguments, budget in ms), run from a staged copy of
+# APP_ROOT.  The CLI budgets cover the interpreter plus argparse; the API
+# budget is dominated by FastAPI/pydantic, which the server needs anyway.
+ENTRY_POINTS: Dict[str, Tuple[List[str], float]] = {
+    "ingest --help": (["scripts/ingest.py", "--help"], 250.0),
+    "ingest worker --help": (["scripts/ingest.py", "worker", "--help"], 250.0),
+    "watch_folder --help": (["scripts/watch_folder.py", "--help"], 250.0),
+    "import app.rag": (["-c", "import app.rag; app.rag.RagEngine()"], 250.0),
+    "import app.main": (["-c", "import app.main"], 1500.0),
+}
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "qdrant_client", "watchdog")
+
+
+def staged_root(tmp: Path) -> Path:
+    """Lay out ``app/`` and ``scripts/`` like the Docker image does.
+
+    The cockpit stub ``app.py`` next to the ``app/`` package would otherwise
+    shadow it on ``sys.path``; the image only copies the two directories.
+    """
+    for name in ("app", "scripts"):
+        try:
+            (tmp / name).symlink_to(APP_ROOT / name, target_is_directory=True)
+        except OSError:  # e.g. Windows without symlink privilege
+            shutil.copytree(APP_ROOT / name, tmp / name)
+    return tmp
+
+
+def profile(root: Path, args: List[str]) -> Tuple[int, str]:
+    """Run one entry point under ``-X importtime``; return (exit code, stderr)."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(root), env.get("PYTHONPATH", "")) if p)
+    env.pop("PYTHONSTARTUP", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=root,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return proc.returncode, proc.stderr
+
+
+def parse_importtime(output: str) -> Tuple[float, List[str]]:
+    """Return (total top-level cumulative ms, every imported module name)."""
+    total_us = 0
+    modules: List[str] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        modules.append(name.strip())
+        # Nested imports are indented by two spaces per level
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative)
+    return total_us / 1000.0, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check cold import time of the RAG entry points.")
+    parser.add_argument("--scale", type=float, default=float(os.getenv("IMPORT_BUDGET_SCALE", "1.0")),
+                        help="Multiply every budget, e.g. 2 on a slow CI runner (env IMPORT_BUDGET_SCALE)")
+    parser.add_argument("--record", type=Path, help="Write the raw -X importtime output to this file")
+    args = parser.parse_args()
+
+    failures = 0
+    recorded: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = staged_root(Path(tmp))
+        results = [(name, budget * args.scale, *profile(root, entry))
+                   for name, (entry, budget) in ENTRY_POINTS.items()]
+
+    for name, budget_ms, code, output in results:
+        total_ms, modules = parse_importtime(output)
+        heavy = sorted({m.split(".")[0] for m in modules if m.split(".")[0] in HEAVY_MODULES})
+        problems = []
+        if code != 0:
+            problems.append(f"exit status {code}")
+        if total_ms > budget_ms:
+            problems.append(f"over the {budget_ms:.0f} ms budget")
+        if heavy:
+            problems.append("loads " + ", ".join(heavy))
+        status = "FAIL" if problems else "ok"
+        print(f"{status:4}  {name:22} {total_ms:8.1f} / {budget_ms:6.0f} ms  {len(modules):4} modules"
+              + (f"  ({'; '.join(problems)})" if problems else ""))
+        if problems:
+            failures += 1
+            if code != 0:
+                print("\n".join(l for l in output.splitlines() if not l.startswith("import time:")))
+        recorded.append(f"### {name}: {total_ms:.1f} ms, {len(modules)} modules\n{output}")
+
+    if args.record:
+        args.record.write_text("\n".join(recorded), encoding="utf-8")
+        print(f"Profile written to {args.record}")
+    print(f"{len(results)} entry points, {failures} failing")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,17 +8,36 @@ The script walks through the provided path.  If a file is given it is ingested
 directly; if a directory is given all files within are ingested recursively.
 
 The ingestion honours classification tiers defined in your environment.
+When it finishes, the time spent per format in each load stage (read, parse,
+front-matter, tier, chunk) is printed.
+
+Large re-indexes can be spread over many processes and hosts through a
+durable work queue (see :mod:`app.workqueue`):
+
+    python scripts/ingest.py enqueue /data          # coordinator: queue new and changed files
+    python scripts/ingest.py worker                 # run as many of these as you like
+    python scripts/ingest.py progress --watch 5     # aggregate progress and live workers
+    python scripts/ingest.py retry                  # re-queue failed files
+
+All of them use the queue at ``--queue`` (default ``$INGEST_QUEUE`` or
+``./ingest_queue.db``).
 """
 
 from __future__ import annotations
 
 import argparse
+import json
+import os
+import sys
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from app.rag import RagEngine
+if TYPE_CHECKING:
+    from app.rag import RagEngine
 
 
-def ingest_path(engine: RagEngine, path: Path) -> None:
+def ingest_path(engine: "RagEngine", path: Path) -> None:
     if path.is_dir():
         for item in path.rglob("*"):
             if item.is_file():
@@ -32,13 +51,110 @@ def ingest_path(engine: RagEngine, path: Path) -> None:
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Ingest documents into Qdrant.")
+    if len(sys.argv) > 1 and sys.argv[1] in QUEUE_COMMANDS:
+        queue_main(sys.argv[1:])
+        return
+    parser = argparse.ArgumentParser(
+        description="Ingest documents into Qdrant.",
+        epilog=f"Queue commands: {', '.join(QUEUE_COMMANDS)} (see '%(prog)s <command> --help').",
+    )
     parser.add_argument("paths", nargs="+", type=Path, help="Files or directories to ingest")
     args = parser.parse_args()
 
+    # Imported after parsing so ``--help`` and usage errors stay fast
+    from app.rag import RagEngine
+
     engine = RagEngine()
     for path in args.paths:
         ingest_path(engine, path)
+    print_load_stats(engine.load_stats.snapshot())
+
+
+QUEUE_COMMANDS = ("enqueue", "worker", "progress", "retry")
+
+
+def queue_main(argv: list) -> None:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--queue", type=Path, default=Path(os.getenv("INGEST_QUEUE", "./ingest_queue.db")),
+                        help="Queue database shared by the coordinator and all workers")
+    common.add_argument("--max-attempts", type=int, default=3, help="Claims per file before it is marked failed")
+    parser = argparse.ArgumentParser(prog="ingest.py", description="Distributed ingestion through a work queue.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("enqueue", parents=[common], help="Queue every new or changed file under the given paths")
+    p.add_argument("paths", nargs="+", type=Path)
+    p.add_argument("--force", action="store_true", help="Queue unchanged files again too")
+
+    p = sub.add_parser("worker", parents=[common], help="Claim and ingest batches until stopped")
+    p.add_argument("--batch", type=int, default=16, help="Files claimed, embedded and upserted together")
+    p.add_argument("--lease", type=float, default=300.0, help="Seconds before an unrenewed claim is reclaimed")
+    p.add_argument("--poll", type=float, default=2.0, help="Seconds to wait when the queue is empty")
+    p.add_argument("--stall", type=float, default=1800.0,
+                   help="Stop renewing leases once one batch has run this long (hung worker)")
+    p.add_argument("--exit-when-done", action="store_true", help="Exit once nothing is pending or leased")
+    p.add_argument("--threads", type=int, help="Limit the embedder's CPU threads (one worker per core group)")
+
+    p = sub.add_parser("progress", parents=[common], help="Show aggregate progress")
+    p.add_argument("--watch", type=float, metavar="SECONDS", help="Refresh every SECONDS until done")
+    p.add_argument("--json", action="store_true", help="Print the raw progress report")
+
+    sub.add_parser("retry", parents=[common], help="Re-queue files that failed")
+    args = parser.parse_args(argv)
+
+    from app.workqueue import WorkQueue, enumerate_files, run_worker
+
+    queue = WorkQueue(args.queue, max_attempts=args.max_attempts)
+    if args.command == "enqueue":
+        counts = queue.enqueue(enumerate_files(args.paths), force=args.force)
+        print(f"added {counts['added']}, requeued {counts['requeued']}, unchanged {counts['unchanged']}")
+    elif args.command == "retry":
+        print(f"requeued {queue.retry_failed()} failed files")
+    elif args.command == "progress":
+        while True:
+            report = queue.progress()
+            print(json.dumps(report, indent=2) if args.json else format_progress(report))
+            if not args.watch or report["pending"] + report["leased"] == 0:
+                break
+            time.sleep(args.watch)
+    else:
+        if args.threads:
+            # Must be set before torch is imported by the embedder
+            for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+                os.environ[var] = str(args.threads)
+        from app.rag import RagEngine
+
+        engine = RagEngine()
+        totals = run_worker(engine, queue, batch=args.batch, lease=args.lease, poll=args.poll,
+                            exit_when_done=args.exit_when_done, stall=args.stall)
+        print(f"worker done: {totals['files']} files, {totals['chunks']} chunks, {totals['failed']} failed")
+        print_load_stats(engine.load_stats.snapshot())
+
+
+def format_progress(report: dict) -> str:
+    eta = f"{report['eta_s']}s" if report["eta_s"] is not None else "-"
+    lines = [
+        f"{report['done']}/{report['total']} done ({report['percent_done']}%), {report['pending']} pending,"
+        f" {report['leased']} in progress, {report['failed']} failed;"
+        f" {report['files_per_s']} files/s, {report['chunks_per_s']} chunks/s, ETA {eta}"
+    ]
+    for w in report["workers"]:
+        state = "alive" if w["alive"] else f"silent {w['heartbeat_age_s']}s"
+        lines.append(f"  {w['id']:<32} {state:<14} {w['files']:>7} files {w['chunks']:>9} chunks"
+                     f" {w['failed']:>4} failed {w['leased']:>4} leased")
+    for failure in report["recent_failures"]:
+        lines.append(f"  failed: {failure['path']}: {failure['error']}")
+    return "\n".join(lines)
+
+
+def print_load_stats(stats: dict) -> None:
+    if not stats:
+        return
+    stages = list(next(iter(stats.values()))["avg_ms"])
+    print(f"\n{'format':10} {'files':>6} {'MB':>8} " + " ".join(f"{s + ' ms':>10}" for s in stages))
+    for fmt, entry in sorted(stats.items()):
+        print(f"{fmt:10} {entry['files']:6d} {entry['bytes'] / 2**20:8.2f} "
+              + " ".join(f"{entry['avg_ms'][s]:10.3f}" for s in stages))
+    print("(stage times are per file averages)")
 
 
 if __name__ == "__main__":
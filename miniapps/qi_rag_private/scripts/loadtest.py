@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+"""Load-test the RAG API over HTTP against stub backends.
+
+Usage:
+    python scripts/loadtest.py run --clients 1 2 4 8 16 --step-seconds 10 --out reports/base.json
+    python scripts/loadtest.py run --env LLM_MAX_CONCURRENCY=4 --ollama-latency 0.2 --ollama-tps 50
+    python scripts/loadtest.py compare reports/base.json reports/new.json
+    python scripts/loadtest.py fake-ollama --port 11434 --tps 30
+
+``run`` starts the FastAPI app in a separate process (uvicorn, one worker)
+on an in-memory Qdrant and a deterministic hashing embedder, and points it
+at a fake Ollama server running in this process. The fake waits
+``--ollama-latency`` seconds plus ``--ollama-tokens / --ollama-tps`` per
+generation. A synthetic corpus is written to a temporary ``DATA_ROOT`` and
+ingested, then the number of concurrent clients is stepped through
+``--clients``. Each client loops for ``--step-seconds``, picking ``/chat``
+or ``/ingest`` by the ``--mix`` weights.
+
+For every step and endpoint the report has the request count, throughput
+of all requests (``rps``) and of successful ones (``ok_rps``), p50/p95/p99/max
+latency of successful requests, error rate and status codes, plus the
+server's ``/metrics`` at the end of the step. A ``503`` from the LLM queue
+returns at once, so only ``ok_rps`` shows capacity. Settings for the app (scheduler limits,
+cache size, ``LOCAL_INDEX_TIERS``...) are passed with ``--env``. ``compare``
+prints the change between two reports for each step and endpoint. It exits
+1 if ``ok_rps`` fell or p95 latency rose by more than ``--threshold``, or if
+the error rate went up. Rows with fewer than ``--min-requests`` requests in
+either report are skipped.
+
+The in-memory Qdrant is not thread-safe, so the stub serialises calls to it.
+The numbers measure the API, the scheduler and the cache, not Qdrant or a
+real model.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from check_import_time import staged_root
+
+APP_ROOT = Path(__file__).resolve().parents[1]
+TIER_FOLDERS = {"unclass": "UNCLASS", "classified": "CLASSIFIED", "ultra": "ULTRA", "meo": "MEO"}
+WORDS = (
+    "budget contract invoice payroll audit vendor policy access badge clearance server backup network "
+    "incident report travel schedule meeting minutes roadmap release customer support ticket warranty "
+    "shipment inventory forecast quarter revenue expense approval training onboarding laptop password "
+    "firewall database migration archive retention compliance review deadline project milestone risk"
+).split()
+
+
+# --- stub backends ------------------------------------------------------------
+
+
+class HashEmbedder:
+    """Deterministic bag-of-words embedder: each word adds ±1 to a hashed dimension.
+
+    Texts sharing words get similar vectors, which is enough for retrieval and
+    the semantic cache to behave plausibly without loading a model.
+    """
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+
+    def encode(self, texts):
+        import numpy as np
+
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                out[row, value % self.dim] += 1.0 if value >> 63 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+class LockedClient:
+    """Serialise every call to a client that is not thread-safe (local-mode Qdrant)."""
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return locked
+
+
+def make_fake_ollama(port: int, latency: float, tps: float, tokens: int) -> ThreadingHTTPServer:
+    """An ``/api/generate`` endpoint that answers after ``latency + tokens / tps`` seconds."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+            time.sleep(latency + (tokens / tps if tps > 0 else 0.0))
+            rng = random.Random(body.get("prompt", ""))
+            data = json.dumps({
+                "model": body.get("model", ""),
+                "response": " ".join(rng.choice(WORDS) for _ in range(tokens)),
+                "done": True,
+                "eval_count": tokens,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Run the API on stub backends (started by ``run`` as a child process)."""
+    import uvicorn
+    from qdrant_client import QdrantClient
+
+    from app import main as api
+    from app.rag import RagEngine
+
+    api.set_engine(RagEngine(client=LockedClient(QdrantClient(":memory:")), embedder=HashEmbedder(args.dim)))
+    uvicorn.run(api.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# --- workload -----------------------------------------------------------------
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_corpus(root: Path, files: int, words: int, seed: int) -> List[str]:
+    """Write ``files`` text files spread over the tier folders; returns their paths relative to ``root``."""
+    rng = random.Random(seed)
+    folders = list(TIER_FOLDERS)
+    paths = []
+    for n in range(files):
+        rel = f"{folders[n % len(folders)]}/doc_{n:05d}.txt"
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(" ".join(rng.choice(WORDS) for _ in range(words)), encoding="utf-8")
+        paths.append(rel)
+    return paths
+
+
+def make_questions(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [f"what about the {' '.join(rng.sample(WORDS, 4))}?" for _ in range(count)]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))]
+
+
+def summarise(samples: List[tuple], elapsed: float) -> Dict[str, dict]:
+    """Per-endpoint statistics for ``(endpoint, status, ms)`` samples; status 0 is a client-side error."""
+    by_endpoint: Dict[str, list] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    out = {}
+    for endpoint, rows in sorted(by_endpoint.items()):
+        statuses: Dict[str, int] = defaultdict(int)
+        for _, status, _ in rows:
+            statuses[str(status)] += 1
+        ok = sorted(ms for _, status, ms in rows if 200 <= status < 300)
+        latencies = ok or sorted(ms for _, _, ms in rows)
+        errors = len(rows) - len(ok)
+        out[endpoint] = {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4),
+            "rps": round(len(rows) / elapsed, 2),
+            "ok_rps": round(len(ok) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p95_ms": round(percentile(latencies, 0.95), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+            "max_ms": round(latencies[-1], 1),
+            "status": dict(sorted(statuses.items())),
+        }
+    return out
+
+
+def run_step(base: str, clients: int, seconds: float, mix: Dict[str, float], paths: List[str],
+             questions: List[str], tiers: str, timeout: float, seed: int) -> tuple:
+    import requests
+
+    samples: List[tuple] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    endpoints, weights = zip(*mix.items())
+
+    def client(n: int) -> None:
+        rng = random.Random(seed * 1000 + n)
+        session = requests.Session()
+        local = []
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            started = time.perf_counter()
+            try:
+                if endpoint == "chat":
+                    resp = session.post(f"{base}/chat", params={"question": rng.choice(questions), "tiers": tiers},
+                                        timeout=timeout)
+                else:
+                    resp = session.post(f"{base}/ingest", json={"path": rng.choice(paths)}, timeout=timeout)
+                status = resp.status_code
+            except requests.RequestException:
+                status = 0
+            local.append((endpoint, status, (time.perf_counter() - started) * 1000))
+        with lock:
+            samples.extend(local)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.monotonic() - started
+
+
+def wait_ready(base: str, proc: subprocess.Popen, timeout: float) -> None:
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"API server exited with code {proc.returncode}")
+        try:
+            if requests.get(base + "/", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"API server not ready after {timeout:.0f}s")
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*cmd: str) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *cmd], cwd=APP_ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("chat", "ingest"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} in --mix (chat, ingest)")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run(args: argparse.Namespace) -> None:
+    import requests
+
+    overrides = dict(item.split("=", 1) for item in args.env)
+    ollama = make_fake_ollama(free_port(), args.ollama_latency, args.ollama_tps, args.ollama_tokens)
+    threading.Thread(target=ollama.serve_forever, daemon=True).start()
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        data_root = Path(tmp) / "data"
+        root = Path(tmp) / "root"
+        root.mkdir()
+        staged_root(root)
+        paths = make_corpus(data_root, args.files, args.words, args.seed)
+        questions = make_questions(args.questions, args.seed)
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(p for p in (str(root), os.getenv("PYTHONPATH", "")) if p),
+            "DATA_ROOT": str(data_root),
+            "FOLDER_TIERS": ",".join(f"{folder}:{tier}" for folder, tier in TIER_FOLDERS.items()),
+            "TIER_COLLECTIONS": ",".join(f"{tier}:q_{tier.lower()}" for tier in TIER_FOLDERS.values()),
+            "LOCAL_INDEX_DIR": str(Path(tmp) / "local_index"),
+            "OLLAMA_URL": f"http://127.0.0.1:{ollama.server_address[1]}",
+            "CLOUD_ENDPOINT": "",
+            **overrides,
+        }
+        proc = subprocess.Popen([sys.executable, __file__, "serve", "--port", str(port), "--dim", str(args.dim)],
+                                env=env)
+        try:
+            wait_ready(base, proc, args.startup_timeout)
+            session = requests.Session()
+            started = time.monotonic()
+            for rel in paths:
+                session.post(f"{base}/ingest", json={"path": rel}, timeout=args.timeout).raise_for_status()
+            print(f"ingested {len(paths)} files in {time.monotonic() - started:.1f}s")
+
+            steps = []
+            for clients in args.clients:
+                samples, elapsed = run_step(base, clients, args.step_seconds, args.mix, paths, questions,
+                                            args.tiers, args.timeout, args.seed)
+                endpoints = summarise(samples, elapsed)
+                metrics = session.get(f"{base}/metrics", timeout=args.timeout).json()
+                steps.append({"clients": clients, "duration_s": round(elapsed, 2), "endpoints": endpoints,
+                              "metrics": metrics})
+                for name, row in endpoints.items():
+                    print(f"{clients:>4} clients  {name:<7} {row['ok_rps']:>8.1f} ok/s  p50 {row['p50_ms']:>8.1f}"
+                          f"  p95 {row['p95_ms']:>8.1f}  p99 {row['p99_ms']:>8.1f} ms  errors {row['error_rate']:.1%}")
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            ollama.shutdown()
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("func", "out", "env")}
+    report = {
+        "meta": {
+            **git_revision(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": settings,
+            "env": overrides,
+        },
+        "steps": steps,
+    }
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"report written to {args.out}")
+
+
+def compare(args: argparse.Namespace) -> None:
+    old, new = (json.loads(Path(p).read_text(encoding="utf-8")) for p in (args.base, args.head))
+    for key in ("settings", "env"):
+        if old["meta"].get(key) != new["meta"].get(key):
+            print(f"warning: the reports were run with different {key}")
+    old_steps = {step["clients"]: step for step in old["steps"]}
+    regressions = 0
+    print(f"{'clients':>7}  {'endpoint':<8} {'ok/s':>17} {'p95 ms':>19} {'errors':>15}")
+    for step in new["steps"]:
+        before = old_steps.get(step["clients"])
+        if before is None:
+            continue
+        for name, row in step["endpoints"].items():
+            prev = before["endpoints"].get(name)
+            if prev is None or min(prev["requests"], row["requests"]) < args.min_requests:
+                continue
+            rps_change = (row["ok_rps"] - prev["ok_rps"]) / prev["ok_rps"] if prev["ok_rps"] else 0.0
+            p95_change = (row["p95_ms"] - prev["p95_ms"]) / prev["p95_ms"] if prev["p95_ms"] else 0.0
+            flag = ""
+            if rps_change < -args.threshold or p95_change > args.threshold or row["error_rate"] > prev["error_rate"]:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{step['clients']:>7}  {name:<8} {prev['ok_rps']:>7.1f} → {row['ok_rps']:>7.1f}"
+                  f" {prev['p95_ms']:>8.1f} → {row['p95_ms']:>8.1f}"
+                  f" {prev['error_rate']:>6.1%} → {row['error_rate']:>6.1%}{flag}")
+    if regressions:
+        raise SystemExit(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+
+
+def fake_ollama(args: argparse.Namespace) -> None:
+    server = make_fake_ollama(args.port, args.latency, args.tps, args.tokens)
+    print(f"fake Ollama on http://127.0.0.1:{args.port}/api/generate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP load test for the RAG API on stub backends.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="Start the API on stubs, ramp clients and write a report")
+    p.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrent clients per step")
+    p.add_argument("--step-seconds", type=float, default=10.0)
+    p.add_argument("--mix", type=parse_mix, default=parse_mix("chat=9,ingest=1"),
+                   help="Endpoint weights, e.g. chat=9,ingest=1")
+    p.add_argument("--tiers", default="UNCLASS,CLASSIFIED", help="Tiers requested by /chat")
+    p.add_argument("--files", type=int, default=200, help="Synthetic documents in the corpus")
+    p.add_argument("--words", type=int, default=300, help="Words per document")
+    p.add_argument("--questions", type=int, default=500, help="Distinct questions clients draw from")
+    p.add_argument("--dim", type=int, default=384, help="Fake embedding size")
+    p.add_argument("--ollama-latency", type=float, default=0.05, help="Fake LLM time to first token (s)")
+    p.add_argument("--ollama-tps", type=float, default=200.0, help="Fake LLM tokens per second")
+    p.add_argument("--ollama-tokens", type=int, default=64, help="Tokens per fake answer")
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra app setting (repeatable)")
+    p.add_argument("--timeout", type=float, default=60.0, help="Client request timeout (s)")
+    p.add_argument("--startup-timeout", type=float, default=60.0)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--out", type=Path, help="Write the JSON report here")
+    p.set_defaults(func=run)
+
+    p = sub.add_parser("compare", help="Compare two reports")
+    p.add_argument("base", type=Path)
+    p.add_argument("head", type=Path)
+    p.add_argument("--threshold", type=float, default=0.10, help="Allowed relative change before flagging")
+    p.add_argument("--min-requests", type=int, default=20, help="Skip rows with fewer requests than this")
+    p.set_defaults(func=compare)
+
+    p = sub.add_parser("fake-ollama", help="Run only the fake Ollama server")
+    p.add_argument("--port", type=int, default=11434)
+    p.add_argument("--latency", type=float, default=0.05)
+    p.add_argument("--tps", type=float, default=200.0)
+    p.add_argument("--tokens", type=int, default=64)
+    p.set_defaults(func=fake_ollama)
+
+    p = sub.add_parser("serve", help=argparse.SUPPRESS)
+    p.add_argument("--port", type=int, required=True)
+    p.add_argument("--dim", type=int, default=384)
+    p.set_defaults(func=serve)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Export a tier's points to a snapshot file and bulk-load it elsewhere.
+
+Usage:
+    python scripts/snapshot.py export UNCLASS unclass.qsnap
+    python scripts/snapshot.py import unclass.qsnap --host qdrant-b --replace
+    python scripts/snapshot.py import unclass.qsnap --collection q_unclass_large --profile large
+    python scripts/snapshot.py info unclass.qsnap
+
+``export`` streams ids, vectors and payloads out of the tier's collection
+(or its local index) in ``--chunk`` sized pages. ``import`` loads them into
+the tier the snapshot came from, or into ``--tier`` or ``--collection``. It
+uses ``--batch`` points per upsert with ``--parallel`` upserts in flight and
+defers indexing until the load is done (see ``app/snapshot.py``). Both
+directions report rows/s. ``--host``/``--port``/``--grpc`` point either
+command at a Qdrant other than ``QDRANT_HOST``/``QDRANT_PORT``, for example
+to clone an environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+
+def make_client(args: argparse.Namespace):
+    if args.host is None and args.port is None and not args.grpc:
+        return None  # the engine's own client
+    import os
+
+    from qdrant_client import QdrantClient
+
+    return QdrantClient(host=args.host or os.getenv("QDRANT_HOST", "localhost"),
+                        port=args.port or int(os.getenv("QDRANT_PORT", "6333")),
+                        prefer_grpc=args.grpc, timeout=300)
+
+
+def main() -> None:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--host", help="Qdrant host (default: $QDRANT_HOST)")
+    common.add_argument("--port", type=int, help="Qdrant REST port (default: $QDRANT_PORT)")
+    common.add_argument("--grpc", action="store_true", help="Talk to Qdrant over gRPC (port 6334)")
+    parser = argparse.ArgumentParser(description="Export and import tier snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", parents=[common], help="Write a tier's points to a file")
+    p.add_argument("tier")
+    p.add_argument("path", type=Path)
+    p.add_argument("--chunk", type=int, default=2048, help="Points read per page and written per chunk")
+
+    p = sub.add_parser("import", parents=[common], help="Bulk-load a snapshot file")
+    p.add_argument("path", type=Path)
+    p.add_argument("--tier", help="Target tier (default: the exported tier)")
+    p.add_argument("--collection", help="Target collection name (default: the tier's collection)")
+    p.add_argument("--profile", help="Collection profile for a new collection (name or JSON)")
+    p.add_argument("--replace", action="store_true", help="Drop the target's existing points first")
+    p.add_argument("--batch", type=int, default=1024, help="Points per upsert request")
+    p.add_argument("--parallel", type=int, default=4, help="Upsert requests in flight")
+    p.add_argument("--wait-indexed", type=float, default=0.0, metavar="SECONDS",
+                   help="Also wait up to SECONDS for indexing to finish and report it")
+
+    p = sub.add_parser("info", help="Show a snapshot's header and verify its checksums")
+    p.add_argument("path", type=Path)
+    args = parser.parse_args()
+
+    from app.snapshot import describe, export_tier, import_snapshot
+
+    if args.command == "info":
+        print(json.dumps(describe(args.path), indent=2))
+        return
+
+    from app.rag import RagEngine
+
+    engine = RagEngine()
+    if args.command == "export":
+        stats = export_tier(engine, args.tier.upper(), args.path, chunk=args.chunk, client=make_client(args))
+        verb = "exported"
+    else:
+        profile = None
+        if args.profile:
+            from app.profiles import make_profile
+
+            profile = make_profile(json.loads(args.profile) if args.profile.lstrip().startswith("{") else args.profile)
+        stats = import_snapshot(engine, args.path, tier=args.tier, collection=args.collection, profile=profile,
+                                replace=args.replace, batch=args.batch, parallel=args.parallel,
+                                wait_indexed=args.wait_indexed, client=make_client(args))
+        verb = "imported"
+    s = stats.as_dict()
+    print(f"{verb} {s['rows']} rows ({s['mb']} MB) in {s['seconds']}s: {s['rows_per_s']} rows/s, {s['mb_per_s']} MB/s"
+          + (f"; indexing took {s['index_seconds']}s more" if stats.index_seconds else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,58 +2,72 @@
 """Watch a directory tree and ingest documents on changes.
 
 This script uses watchdog to monitor the directory specified by the `DATA_ROOT`
-environment variable.  When a file is created or modified it will be
-ingested into the appropriate Qdrant collection.
+environment variable (or ``--data-root``).  When a file is created or modified
+it will be ingested into the appropriate Qdrant collection.
 
 Run this script in a long‑running process alongside your API server.
 """
 
 from __future__ import annotations
 
+import argparse
 import os
-import threading
 import time
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING
 
-from watchdog.events import FileSystemEventHandler
-from watchdog.observers import Observer
+if TYPE_CHECKING:
+    from app.rag import RagEngine
 
-from app.rag import RagEngine
 
+def make_handler(engine: "RagEngine", data_root: Path):
+    """Build the watchdog event handler; watchdog is imported here, not at load."""
+    from watchdog.events import FileSystemEventHandler
 
-class IngestionHandler(FileSystemEventHandler):
-    def __init__(self, engine: RagEngine, data_root: Path) -> None:
-        super().__init__()
-        self.engine = engine
-        self.data_root = data_root
+    class IngestionHandler(FileSystemEventHandler):
+        def __init__(self) -> None:
+            super().__init__()
+            self.engine = engine
+            self.data_root = data_root
 
-    def on_created(self, event):
-        if not event.is_directory:
-            self.handle(Path(event.src_path))
+        def on_created(self, event):
+            if not event.is_directory:
+                self.handle(Path(event.src_path))
 
-    def on_modified(self, event):
-        if not event.is_directory:
-            self.handle(Path(event.src_path))
+        def on_modified(self, event):
+            if not event.is_directory:
+                self.handle(Path(event.src_path))
 
-    def handle(self, path: Path) -> None:
-        # Only process files under data_root
-        try:
-            path.relative_to(self.data_root)
-        except ValueError:
-            return
-        try:
-            print(f"[watcher] ingesting {path}")
-            self.engine.upsert_document(path)
-        except Exception as exc:
-            print(f"[watcher] failed to ingest {path}: {exc}")
+        def handle(self, path: Path) -> None:
+            # Only process files under data_root
+            try:
+                path.relative_to(self.data_root)
+            except ValueError:
+                return
+            try:
+                print(f"[watcher] ingesting {path}")
+                self.engine.upsert_document(path)
+            except Exception as exc:
+                print(f"[watcher] failed to ingest {path}: {exc}")
+
+    return IngestionHandler()
 
 
 def main() -> None:
-    data_root = Path(os.getenv("DATA_ROOT", ".")).resolve()
+    parser = argparse.ArgumentParser(description="Watch a folder and ingest changed documents.")
+    parser.add_argument("--data-root", type=Path, default=Path(os.getenv("DATA_ROOT", ".")),
+                        help="Directory to watch (default: $DATA_ROOT or the current directory)")
+    args = parser.parse_args()
+
+    # Heavy imports happen only once we know we are actually going to run
+    from watchdog.observers import Observer
+
+    from app.rag import RagEngine
+
+    data_root = args.data_root.resolve()
     print(f"Watching {data_root}")
     engine = RagEngine()
-    event_handler = IngestionHandler(engine, data_root)
+    event_handler = make_handler(engine, data_root)
     observer = Observer()
     observer.schedule(event_handler, str(data_root), recursive=True)
     observer.start()
@@ -66,4 +80,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,23 @@
-import json, os, socket
+import json, os, socket, sys
+from dataclasses import asdict
 from pathlib import Path
 from flask import Flask, jsonify
 
+# Make the repository's `shared` package importable.
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from shared.config_schema import MiniAppConfig
+from shared.logging_utils import setup_logger
+from shared.serving import serve
+
+from deltasync import build_service
+
 CFG = json.loads(Path("config.json").read_text())
 app = Flask(__name__)
+# Own handler; waitress installs a root handler that would print records twice
+setup_logger("deltasync").propagate = False
+# The sync loop and its SQLite state live in this process, so serve() is told
+# to stay single-process (gunicorn is replaced by waitress).
+SYNC = build_service(CFG.get("sync", {}), Path(__file__).resolve().parent)
 
 @app.get("/health")
 def health():
@@ -13,7 +27,28 @@ def health():
 def index():
     return jsonify({"hello": CFG["name"]})
 
+@app.get("/sync/status")
+def sync_status():
+    return jsonify(SYNC.status())
+
+@app.get("/sync/throughput")
+def sync_throughput():
+    return jsonify(SYNC.throughput())
+
+@app.post("/sync/run")
+def sync_run():
+    try:
+        report = SYNC.run_now()
+    except Exception:
+        return jsonify({"error": SYNC.last_error}), 500
+    if report is None:
+        return jsonify({"error": "a sync cycle is already running"}), 409
+    return jsonify(asdict(report))
+
 def _pick_port():
+    # The cockpit assigns a port and passes it in through the environment.
+    if os.environ.get("QI_APP_PORT"):
+        return int(os.environ["QI_APP_PORT"])
     if CFG.get("port", 0):
         return CFG["port"]
     s = socket.socket()
@@ -24,5 +59,7 @@ def _pick_port():
 
 if __name__ == "__main__":
     port = _pick_port()
-    print(f"{CFG['name']} starting on http://{CFG['host']}:{port}")
-    app.run(host=CFG["host"], port=port)
+    host = os.environ.get("QI_APP_HOST") or CFG["host"]
+    print(f"{CFG['name']} starting on http://{host}:{port}")
+    SYNC.start()
+    serve(app, MiniAppConfig.from_dict(CFG), host, port, single_process=True)
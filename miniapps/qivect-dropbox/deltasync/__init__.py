@@ -0,0 +1,34 @@
+"""Delta sync of a Dropbox folder (or a local stand-in) into a vector store.
+
+The pieces, each in its own module:
+
+* :mod:`.feeds` - cursor-based change feeds (Dropbox, local folder);
+* :mod:`.state` - the persisted cursor and per-file content hashes (SQLite);
+* :mod:`.vectors` - chunking, embedders, vector stores and write batching;
+* :mod:`.engine` - :class:`SyncEngine` (one cycle) and :class:`SyncService`
+  (background loop with status and throughput numbers for the Flask app).
+
+``python -m deltasync --help`` runs a cycle from the command line, records
+changes for the local feed and benchmarks cycle cost against folder size.
+"""
+
+from .engine import SyncEngine, SyncReport, SyncService, build_service
+from .feeds import Change, ChangeFeed, DropboxFeed, LocalFolderFeed, content_hash
+from .state import SyncState
+from .vectors import HashingEmbedder, MemoryVectorStore, QdrantVectorStore
+
+__all__ = [
+    "Change",
+    "ChangeFeed",
+    "DropboxFeed",
+    "HashingEmbedder",
+    "LocalFolderFeed",
+    "MemoryVectorStore",
+    "QdrantVectorStore",
+    "SyncEngine",
+    "SyncReport",
+    "SyncService",
+    "SyncState",
+    "build_service",
+    "content_hash",
+]
@@ -0,0 +1,117 @@
+"""Command line for the delta sync engine.
+
+    python -m deltasync run                 # one cycle with the config.json sync settings
+    python -m deltasync record data/a.md    # tell the local feed a file changed
+    python -m deltasync bench --files 2000 20000 --changes 50
+
+``bench`` builds folders of each size in a temporary directory, runs the
+initial sync, then changes ``--changes`` files and times the delta cycle;
+the delta time should stay flat as the folder grows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from .engine import SyncEngine, build_service
+from .feeds import LocalFolderFeed
+from .state import SyncState
+from .vectors import HashingEmbedder, MemoryVectorStore
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+_WORDS = ("vector delta cursor folder sync change hash chunk embed batch upsert delete "
+          "dropbox qdrant point index page feed state report file").split()
+
+
+def _text(rng: random.Random, words: int) -> bytes:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).encode()
+
+
+def bench(sizes: list[int], changes: int, words: int, seed: int = 1) -> list[dict]:
+    rows = []
+    for size in sizes:
+        rng = random.Random(seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp) / "folder"
+            for i in range(size):
+                path = root / f"d{i % 100:02d}" / f"f{i:06d}.txt"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(_text(rng, words))
+            feed = LocalFolderFeed(root)
+            state = SyncState(Path(tmp) / "state.db")
+            engine = SyncEngine(feed, state, MemoryVectorStore(), HashingEmbedder(64), chunk_size=200, chunk_overlap=20)
+            initial = engine.run_once()
+            idle = engine.run_once()
+
+            picked = rng.sample(range(size), min(changes, size))
+            third = len(picked) // 3
+            for n, i in enumerate(picked):
+                path = f"/d{i % 100:02d}/f{i:06d}.txt"
+                if n < third:
+                    feed.delete(path)
+                elif n < 2 * third:
+                    feed.record([path])  # touched, content unchanged
+                else:
+                    feed.put(path, _text(rng, words))
+            delta = engine.run_once()
+            state.close()
+        rows.append({
+            "files": size,
+            "initial_s": round(initial.seconds, 3),
+            "idle_ms": round(1000 * idle.seconds, 2),
+            "delta_changes": delta.changes,
+            "delta_ms": round(1000 * delta.seconds, 2),
+            "upserted": delta.files_upserted,
+            "deleted": delta.files_deleted,
+            "unchanged": delta.unchanged,
+            "store_requests": delta.store_requests,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m deltasync", description="Delta sync into a vector store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="run one sync cycle")
+    run.add_argument("--config", type=Path, default=APP_DIR / "config.json")
+    record = sub.add_parser("record", help="record changed (or deleted) files in the local feed journal")
+    record.add_argument("paths", nargs="+", type=Path)
+    record.add_argument("--deleted", action="store_true")
+    record.add_argument("--config", type=Path, default=APP_DIR / "config.json")
+    b = sub.add_parser("bench", help="delta cycle cost versus folder size")
+    b.add_argument("--files", type=int, nargs="+", default=[1000, 10000])
+    b.add_argument("--changes", type=int, default=30)
+    b.add_argument("--words", type=int, default=300)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        rows = bench(args.files, args.changes, args.words)
+        header = list(rows[0])
+        print("  ".join(f"{h:>14}" for h in header))
+        for row in rows:
+            print("  ".join(f"{row[h]:>14}" for h in header))
+        return
+
+    cfg = json.loads(args.config.read_text(encoding="utf-8")).get("sync", {})
+    base = args.config.resolve().parent
+    if args.command == "record":
+        feed = LocalFolderFeed(base / cfg.get("root", "data"))
+        feed.record([feed.to_feed_path(p) for p in args.paths], op="delete" if args.deleted else "upsert")
+        print(f"recorded {len(args.paths)} change(s) in {feed.journal}")
+        return
+
+    service = build_service(cfg, base)
+    started = time.perf_counter()
+    report = service.run_now()
+    print(json.dumps(asdict(report) | {"wall_s": round(time.perf_counter() - started, 3)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
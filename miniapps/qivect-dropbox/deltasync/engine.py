@@ -0,0 +1,322 @@
+"""The sync engine and the background service the Flask app runs.
+
+One cycle (:meth:`SyncEngine.run_once`) pulls pages from the change feed
+after the stored cursor and, per change:
+
+* ``delete`` removes the file's points (ids are derived from the chunk count
+  in the state, so the store is never searched) or, for a folder, the points
+  of every file recorded below it;
+* ``upsert`` is skipped without downloading when the feed's content hash
+  matches the stored one; otherwise the file is downloaded, hashed (a
+  touched but unchanged file stops here), chunked, embedded and its points
+  upserted, deleting the trailing points if it now has fewer chunks.
+
+Vector writes are batched and flushed at the end of every page before the
+page's file records and cursor are committed, so a crash replays at most one
+page, and replaying is harmless because point ids are deterministic. If a
+page fails (embedder or store error) its uncommitted file records are rolled
+back, so the retry re-reads those files.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from .feeds import Change, ChangeFeed, DropboxFeed, LocalFolderFeed, content_hash
+from .state import SyncState
+from .vectors import (
+    HashingEmbedder,
+    MemoryVectorStore,
+    Point,
+    QdrantVectorStore,
+    SentenceTransformerEmbedder,
+    VectorBatch,
+    VectorStore,
+    point_id,
+    split_text,
+)
+
+log = logging.getLogger("deltasync")
+
+
+@dataclass
+class SyncReport:
+    """Outcome of one sync cycle."""
+
+    started_at: float = 0.0
+    seconds: float = 0.0
+    pages: int = 0
+    changes: int = 0
+    files_upserted: int = 0
+    files_deleted: int = 0
+    unchanged: int = 0  # hash matched, nothing re-embedded
+    skipped: int = 0  # binary, too large or vanished before download
+    bytes_read: int = 0
+    chunks_embedded: int = 0
+    points_upserted: int = 0
+    points_deleted: int = 0
+    store_requests: int = 0
+    initial: bool = False  # started without a cursor (full listing)
+    cursor: Optional[str] = None
+
+
+class SyncEngine:
+    """Applies a change feed to a vector store, remembering progress in ``state``."""
+
+    def __init__(self, feed: ChangeFeed, state: SyncState, store: VectorStore, embedder=None,
+                 chunk_size: int = 800, chunk_overlap: int = 100, batch_size: int = 256,
+                 page_size: int = 500, max_file_bytes: int = 10 * 2 ** 20) -> None:
+        self.feed = feed
+        self.state = state
+        self.store = store
+        self.embedder = embedder or HashingEmbedder()
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.max_file_bytes = max_file_bytes
+        if state.feed not in (None, feed.name):
+            raise ValueError(f"state {state.path} belongs to the {state.feed!r} feed, not {feed.name!r}")
+
+    def run_once(self, max_pages: Optional[int] = None) -> SyncReport:
+        report = SyncReport(started_at=time.time())
+        started = time.perf_counter()
+        cursor = self.state.cursor
+        report.initial = cursor is None
+        batch = VectorBatch(self.store, self.batch_size)
+        while max_pages is None or report.pages < max_pages:
+            page = self.feed.list_changes(cursor, limit=self.page_size)
+            try:
+                for change in page.changes:
+                    self._apply(change, batch, report)
+                batch.flush()
+            except BaseException:
+                # The page's file records must not outlive a failed flush:
+                # left open they would be committed by the next cycle and
+                # the unflushed files classed as unchanged for good.
+                batch.discard()
+                self.state.rollback()
+                raise
+            self.state.commit(cursor=page.cursor, feed=self.feed.name)
+            cursor = page.cursor
+            report.pages += 1
+            report.changes += len(page.changes)
+            if not page.has_more:
+                break
+        report.points_upserted = batch.points_upserted
+        report.points_deleted = batch.points_deleted
+        report.store_requests = batch.requests
+        report.cursor = cursor
+        report.seconds = round(time.perf_counter() - started, 4)
+        return report
+
+    def _delete_file(self, path: str, chunks: int, batch: VectorBatch) -> None:
+        batch.delete([point_id(path, i) for i in range(chunks)])
+        self.state.remove(path)
+
+    def _apply(self, change: Change, batch: VectorBatch, report: SyncReport) -> None:
+        record = self.state.get(change.path)
+        if change.kind == "delete":
+            if record:
+                self._delete_file(record.path, record.chunks, batch)
+                report.files_deleted += 1
+            for child in self.state.under(change.path):
+                self._delete_file(child.path, child.chunks, batch)
+                report.files_deleted += 1
+            return
+
+        if record and change.content_hash and change.content_hash == record.content_hash:
+            report.unchanged += 1
+            return
+        if change.size is not None and change.size > self.max_file_bytes:
+            # Too large to index now: drop what was indexed of an earlier,
+            # smaller version rather than leave stale content searchable
+            if record:
+                self._delete_file(record.path, record.chunks, batch)
+            report.skipped += 1
+            return
+        try:
+            data = self.feed.read(change.path)
+        except FileNotFoundError:
+            # Gone again; a later delete entry will clean up
+            report.skipped += 1
+            return
+        report.bytes_read += len(data)
+        digest = content_hash(data)
+        if record and digest == record.content_hash:
+            report.unchanged += 1
+            return
+
+        chunks = [] if b"\0" in data[:8192] else split_text(
+            data.decode("utf-8", errors="replace"), self.chunk_size, self.chunk_overlap)
+        if chunks:
+            vectors = self.embedder.embed(chunks)
+            batch.upsert([
+                Point(point_id(change.path, i), vec, {"path": change.path, "chunk": i, "text": text})
+                for i, (text, vec) in enumerate(zip(chunks, vectors))
+            ])
+            report.chunks_embedded += len(chunks)
+            report.files_upserted += 1
+        else:
+            report.skipped += 1  # binary or empty; recorded so it is not re-read
+        if record and record.chunks > len(chunks):
+            batch.delete([point_id(change.path, i) for i in range(len(chunks), record.chunks)])
+        self.state.put(change.path, digest, change.rev, len(data), len(chunks))
+
+
+class SyncService:
+    """Runs :class:`SyncEngine` cycles in a background thread and keeps statistics.
+
+    A cycle starts every ``interval`` seconds, earlier when the feed reports
+    changes (:meth:`ChangeFeed.wait`), or on :meth:`run_now`.
+    """
+
+    def __init__(self, engine: SyncEngine, interval: float = 30.0, history: int = 120) -> None:
+        self.engine = engine
+        self.interval = interval
+        self.reports: deque[SyncReport] = deque(maxlen=history)
+        self.totals = SyncReport()
+        self.cycles = 0
+        self.last_error: Optional[str] = None
+        self.counts = engine.state.counts()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="deltasync", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_now()
+            except Exception:
+                log.exception("sync cycle failed")
+            deadline = time.monotonic() + self.interval
+            # Wake early when the feed reports changes; re-check stop regularly
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                wait = min(5.0, deadline - time.monotonic())
+                try:
+                    if self.engine.feed.wait(self.engine.state.cursor, wait):
+                        break
+                except Exception as exc:
+                    log.warning("waiting for changes failed: %s", exc)
+                    self._stop.wait(wait)
+
+    def run_now(self) -> Optional[SyncReport]:
+        """Run one cycle; returns ``None`` if a cycle is already running.
+
+        A failing cycle is remembered in :attr:`last_error` and re-raised.
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            report = self.engine.run_once()
+        except Exception as exc:
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._lock.release()
+        self.last_error = None
+        self._record(report)
+        return report
+
+    def _record(self, report: SyncReport) -> None:
+        self.cycles += 1
+        self.reports.append(report)
+        for name in ("seconds", "pages", "changes", "files_upserted", "files_deleted", "unchanged", "skipped",
+                     "bytes_read", "chunks_embedded", "points_upserted", "points_deleted", "store_requests"):
+            setattr(self.totals, name, getattr(self.totals, name) + getattr(report, name))
+        self.counts = self.engine.state.counts()
+        if report.changes:
+            log.info("synced %d changes in %.3fs: %d upserted, %d deleted, %d unchanged, %d points",
+                     report.changes, report.seconds, report.files_upserted, report.files_deleted,
+                     report.unchanged, report.points_upserted)
+
+    def status(self) -> dict:
+        last = self.reports[-1] if self.reports else None
+        return {
+            "feed": self.engine.feed.name,
+            "store": self.engine.store.name,
+            "embedder": getattr(self.engine.embedder, "name", type(self.engine.embedder).__name__),
+            "running": self._thread is not None and self._thread.is_alive(),
+            "busy": self._lock.locked(),
+            "interval": self.interval,
+            "cycles": self.cycles,
+            "cursor": self.engine.state.cursor,
+            "indexed": self.counts,
+            "last_error": self.last_error,
+            "last": asdict(last) if last else None,
+        }
+
+    def throughput(self) -> dict:
+        """Rates over the recent cycles that had changes, plus lifetime totals."""
+        busy = [r for r in self.reports if r.changes]
+        seconds = sum(r.seconds for r in busy)
+
+        def rate(name: str) -> float:
+            return round(sum(getattr(r, name) for r in busy) / seconds, 1) if seconds else 0.0
+
+        per_change_ms = sorted(1000 * r.seconds / r.changes for r in busy if not r.initial)
+        return {
+            "window_cycles": len(busy),
+            "changes_per_s": rate("changes"),
+            "files_per_s": rate("files_upserted"),
+            "chunks_per_s": rate("chunks_embedded"),
+            "points_per_s": rate("points_upserted"),
+            "mb_per_s": round(rate("bytes_read") / 2 ** 20, 2),
+            "ms_per_change_p50": round(per_change_ms[len(per_change_ms) // 2], 3) if per_change_ms else None,
+            "totals": asdict(self.totals) | {"cycles": self.cycles},
+        }
+
+
+def build_service(cfg: dict, base_dir: Path) -> SyncService:
+    """Build the service from the ``sync`` section of a miniapp's ``config.json``."""
+    provider = cfg.get("provider", "local")
+    if provider == "local":
+        feed: ChangeFeed = LocalFolderFeed(base_dir / cfg.get("root", "data"))
+    elif provider == "dropbox":
+        token = os.environ.get(cfg.get("token_env", "DROPBOX_TOKEN"), "")
+        if not token:
+            raise RuntimeError(f"set {cfg.get('token_env', 'DROPBOX_TOKEN')} to use the dropbox feed")
+        feed = DropboxFeed(token, cfg.get("dropbox_path", ""))
+    else:
+        raise ValueError(f"unknown sync provider: {provider!r}")
+
+    if cfg.get("store", "memory") == "qdrant":
+        store: VectorStore = QdrantVectorStore(cfg.get("qdrant_host", "localhost"), int(cfg.get("qdrant_port", 6333)),
+                                               cfg.get("collection", "qivect_dropbox"))
+        state_path = cfg.get("state_path", "sync_state.db")
+    else:
+        store = MemoryVectorStore()
+        # The points vanish with the process, so the state must too
+        state_path = ":memory:"
+    if cfg.get("embedder", "hashing") == "sentence-transformers":
+        embedder = SentenceTransformerEmbedder(cfg.get("model", "all-MiniLM-L6-v2"))
+    else:
+        embedder = HashingEmbedder(int(cfg.get("dim", 256)))
+
+    state = SyncState(state_path if state_path == ":memory:" else base_dir / state_path)
+    engine = SyncEngine(
+        feed, state, store, embedder,
+        chunk_size=int(cfg.get("chunk_size", 800)),
+        chunk_overlap=int(cfg.get("chunk_overlap", 100)),
+        batch_size=int(cfg.get("batch_size", 256)),
+        page_size=int(cfg.get("page_size", 500)),
+        max_file_bytes=int(cfg.get("max_file_mb", 10) * 2 ** 20),
+    )
+    return SyncService(engine, interval=float(cfg.get("interval", 30)))
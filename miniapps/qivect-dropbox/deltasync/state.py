@@ -0,0 +1,128 @@
+"""Persistent sync state: the feed cursor and what is indexed per file.
+
+Kept in SQLite rather than a JSON file so that a cycle reads and writes
+only the rows of the files that changed; the state of a large folder is
+never loaded or rewritten as a whole. The cursor is stored in the same
+transaction as the file rows it covers, so after a crash the engine resumes
+from the last fully applied page.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    rev TEXT,
+    size INTEGER,
+    chunks INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class FileRecord:
+    """What was last indexed for one file."""
+
+    path: str
+    content_hash: str
+    rev: Optional[str]
+    size: Optional[int]
+    chunks: int  # points ``<path>#0`` .. ``<path>#chunks-1`` exist in the store
+    synced_at: float
+
+
+class SyncState:
+    """Cursor and per-file records for one feed.
+
+    Writes accumulate in an open transaction until :meth:`commit`.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:") -> None:
+        self.path = str(path)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+    # --- cursor --------------------------------------------------------------
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Optional[str]) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def cursor(self) -> Optional[str]:
+        return self._meta("cursor")
+
+    @property
+    def feed(self) -> Optional[str]:
+        """Name of the feed the cursor belongs to."""
+        return self._meta("feed")
+
+    def commit(self, cursor: Optional[str] = None, feed: Optional[str] = None) -> None:
+        """Commit pending file changes, optionally together with a new cursor."""
+        if cursor is not None:
+            self._set_meta("cursor", cursor)
+        if feed is not None:
+            self._set_meta("feed", feed)
+        self._db.commit()
+
+    def rollback(self) -> None:
+        """Discard file changes made since the last :meth:`commit`."""
+        self._db.rollback()
+
+    def reset(self) -> None:
+        """Forget the cursor (the next cycle relists the folder) but keep file records."""
+        self._db.execute("DELETE FROM meta WHERE key = 'cursor'")
+        self._db.commit()
+
+    # --- files ---------------------------------------------------------------
+
+    def get(self, path: str) -> Optional[FileRecord]:
+        row = self._db.execute(
+            "SELECT path, content_hash, rev, size, chunks, synced_at FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        return FileRecord(*row) if row else None
+
+    def put(self, path: str, content_hash: str, rev: Optional[str], size: Optional[int], chunks: int) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, content_hash, rev, size, chunks, synced_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, content_hash, rev, size, chunks, time.time()),
+        )
+
+    def remove(self, path: str) -> None:
+        self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def under(self, folder: str) -> list[FileRecord]:
+        """Records of all files below ``folder`` (an index range scan, not a table scan)."""
+        prefix = folder.rstrip("/") + "/"
+        # "0" is the character after "/", so this is every path starting with prefix
+        rows = self._db.execute(
+            "SELECT path, content_hash, rev, size, chunks, synced_at FROM files WHERE path >= ? AND path < ?",
+            (prefix, prefix[:-1] + "0"),
+        ).fetchall()
+        return [FileRecord(*row) for row in rows]
+
+    def counts(self) -> dict:
+        files, chunks = self._db.execute("SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM files").fetchone()
+        return {"files": files, "chunks": chunks}
@@ -0,0 +1,236 @@
+"""Chunking, embedding and the vector stores the sync engine writes to.
+
+Every chunk gets a deterministic point id derived from ``(path, index)``,
+so re-syncing a file overwrites its points in place and a file's points can
+be deleted from the number of chunks recorded in the sync state, without
+asking the store. Writes go through :class:`VectorBatch`, which buffers
+upserts and deletes and sends them in batches.
+
+Stores and embedders:
+
+* :class:`MemoryVectorStore` and :class:`HashingEmbedder` need nothing
+  beyond the standard library (offline runs and benchmarks);
+* :class:`QdrantVectorStore` uses the optional ``qdrant_client`` and
+  :class:`SentenceTransformerEmbedder` the optional
+  ``sentence_transformers``; both are imported on first use.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Namespace for point ids, so ids are stable across processes and machines.
+POINT_NAMESPACE = uuid.UUID("6c1f0c3e-4f4b-4d55-9a56-0a3d1f6f7e21")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def point_id(path: str, index: int) -> str:
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{path}#{index}"))
+
+
+def split_text(text: str, chunk_size: int = 800, chunk_overlap: int = 100) -> list[str]:
+    """Split text into chunks of ``chunk_size`` words overlapping by ``chunk_overlap``."""
+    words = text.split()
+    chunks: list[str] = []
+    step = max(1, chunk_size - chunk_overlap)
+    for i in range(0, len(words), step):
+        chunks.append(" ".join(words[i:i + chunk_size]))
+        if i + chunk_size >= len(words):
+            break
+    return chunks
+
+
+@dataclass
+class Point:
+    id: str
+    vector: list[float]
+    payload: dict = field(default_factory=dict)
+
+
+class HashingEmbedder:
+    """Feature-hashing bag-of-words embedder; no model, deterministic, fast."""
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors = []
+        for text in texts:
+            vec = [0.0] * self.dim
+            for token in _TOKEN_RE.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+                vec[h % self.dim] += 1.0 if h >> 63 else -1.0
+            norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+            vectors.append([v / norm for v in vec])
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    """Embeds with a SentenceTransformer model, loaded on first use."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str = "all-MiniLM-L6-v2") -> None:
+        self.model_name = model
+        self._model = None
+        self.dim: Optional[int] = None
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+            self.dim = self._model.get_sentence_embedding_dimension()
+        return self._model.encode(texts, convert_to_numpy=True, normalize_embeddings=True).tolist()
+
+
+class VectorStore:
+    """Interface of a vector store."""
+
+    name = "store"
+
+    def upsert(self, points: list[Point]) -> None:
+        raise NotImplementedError
+
+    def delete(self, ids: list[str]) -> None:
+        raise NotImplementedError
+
+
+class MemoryVectorStore(VectorStore):
+    """Dict-backed store that counts the calls it receives."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self.points: dict[str, Point] = {}
+        self.upsert_calls = 0
+        self.delete_calls = 0
+
+    def upsert(self, points: list[Point]) -> None:
+        self.upsert_calls += 1
+        for point in points:
+            self.points[point.id] = point
+
+    def delete(self, ids: list[str]) -> None:
+        self.delete_calls += 1
+        for pid in ids:
+            self.points.pop(pid, None)
+
+
+class QdrantVectorStore(VectorStore):
+    """Qdrant collection, created with cosine distance on the first upsert."""
+
+    name = "qdrant"
+
+    def __init__(self, host: str = "localhost", port: int = 6333, collection: str = "qivect_dropbox") -> None:
+        self.host = host
+        self.port = port
+        self.collection = collection
+        self._client = None
+        self._ready = False
+
+    def client(self):
+        if self._client is None:
+            from qdrant_client import QdrantClient
+
+            self._client = QdrantClient(host=self.host, port=self.port)
+        return self._client
+
+    def _ensure_collection(self, dim: int) -> None:
+        from qdrant_client.http import models as qmodels
+
+        try:
+            self.client().get_collection(self.collection)
+        except Exception:
+            self.client().create_collection(
+                collection_name=self.collection,
+                vectors_config=qmodels.VectorParams(size=dim, distance=qmodels.Distance.COSINE),
+            )
+        self._ready = True
+
+    def upsert(self, points: list[Point]) -> None:
+        from qdrant_client.http import models as qmodels
+
+        if not self._ready:
+            self._ensure_collection(len(points[0].vector))
+        self.client().upsert(
+            collection_name=self.collection,
+            points=[qmodels.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points],
+            wait=True,
+        )
+
+    def delete(self, ids: list[str]) -> None:
+        from qdrant_client.http import models as qmodels
+
+        if not self._ready:
+            try:
+                self.client().get_collection(self.collection)
+            except Exception:
+                return  # nothing was ever written
+            self._ready = True
+        self.client().delete(
+            collection_name=self.collection,
+            points_selector=qmodels.PointIdsList(points=ids),
+            wait=True,
+        )
+
+
+class VectorBatch:
+    """Buffers upserts and deletes for ``store``, sending ``batch_size`` at a time.
+
+    Deletes are sent before upserts on every flush; an id is never in both
+    buffers (queuing one cancels the other), so the order within a flush
+    cannot resurrect or drop a point.
+    """
+
+    def __init__(self, store: VectorStore, batch_size: int = 256) -> None:
+        self.store = store
+        self.batch_size = batch_size
+        self._upserts: dict[str, Point] = {}
+        self._deletes: set[str] = set()
+        self.points_upserted = 0
+        self.points_deleted = 0
+        self.requests = 0
+
+    def upsert(self, points: list[Point]) -> None:
+        for point in points:
+            self._deletes.discard(point.id)
+            self._upserts[point.id] = point
+        if len(self._upserts) >= self.batch_size:
+            self.flush()
+
+    def delete(self, ids: list[str]) -> None:
+        for pid in ids:
+            self._upserts.pop(pid, None)
+            self._deletes.add(pid)
+        if len(self._deletes) >= self.batch_size:
+            self.flush()
+
+    def discard(self) -> None:
+        """Drop buffered writes without sending them."""
+        self._upserts.clear()
+        self._deletes.clear()
+
+    def flush(self) -> None:
+        if self._deletes:
+            ids = list(self._deletes)
+            for start in range(0, len(ids), self.batch_size):
+                self.store.delete(ids[start:start + self.batch_size])
+                self.requests += 1
+            self.points_deleted += len(ids)
+            self._deletes.clear()
+        if self._upserts:
+            points = list(self._upserts.values())
+            for start in range(0, len(points), self.batch_size):
+                self.store.upsert(points[start:start + self.batch_size])
+                self.requests += 1
+            self.points_upserted += len(points)
+            self._upserts.clear()
@@ -5,9 +5,10 @@ individual miniapps. To keep the surface area small, only import what you
 need from the submodules (for example, ``from shared.process_utils import start_subprocess``).
 """
 
-from .process_utils import start_subprocess, stream_process_output
+from .process_utils import start_subprocess, start_subprocess_async, stream_process_output
 
 __all__ = [
     "start_subprocess",
+    "start_subprocess_async",
     "stream_process_output",
 ]
\ No newline at end of file
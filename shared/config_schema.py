@@ -1,5 +1,15 @@
-from dataclasses import dataclass
-from typing import Optional
+import json
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+# Environment variables the cockpit uses to hand an assigned address to a miniapp.
+HOST_ENV = "QI_APP_HOST"
+PORT_ENV = "QI_APP_PORT"
+# Overrides ``MiniAppConfig.server`` (e.g. ``cockpit up --server gunicorn``).
+SERVER_ENV = "QI_APP_SERVER"
+
+SERVER_MODES = ("dev", "waitress", "gunicorn")
 
 @dataclass
 class MiniAppConfig:
@@ -7,3 +17,25 @@ class MiniAppConfig:
     description: Optional[str] = None
     host: str = "127.0.0.1"
     port: int = 0  # 0 => auto-pick
+    health_path: str = "/health"
+    # How the app is served, see shared.serving: dev | waitress | gunicorn
+    server: str = "dev"
+    workers: int = 0  # gunicorn worker processes; 0 => 2 x CPUs + 1
+    threads: int = 4  # threads per worker (waitress: total)
+    keepalive: int = 30  # seconds an idle keep-alive connection stays open
+    graceful_timeout: int = 30  # seconds in-flight requests get on reload/stop
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "MiniAppConfig":
+        """Build a config from a dict, ignoring keys this schema does not know."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    @classmethod
+    def from_file(cls, path: Path) -> "MiniAppConfig":
+        """Load a miniapp's ``config.json``."""
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def env(self) -> dict[str, str]:
+        """Environment variables that tell the miniapp which address to bind and how to serve."""
+        return {HOST_ENV: self.host, PORT_ENV: str(self.port), SERVER_ENV: self.server}
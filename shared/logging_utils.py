@@ -1,11 +1,447 @@
+"""Logging setup shared by the cockpit and the miniapps.
+
+``setup_logger(name)`` keeps its original behaviour (INFO level, the
+``time | level | name | message`` format on stderr), but records no longer
+go straight to the stream. The calling thread only formats the message and
+puts the record on a bounded queue; a background :class:`QueueListener`
+thread does the actual I/O. A slow terminal, or a full pipe to the cockpit,
+therefore only blocks a request handler once the queue is full. With
+``drop_when_full=True`` DEBUG/INFO records are dropped and counted instead of
+waiting, and the writer thread reports how many were lost; warnings, errors
+and tracebacks always wait for room and are never dropped.
+
+Optional extras, all stdlib:
+
+* ``json_format=True`` writes one JSON object per line with the request id
+  (see :func:`request_context`) and any ``extra=`` fields such as
+  ``duration_ms`` (see :func:`timed`);
+* ``log_file=...`` adds a size-rotated file (``max_bytes``/``backup_count``);
+* ``rate_limit=(per_second, burst)`` and ``sample_every=N`` thin out
+  high-volume messages. Both are keyed by the message template, so
+  ``log.info("got %s", x)`` counts as one message whatever ``x`` is. Warnings
+  and errors are never dropped.
+
+``python -m shared.logging_utils`` benchmarks the cost of a log call from
+several threads with the synchronous and the queue-based handler.
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+TEXT_FORMAT = '%(asctime)s | %(levelname)s | %(name)s | %(message)s'
+DEFAULT_QUEUE_SIZE = 10_000
+
+# Request id of the code currently running (per thread / asyncio task).
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra=``.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listeners: list[logging.handlers.QueueListener] = []
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that can drop (and count) low-level records when full.
+
+    By default a full queue makes the caller wait for room. With
+    ``drop_when_full=True`` records below ``drop_below`` (WARNING) are
+    dropped instead, trading completeness of DEBUG/INFO output for latency;
+    records at ``drop_below`` or above always wait.
+    """
+
+    def __init__(self, log_queue: queue.Queue, drop_when_full: bool = False,
+                 drop_below: int = logging.WARNING) -> None:
+        super().__init__(log_queue)
+        self.drop_when_full = drop_when_full
+        self.drop_below = drop_below
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback now (they may not be safe to use
+        # from another thread later), but leave layout to the writer's formatter.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if not self.drop_when_full or record.levelno >= self.drop_below:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The queue may be full of records; wait for room rather than fail.
+        self.queue.put(self._sentinel)
+
+
+class _BatchingStreamHandler(logging.StreamHandler):
+    """Stream handler for the writer thread: flushes only once the queue is drained.
+
+    A burst of records then costs one write to the terminal or pipe instead
+    of one per record.
+    """
+
+    def __init__(self, stream, pending: queue.Queue) -> None:
+        super().__init__(stream)
+        self.pending = pending
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if self.pending.empty():
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class DropReporter(logging.Handler):
+    """Writer-side handler that announces records the queue handler had to drop."""
+
+    def __init__(self, source: NonBlockingQueueHandler, target: logging.Handler) -> None:
+        super().__init__()
+        self.source = source
+        self.target = target
+        self._reported = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        dropped = self.source.dropped
+        if dropped > self._reported:
+            notice = logging.LogRecord(record.name, logging.WARNING, __file__, 0,
+                                       "%d DEBUG/INFO log records dropped (log output too slow)",
+                                       (dropped - self._reported,), None)
+            self._reported = dropped
+            self.target.handle(notice)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id to every record (runs in the caller's thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message template; suppressed repeats are counted.
+
+    Records at ``exempt_level`` or above always pass. When a template is let
+    through again after being suppressed, the record gets a ``suppressed``
+    field with the number of records skipped in between.
+    """
+
+    def __init__(self, per_second: float, burst: int, exempt_level: int = logging.WARNING) -> None:
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self.exempt_level = exempt_level
+        self._buckets: dict[tuple, list[float]] = {}  # key -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.exempt_level:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = int(suppressed)
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """Let through one in ``every`` records per message template."""
+
+    def __init__(self, every: int, exempt_level: int = logging.WARNING) -> None:
+        super().__init__()
+        self.every = max(1, every)
+        self.exempt_level = exempt_level
+        self._counts: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.exempt_level:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        if count:
+            record.sampled = self.every
+        return True
+
 
-def setup_logger(name: str) -> logging.Logger:
+class TextFormatter(logging.Formatter):
+    """The classic text layout, with request id and extra fields appended."""
+
+    def __init__(self) -> None:
+        super().__init__(TEXT_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        text = super().formatMessage(record)
+        fields = extra_fields(record)
+        if fields:
+            text += " | " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and context fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        data.update(extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def extra_fields(record: logging.LogRecord) -> dict:
+    """Fields passed via ``extra=`` (plus request_id when set)."""
+    return {
+        key: value
+        for key, value in vars(record).items()
+        if key not in _RECORD_ATTRS and not key.startswith("_") and value is not None
+    }
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """Tag every record logged inside the block with ``request_id`` (generated if omitted)."""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        yield request_id
+    finally:
+        request_id_var.reset(token)
+
+
+@contextmanager
+def timed(logger: logging.Logger, message: str, level: int = logging.INFO, **fields) -> Iterator[dict]:
+    """Log ``message`` with ``duration_ms`` when the block ends.
+
+    The yielded dict can be filled with more fields inside the block.
+    """
+    fields = dict(fields)
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        fields["duration_ms"] = round((time.perf_counter() - started) * 1000.0, 3)
+        logger.log(level, message, extra=fields)
+
+
+def setup_logger(
+    name: str,
+    level: int = logging.INFO,
+    json_format: bool = False,
+    log_file: Optional[str] = None,
+    max_bytes: int = 10 * 2 ** 20,
+    backup_count: int = 5,
+    rate_limit: Optional[tuple[float, int]] = None,
+    sample_every: Optional[int] = None,
+    blocking: bool = False,
+    stream=None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    drop_when_full: bool = False,
+) -> logging.Logger:
+    """Return logger ``name``, configured once on first use.
+
+    By default records are handed to a background writer thread through a
+    queue of ``queue_size`` records; pass ``blocking=True`` for the old
+    direct :class:`logging.StreamHandler`. ``drop_when_full=True`` lets
+    DEBUG/INFO records be dropped rather than wait when the queue is full.
+    """
     logger = logging.getLogger(name)
-    if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        ch = logging.StreamHandler()
-        fmt = logging.Formatter('%(asctime)s | %(levelname)s | %(name)s | %(message)s')
-        ch.setFormatter(fmt)
-        logger.addHandler(ch)
+    if logger.handlers:
+        return logger
+    logger.setLevel(level)
+    formatter = JsonFormatter() if json_format else TextFormatter()
+    log_queue: queue.Queue = queue.Queue(queue_size)
+    if blocking:
+        outputs: list[logging.Handler] = [logging.StreamHandler(stream)]
+    else:
+        outputs = [_BatchingStreamHandler(stream if stream is not None else sys.stderr, log_queue)]
+    if log_file:
+        outputs.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        ))
+    for output in outputs:
+        output.setFormatter(formatter)
+
+    if blocking:
+        front = outputs
+    else:
+        handler = NonBlockingQueueHandler(log_queue, drop_when_full)
+        writers = outputs + [DropReporter(handler, outputs[0])]
+        listener = _QueueListener(handler.queue, *writers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        front = [handler]
+
+    # Volume filters sit on the logger, so a dropped record never reaches any handler.
+    if rate_limit:
+        logger.addFilter(RateLimitFilter(*rate_limit))
+    if sample_every and sample_every > 1:
+        logger.addFilter(SampleFilter(sample_every))
+    for handler in front:
+        handler.addFilter(RequestContextFilter())
+        logger.addHandler(handler)
     return logger
+
+
+@atexit.register
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer threads (runs at exit)."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def _stop_listener(handler: logging.Handler) -> None:
+    """Flush and stop the writer thread fed by ``handler`` only."""
+    for listener in list(_listeners):
+        if listener.queue is getattr(handler, "queue", None):
+            _listeners.remove(listener)
+            listener.stop()
+
+
+# --------------------------------------------------------------------------
+# Benchmark: python -m shared.logging_utils
+# --------------------------------------------------------------------------
+
+class _SlowStream:
+    """Stream whose flush takes ``delay`` seconds, like a write to a backed-up pipe."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self) -> None:
+        time.sleep(self.delay)
+
+
+class _NullStream:
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def _bench_case(label: str, threads: int, records: int, **kwargs) -> dict:
+    name = f"bench.{label}.{uuid.uuid4().hex[:6]}"
+    logger = setup_logger(name, **kwargs)
+    logger.propagate = False
+    per_call: list[float] = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(threads)
+
+    def worker() -> None:
+        timings = []
+        start_barrier.wait()
+        with request_context():
+            for i in range(records):
+                t0 = time.perf_counter()
+                logger.info("handled item %d", i, extra={"duration_ms": 1.5})
+                timings.append(time.perf_counter() - t0)
+        with lock:
+            per_call.extend(timings)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    dropped = sum(getattr(h, "dropped", 0) for h in logger.handlers)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        _stop_listener(handler)
+    per_call.sort()
+    return {
+        "label": label,
+        "mean_us": sum(per_call) / len(per_call) * 1e6,
+        "p99_us": per_call[int(len(per_call) * 0.99)] * 1e6,
+        "calls_per_sec": len(per_call) / elapsed,
+        "dropped": dropped,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark log call overhead under thread contention")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--records", type=int, default=5000, help="log calls per thread")
+    parser.add_argument("--slow-us", type=float, default=50.0,
+                        help="per-flush delay of the simulated slow sink in microseconds")
+    args = parser.parse_args(argv)
+
+    slow = _SlowStream(args.slow_us / 1e6)
+    cases = [
+        ("sync, fast sink", dict(blocking=True, stream=_NullStream())),
+        ("queue, fast sink", dict(stream=_NullStream())),
+        ("queue+json, fast sink", dict(stream=_NullStream(), json_format=True)),
+        ("sync, slow sink", dict(blocking=True, stream=slow)),
+        ("queue, slow sink", dict(stream=slow)),
+        ("queue, slow, drop INFO", dict(stream=slow, drop_when_full=True)),
+        ("queue, slow, rate-limited", dict(stream=slow, rate_limit=(100.0, 200))),
+    ]
+    print(f"{args.threads} threads x {args.records} log calls; slow sink = {args.slow_us:.0f} us/flush")
+    print(f"{'CASE':<28} {'MEAN us':>9} {'P99 us':>9} {'CALLS/S':>10} {'DROPPED':>8}")
+    for label, kwargs in cases:
+        result = _bench_case(label.replace(" ", "").replace(",", "_"), args.threads, args.records, **kwargs)
+        print(f"{label:<28} {result['mean_us']:>9.1f} {result['p99_us']:>9.1f} "
+              f"{result['calls_per_sec']:>10.0f} {result['dropped']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,19 +4,49 @@ These functions are used by the cockpit to launch miniapps as separate
 processes and forward their output back to the user. They can also be
 imported by miniapps themselves if they need to run other commands.
 
-All subprocesses are created with ``text=True`` and unbuffered
+By default subprocesses are created with ``text=True`` and unbuffered
 standard output to ensure that log messages appear immediately.
+
+For long-running children whose output must never stall them (or grow
+memory without bound) use the bounded capture helpers instead:
+:class:`OutputBuffer` keeps a ring buffer of recent lines per process and
+fans lines out to bounded :class:`OutputSubscription` queues, while
+:class:`ProcessOutputReader` (threads + selectors) and :func:`pump_stream`
+(asyncio) read raw bytes in large chunks and split lines incrementally with
+:class:`LineSplitter`.
 """
 from __future__ import annotations
 
+import asyncio
 import os
 import subprocess
+import sys
 import threading
 import queue
-from typing import Iterator, Iterable, Tuple, Optional
+import selectors
+import time
+from collections import deque
+from typing import IO, Iterator, Iterable, Mapping, Tuple, Optional
+
+# Bytes requested from a pipe per read by the bounded readers.
+READ_CHUNK_SIZE = 64 * 1024
+# Lines longer than this are split so a child that never writes a newline
+# cannot grow the line buffer without bound.
+MAX_LINE_LENGTH = 16 * 1024
+
+# Policies applied by an OutputSubscription when it is full.
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
 
 
-def start_subprocess(cwd: str, entry: str, python_executable: Optional[str] = None) -> subprocess.Popen:
+def start_subprocess(
+    cwd: str,
+    entry: str,
+    python_executable: Optional[str] = None,
+    text: bool = True,
+) -> subprocess.Popen:
     """Launch a Python subprocess for the given entry point in a working directory.
 
     Parameters
@@ -28,6 +58,10 @@ def start_subprocess(cwd: str, entry: str, python_executable: Optional[str] = No
     python_executable: Optional[str]
         Absolute path to the Python interpreter to use. If ``None`` the
         interpreter from the current process (``sys.executable``) is used.
+    text: bool
+        If ``True`` (the default) ``proc.stdout`` is a line-buffered text
+        pipe suitable for :func:`stream_process_output`. Pass ``False`` to get
+        an unbuffered byte pipe for :class:`ProcessOutputReader`.
 
     Returns
     -------
@@ -35,9 +69,16 @@ def start_subprocess(cwd: str, entry: str, python_executable: Optional[str] = No
         A handle to the started process. The caller is responsible for
         terminating it when appropriate.
     """
-    import sys
     exe = python_executable or sys.executable
     cmd = [exe, entry]
+    if not text:
+        return subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+        )
     return subprocess.Popen(
         cmd,
         cwd=cwd,
@@ -53,7 +94,9 @@ def stream_process_output(proc: subprocess.Popen) -> Iterator[str]:
     """Yield lines of output from a running subprocess.
 
     The generator will block until the process terminates. To stop
-    streaming early call ``proc.terminate()`` from another thread.
+    streaming early call ``proc.terminate()`` from another thread. If the
+    consumer may fall behind the child, use :class:`ProcessOutputReader`
+    instead.
 
     Parameters
     ----------
@@ -69,4 +112,421 @@ def stream_process_output(proc: subprocess.Popen) -> Iterator[str]:
         return
     # Iterate over lines as they become available.
     for line in proc.stdout:
-        yield line.rstrip("\n")
\ No newline at end of file
+        yield line.rstrip("\n")
+
+
+async def start_subprocess_async(
+    cwd: str,
+    entry: str,
+    python_executable: Optional[str] = None,
+    env: Optional[Mapping[str, str]] = None,
+) -> asyncio.subprocess.Process:
+    """Launch a Python subprocess from a running asyncio event loop.
+
+    This is the asyncio counterpart of :func:`start_subprocess`. Standard
+    error is merged into standard output, which is exposed as a raw byte
+    ``asyncio.StreamReader`` so callers can read it in large chunks.
+
+    Parameters
+    ----------
+    cwd: str
+        The working directory where the entry script resides.
+    entry: str
+        Path to the Python script relative to ``cwd`` that should be executed.
+    python_executable: Optional[str]
+        Absolute path to the Python interpreter to use. If ``None`` the
+        interpreter from the current process (``sys.executable``) is used.
+    env: Optional[Mapping[str, str]]
+        Extra environment variables layered over ``os.environ``.
+
+    Returns
+    -------
+    asyncio.subprocess.Process
+        A handle to the started process. On POSIX the child is started in its
+        own session so a Ctrl-C in the terminal reaches only the parent, which
+        is then responsible for shutting the child down.
+    """
+    exe = python_executable or sys.executable
+    child_env = dict(os.environ)
+    child_env["PYTHONUNBUFFERED"] = "1"
+    if env:
+        child_env.update(env)
+    kwargs = {}
+    if os.name == "posix":
+        kwargs["start_new_session"] = True
+    return await asyncio.create_subprocess_exec(
+        exe,
+        entry,
+        cwd=cwd,
+        env=child_env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        **kwargs,
+    )
+
+
+class LineSplitter:
+    """Incrementally split a byte stream into text lines.
+
+    Bytes are fed in arbitrary chunks; complete lines are returned as soon as
+    their newline arrives. A partial line longer than ``max_line_length`` is
+    emitted in pieces so memory stays bounded even if the newline never comes.
+    """
+
+    def __init__(self, max_line_length: int = MAX_LINE_LENGTH, encoding: str = "utf-8") -> None:
+        self.max_line_length = max_line_length
+        self.encoding = encoding
+        self.split_lines = 0
+        self._pending = b""
+
+    def feed(self, data: bytes) -> list[str]:
+        """Consume a chunk of bytes and return the lines it completed."""
+        if not data:
+            return []
+        parts = (self._pending + data).split(b"\n")
+        self._pending = parts.pop()
+        while len(self._pending) > self.max_line_length:
+            parts.append(self._pending[: self.max_line_length])
+            self._pending = self._pending[self.max_line_length :]
+            self.split_lines += 1
+        return [self._decode(part) for part in parts]
+
+    def flush(self) -> list[str]:
+        """Return the trailing partial line, if any (call at end of stream)."""
+        if not self._pending:
+            return []
+        line, self._pending = self._pending, b""
+        return [self._decode(line)]
+
+    def _decode(self, data: bytes) -> str:
+        return data.rstrip(b"\r").decode(self.encoding, errors="replace")
+
+
+class OutputSubscription:
+    """A bounded, thread-safe queue of ``(source, line)`` pairs.
+
+    A subscription can be attached to one or more :class:`OutputBuffer`
+    instances. When it is full the ``policy`` decides what happens:
+
+    ``drop_oldest``
+        discard the oldest queued line to make room (the default);
+    ``drop_newest``
+        discard the incoming line;
+    ``block``
+        keep the line and report the subscription as full, which makes the
+        readers stop draining the child's pipe until the consumer catches up
+        (the child then blocks on write). The queue may exceed ``maxsize`` by
+        at most one read's worth of lines.
+
+    Every discarded line is counted in :attr:`dropped`.
+    """
+
+    def __init__(self, maxsize: int = 1000, policy: str = DROP_OLDEST) -> None:
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {policy!r}; expected one of {DROP_POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items: deque[Tuple[str, str]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def offer(self, source: str, lines: Iterable[str]) -> int:
+        """Queue lines from ``source`` according to the drop policy.
+
+        Returns the number of lines dropped by this call.
+        """
+        dropped = 0
+        with self._cond:
+            for line in lines:
+                if len(self._items) >= self.maxsize:
+                    if self.policy == DROP_NEWEST:
+                        dropped += 1
+                        continue
+                    if self.policy == DROP_OLDEST:
+                        self._items.popleft()
+                        dropped += 1
+                self._items.append((source, line))
+            self.dropped += dropped
+            self._cond.notify_all()
+        return dropped
+
+    def full(self) -> bool:
+        """Return ``True`` if a ``block`` subscription wants producers to pause."""
+        with self._cond:
+            return self.policy == BLOCK and len(self._items) >= self.maxsize
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """Pop the next ``(source, line)``; ``None`` on timeout or once closed and empty."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                item = self._items.popleft()
+                self._cond.notify_all()
+                return item
+            return None
+
+    def drain(self, limit: Optional[int] = None) -> list[Tuple[str, str]]:
+        """Pop up to ``limit`` queued items without waiting."""
+        with self._cond:
+            count = len(self._items) if limit is None else min(limit, len(self._items))
+            items = [self._items.popleft() for _ in range(count)]
+            if items:
+                self._cond.notify_all()
+            return items
+
+    def close(self) -> None:
+        """Wake up blocked consumers; queued items can still be drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class OutputBuffer:
+    """Ring buffer of the most recent output lines of one process.
+
+    Lines are numbered with a monotonically increasing sequence so callers
+    can poll for new output with :meth:`lines_since`. The buffer also forwards
+    every line to attached :class:`OutputSubscription` queues.
+
+    Counters: ``lines_total`` and ``bytes_total`` (everything read),
+    ``evicted`` (lines that fell out of the ring), ``dropped`` (lines
+    subscribers discarded because they were full) and ``split_lines``
+    (over-long lines cut by the splitter).
+    """
+
+    def __init__(self, name: str, capacity: int = 1000) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.lines_total = 0
+        self.bytes_total = 0
+        self.evicted = 0
+        self.dropped = 0
+        self.split_lines = 0
+        self.closed = False
+        self._ring: deque[str] = deque(maxlen=capacity)
+        self._subscriptions: list[OutputSubscription] = []
+        self._lock = threading.Lock()
+
+    def attach(self, subscription: OutputSubscription) -> OutputSubscription:
+        """Forward future lines to ``subscription`` and return it."""
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def subscribe(self, maxsize: int = 1000, policy: str = DROP_OLDEST) -> OutputSubscription:
+        """Create and attach a new subscription."""
+        return self.attach(OutputSubscription(maxsize, policy))
+
+    def detach(self, subscription: OutputSubscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def append(self, lines: list[str], nbytes: int = 0) -> None:
+        """Record lines read from the process and forward them to subscribers."""
+        with self._lock:
+            overflow = len(self._ring) + len(lines) - self.capacity
+            if overflow > 0:
+                self.evicted += overflow
+            self._ring.extend(lines)
+            self.lines_total += len(lines)
+            self.bytes_total += nbytes
+            subscriptions = list(self._subscriptions)
+        dropped = sum(subscription.offer(self.name, lines) for subscription in subscriptions)
+        if dropped:
+            with self._lock:
+                self.dropped += dropped
+
+    def writable(self) -> bool:
+        """Return ``False`` while a ``block`` subscriber is full (apply backpressure)."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        return not any(subscription.full() for subscription in subscriptions)
+
+    def tail(self, n: Optional[int] = None) -> list[str]:
+        """Return the last ``n`` buffered lines (all buffered lines if ``None``)."""
+        with self._lock:
+            lines = list(self._ring)
+        return lines if n is None else lines[-n:] if n > 0 else []
+
+    def lines_since(self, seq: int) -> Tuple[int, list[str]]:
+        """Return ``(next_seq, lines)`` for lines numbered ``seq`` and later.
+
+        Lines already evicted from the ring are silently skipped.
+        """
+        with self._lock:
+            first = self.lines_total - len(self._ring)
+            start = max(seq, first) - first
+            lines = list(self._ring)[start:]
+            return self.lines_total, lines
+
+    def stats(self) -> dict[str, int]:
+        """Return the counters as a dict."""
+        with self._lock:
+            return {
+                "lines_total": self.lines_total,
+                "bytes_total": self.bytes_total,
+                "buffered": len(self._ring),
+                "evicted": self.evicted,
+                "dropped": self.dropped,
+                "split_lines": self.split_lines,
+            }
+
+    def close(self) -> None:
+        """Mark the stream finished."""
+        self.closed = True
+
+
+class ProcessOutputReader:
+    """Read the output of many processes from one background thread.
+
+    Pipes are switched to non-blocking mode and multiplexed with
+    :mod:`selectors`; each readable pipe is drained in ``chunk_size`` reads,
+    so a chatty child cannot starve the others and slow consumers never block
+    the reader (see :class:`OutputSubscription` for the drop policies). On
+    Windows, where pipes cannot be selected, one thread per pipe is used
+    instead.
+
+    Example::
+
+        reader = ProcessOutputReader()
+        proc = start_subprocess(cwd, "app.py", text=False)
+        buffer = reader.watch("myapp", proc.stdout)
+        ...
+        print("\n".join(buffer.tail(50)))
+    """
+
+    def __init__(self, chunk_size: int = READ_CHUNK_SIZE, max_line_length: int = MAX_LINE_LENGTH,
+                 buffer_capacity: int = 1000) -> None:
+        self.chunk_size = chunk_size
+        self.max_line_length = max_line_length
+        self.buffer_capacity = buffer_capacity
+        self.buffers: dict[str, OutputBuffer] = {}
+        self._use_selector = os.name != "nt"
+        self._selector = selectors.DefaultSelector() if self._use_selector else None
+        self._paused: dict[int, Tuple[IO[bytes], OutputBuffer, LineSplitter]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def watch(self, name: str, stream: IO[bytes], buffer: Optional[OutputBuffer] = None) -> OutputBuffer:
+        """Start capturing ``stream`` (a binary pipe) into a buffer named ``name``."""
+        buffer = buffer or OutputBuffer(name, self.buffer_capacity)
+        self.buffers[name] = buffer
+        splitter = LineSplitter(self.max_line_length)
+        if not self._use_selector:
+            threading.Thread(
+                target=self._read_blocking, args=(stream, buffer, splitter),
+                name=f"output-{name}", daemon=True,
+            ).start()
+            return buffer
+        os.set_blocking(stream.fileno(), False)
+        with self._lock:
+            self._selector.register(stream, selectors.EVENT_READ, (buffer, splitter))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="output-reader", daemon=True)
+                self._thread.start()
+        return buffer
+
+    def stop(self) -> None:
+        """Stop the background reader thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._resume_writable()
+            with self._lock:
+                has_streams = bool(self._selector.get_map())
+            if not has_streams:
+                time.sleep(0.05)
+                continue
+            for key, _ in self._selector.select(timeout=0.05):
+                buffer, splitter = key.data
+                if not buffer.writable():
+                    # Backpressure: stop reading until the block subscriber drains.
+                    with self._lock:
+                        self._selector.unregister(key.fileobj)
+                        self._paused[key.fd] = (key.fileobj, buffer, splitter)
+                    continue
+                self._read_ready(key.fileobj, buffer, splitter)
+
+    def _resume_writable(self) -> None:
+        with self._lock:
+            for fd, (stream, buffer, splitter) in list(self._paused.items()):
+                if buffer.writable():
+                    del self._paused[fd]
+                    self._selector.register(stream, selectors.EVENT_READ, (buffer, splitter))
+
+    def _read_ready(self, stream: IO[bytes], buffer: OutputBuffer, splitter: LineSplitter) -> None:
+        try:
+            data = os.read(stream.fileno(), self.chunk_size)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if data:
+            self._publish(buffer, splitter, splitter.feed(data), len(data))
+            return
+        with self._lock:
+            self._selector.unregister(stream)
+        self._publish(buffer, splitter, splitter.flush(), 0)
+        buffer.close()
+
+    def _read_blocking(self, stream: IO[bytes], buffer: OutputBuffer, splitter: LineSplitter) -> None:
+        while not self._stop.is_set():
+            while not buffer.writable() and not self._stop.is_set():
+                time.sleep(0.05)
+            try:
+                data = os.read(stream.fileno(), self.chunk_size)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            self._publish(buffer, splitter, splitter.feed(data), len(data))
+        self._publish(buffer, splitter, splitter.flush(), 0)
+        buffer.close()
+
+    @staticmethod
+    def _publish(buffer: OutputBuffer, splitter: LineSplitter, lines: list[str], nbytes: int) -> None:
+        buffer.split_lines = splitter.split_lines
+        if lines or nbytes:
+            buffer.append(lines, nbytes)
+
+
+async def pump_stream(
+    reader: asyncio.StreamReader,
+    buffer: OutputBuffer,
+    chunk_size: int = READ_CHUNK_SIZE,
+    max_line_length: int = MAX_LINE_LENGTH,
+) -> None:
+    """Copy an asyncio byte stream into ``buffer`` until EOF.
+
+    This is the asyncio counterpart of :class:`ProcessOutputReader`: the
+    stream is read in large chunks, lines are split incrementally and the
+    coroutine pauses reading while a ``block`` subscriber is full.
+    """
+    splitter = LineSplitter(max_line_length)
+    buffer.closed = False
+    while True:
+        while not buffer.writable():
+            await asyncio.sleep(0.05)
+        data = await reader.read(chunk_size)
+        if not data:
+            break
+        lines = splitter.feed(data)
+        buffer.split_lines = splitter.split_lines
+        buffer.append(lines, len(data))
+    buffer.append(splitter.flush())
+    buffer.close()
@@ -0,0 +1,134 @@
+"""Serve a miniapp's WSGI app in the mode chosen by its ``config.json``.
+
+``MiniAppConfig.server`` (or the ``QI_APP_SERVER`` environment variable set
+by the cockpit) selects the server:
+
+``dev``
+    Flask's built-in Werkzeug server (``app.run``). Fine for development,
+    but not meant for concurrent clients.
+``waitress``
+    Waitress, a pure-Python threaded WSGI server that also runs on Windows.
+    One process with ``threads`` worker threads; idle keep-alive connections
+    are closed after ``keepalive`` seconds. It has no graceful reload.
+``gunicorn``
+    Gunicorn (POSIX only) with ``workers`` processes of ``threads`` threads
+    each (``gthread`` workers, which support keep-alive). Sending ``SIGHUP``
+    to the process gracefully replaces the worker processes (``cockpit
+    reload``). The workers are forked from the master, which imported the
+    app once, so a reload recycles processes (e.g. to release leaked memory)
+    but does not pick up code changes; restart the app for those.
+    ``SIGTERM`` lets in-flight requests finish for ``graceful_timeout``
+    seconds.
+
+If the selected server is not installed the app falls back to ``dev`` with a
+warning, so a missing optional dependency never stops an app from starting.
+
+Apps that keep state in the serving process (a background thread, an open
+database connection) call ``serve(..., single_process=True)``. Gunicorn
+would fork its workers from that process: the thread stays behind in the
+master and every worker gets its own copy of the state. Such apps are served
+with waitress instead when gunicorn is selected.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from typing import Any, Optional
+
+from .config_schema import SERVER_ENV, SERVER_MODES, MiniAppConfig
+
+
+def server_mode(config: MiniAppConfig) -> str:
+    """Return the server mode, honouring the ``QI_APP_SERVER`` override."""
+    mode = os.environ.get(SERVER_ENV) or config.server or "dev"
+    if mode not in SERVER_MODES:
+        print(f"Unknown server mode {mode!r}, using 'dev' (choose from {', '.join(SERVER_MODES)})",
+              file=sys.stderr)
+        return "dev"
+    return mode
+
+
+def default_workers() -> int:
+    return 2 * (os.cpu_count() or 1) + 1
+
+
+def serve(app: Any, config: MiniAppConfig, host: str, port: int, mode: Optional[str] = None,
+          single_process: bool = False) -> None:
+    """Serve ``app`` on ``host:port`` until the process is stopped.
+
+    ``single_process=True`` rules out gunicorn (see the module docstring).
+    """
+    mode = mode or server_mode(config)
+    if mode == "gunicorn" and single_process:
+        print(f"{config.name} must run in a single process; using waitress instead of gunicorn",
+              file=sys.stderr)
+        mode = "waitress"
+    if mode == "gunicorn":
+        if os.name == "nt":
+            print("gunicorn does not run on Windows; using waitress", file=sys.stderr)
+            mode = "waitress"
+        else:
+            try:
+                _serve_gunicorn(app, config, host, port)
+                return
+            except ImportError:
+                print("gunicorn is not installed; using the dev server", file=sys.stderr)
+                mode = "dev"
+    if mode == "waitress":
+        try:
+            _serve_waitress(app, config, host, port)
+            return
+        except ImportError:
+            print("waitress is not installed; using the dev server", file=sys.stderr)
+    app.run(host=host, port=port)
+
+
+def _serve_waitress(app: Any, config: MiniAppConfig, host: str, port: int) -> None:
+    from waitress import serve as waitress_serve
+
+    print(f"Serving with waitress ({config.threads} threads)", flush=True)
+    waitress_serve(
+        app,
+        host=host,
+        port=port,
+        threads=max(1, config.threads),
+        channel_timeout=max(1, config.keepalive),
+        ident=config.name,
+    )
+
+
+def _serve_gunicorn(app: Any, config: MiniAppConfig, host: str, port: int) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": config.workers or default_workers(),
+        "worker_class": "gthread",
+        "threads": max(1, config.threads),
+        "keepalive": config.keepalive,
+        "graceful_timeout": config.graceful_timeout,
+        "proc_name": config.name,
+    }
+
+    class _Application(BaseApplication):
+        """Run an already imported app; workers are forked from this process.
+
+        The app is not loaded by import string because miniapps run as
+        ``python app.py``: re-importing ``__main__`` in a worker would run
+        ``serve()`` again. Hence a HUP reload keeps the master's code.
+        """
+
+        def load_config(self) -> None:
+            for key, value in options.items():
+                self.cfg.set(key, value)
+            if "control_socket_disable" in self.cfg.settings:
+                # Gunicorn >= 25 opens one control socket per user by default, which
+                # several apps would fight over; the cockpit uses signals instead.
+                self.cfg.set("control_socket_disable", True)
+
+        def load(self) -> Any:
+            return app
+
+    print(f"Serving with gunicorn ({options['workers']} workers x {options['threads']} threads)", flush=True)
+    _Application().run()